@@ -0,0 +1,98 @@
+"""
+Micro-benchmark of the drawing path of model.py at 1080p and 4K:
+the old per frame path vs batched buffer, reused buffers and in-place drawing
+
+Usage: python bench_draw.py [--batch-size 8] [--repeat 10]
+"""
+
+import time
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from model import _draw_batch
+
+
+def _legacy_draw(image, text, fps=None):
+    # copy of the per frame drawing of model.py before batching
+    image = image.copy()
+
+    h, w = image.shape[:2]
+    cv2.putText(
+        image,
+        text,
+        (10, int(h - h / 20)),
+        cv2.FONT_HERSHEY_PLAIN,
+        w // 100,
+        (0, 0, 255),
+        thickness=w // 100,
+    )
+
+    if fps is not None:
+        cv2.putText(
+            image,
+            f"FPS: {fps}",
+            (10, int(min(h, w) / 7.2)),
+            cv2.FONT_HERSHEY_PLAIN,
+            min(h, w) // 90,
+            (0, 255, 0),
+            thickness=w // 100,
+        )
+
+    return image
+
+
+def legacy(images, texts, fps):
+    return [_legacy_draw(image, text, fps) for image, text in zip(images, texts)]
+
+
+def batched(images, texts, fps):
+    return _draw_batch(images, texts, fps)
+
+
+def reused(images, texts, fps):
+    return _draw_batch(images, texts, fps, reuse_buffers=True)
+
+
+def in_place(images, texts, fps):
+    return _draw_batch(images, texts, fps, in_place=True)
+
+
+def measure(func, images, texts, repeat):
+    func(images, texts, 25)  # warmup, fills layout cache
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(images, texts, 25)
+    per_frame_time = (time.perf_counter() - start) / repeat / len(images)
+
+    tracemalloc.start()
+    func(images, texts, 25)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_frame_time, peak / len(images)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'resolution':<10} {'path':<10} {'ms/frame':>9} {'MB allocated/frame':>19}")
+    for name, (h, w) in (("1080p", (1080, 1920)), ("4K", (2160, 3840))):
+        frame = np.random.default_rng(0).integers(0, 256, (h, w, 3), dtype=np.uint8)
+        texts = ["TEST TEXT"] * args.batch_size
+        for path in (legacy, batched, reused, in_place):
+            images = [frame.copy() for _ in range(args.batch_size)]
+            per_frame_time, per_frame_bytes = measure(path, images, texts, args.repeat)
+            print(
+                f"{name:<10} {path.__name__:<10} {per_frame_time * 1000:>9.2f} "
+                f"{per_frame_bytes / 2 ** 20:>19.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,63 @@
+import hashlib
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
 from moviepy.editor import AudioFileClip
-from moviepy.audio.fx import all as afx
+
+FADE_OUT_SECONDS = 2
 
 
 class MelodyMixer:
     """
-    Retrieves audio from a file by chunks fitting video's duration and FPS
+    Retrieves audio from a file by chunks fitting video's duration and FPS.
+    The melody is decoded once, chunks are slices of the decoded samples
     """
-    def __init__(self, melody_path):
+    def __init__(self, melody_path, cache_dir: Optional[str] = None):
         """
         :param melody_path: path to audio file: can be .mp3, .wav or other supported by MoviePy
+        :param cache_dir: directory to keep decoded PCM in, it is memory-mapped on the next start
         """
-        self._audio = AudioFileClip(melody_path)
-        self._audio_iter = None
-        self._audio_fps = self._audio.fps
+        audio = AudioFileClip(melody_path)
+        self._audio_fps = audio.fps
+        self._samples = self._load_samples(audio, melody_path, cache_dir)
+        audio.close()
         self._video_fps = 30
         self._duration = 0
+        self._bounds = np.zeros(2, dtype=int)
+        self._end = 0
+        self._fade_start = 0
+        self._fade = self._samples[:0]
+        self._position = 0
+
+    def _load_samples(
+        self, audio: AudioFileClip, melody_path: str, cache_dir: Optional[str]
+    ) -> np.ndarray:
+        """
+        Decode the melody to float32 array of shape (N, channels)
+        """
+        if cache_dir is None:
+            return self._decode(audio)
+
+        path = Path(melody_path)
+        stat = path.stat()
+        key = hashlib.sha1(
+            f"{path.resolve()}:{stat.st_size}:{stat.st_mtime}:{self._audio_fps}".encode()
+        ).hexdigest()[:16]
+        cache_path = Path(cache_dir) / f"{path.stem}-{key}.npy"
+        if not cache_path.is_file():
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(".tmp.npy")
+            np.save(tmp_path, self._decode(audio))
+            tmp_path.replace(cache_path)
+        return np.load(cache_path, mmap_mode="r")
+
+    def _decode(self, audio: AudioFileClip) -> np.ndarray:
+        chunks = list(audio.iter_chunks(fps=self._audio_fps, chunksize=1 << 16))
+        samples = np.vstack(chunks)
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        return np.ascontiguousarray(samples, dtype=np.float32)
 
     def reset(self, video_fps, duration):
         """
@@ -23,25 +66,42 @@ class MelodyMixer:
         :param duration: input video's duration (in seconds)
         :return:
         """
-        # shallow copy of the audio, resets state of the clip such as seek's pointer
-        cur_audio = self._audio.copy()
-        # set end of the audio clip to fade out accordingly to the video's duration
-        cur_audio = cur_audio.set_end(duration)
-        # fade out volume of the audio at the last 2 seconds
-        cur_audio = afx.audio_fadeout(cur_audio, duration=2)
-        chunk_size = self._audio_fps // video_fps
-        # prepare an iterator for the updated audio
-        self._audio_iter = cur_audio.iter_chunks(chunksize=chunk_size)
+        chunk_size = max(1, self._audio_fps // video_fps)
+        # end of the melody accordingly to the video's duration
+        self._end = min(len(self._samples), int(duration * self._audio_fps))
+        # chunk boundaries are the same as MoviePy's iter_chunks gives
+        self._bounds = np.linspace(
+            0, self._end, self._end // chunk_size + 2, endpoint=True, dtype=int
+        )
+        # fade out volume of the audio at the last 2 seconds, only this part is copied
+        self._fade_start = max(0, self._end - FADE_OUT_SECONDS * self._audio_fps)
+        fade_length = self._end - self._fade_start
+        envelope = np.linspace(1, 0, fade_length, endpoint=False, dtype=np.float32)
+        self._fade = self._samples[self._fade_start : self._end] * envelope[:, None]
+        self._position = 0
 
         self._video_fps = video_fps
         self._duration = duration
 
-    def next_sound_chunk(self):
-        try:
-            sound = next(self._audio_iter)
-        except StopIteration:
+    def next_sound_chunk(self) -> np.ndarray:
+        if self._position >= len(self._bounds) - 1:
             # in case the audio is finished start from the beginning
-            self.reset(self._video_fps, self._duration)
-            sound = next(self._audio_iter)
+            self._position = 0
+        start = self._bounds[self._position]
+        stop = self._bounds[self._position + 1]
+        self._position += 1
+
+        if stop <= self._fade_start:
+            return self._samples[start:stop]
+        if start >= self._fade_start:
+            return self._fade[start - self._fade_start : stop - self._fade_start]
+        # the only chunk crossing the fade start
+        return np.concatenate(
+            (self._samples[start : self._fade_start], self._fade[: stop - self._fade_start])
+        )
 
-        return sound
+    def next_sound_chunks(self, n: int) -> List[np.ndarray]:
+        """
+        Chunks for the whole batch of n frames
+        """
+        return [self.next_sound_chunk() for _ in range(n)]
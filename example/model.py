@@ -1,4 +1,6 @@
+import os
 import math
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Optional, Union, Any
 
@@ -10,8 +12,16 @@ from melody_mixer import MelodyMixer
 
 # this dictionary will be visible in all the methods of this module
 GLOBAL_KEYS = {"fps": None, "is_input_video": False}
-MELODY_MIXER = MelodyMixer(
-    str(Path(__file__).resolve().parent / Path("./assets/ya_shagayu_po_moskve.mp3"))
+# set DRAW_IN_PLACE=1 if the runner allows to mutate input images
+DRAW_IN_PLACE = os.environ.get("DRAW_IN_PLACE", "0") == "1"
+# set REUSE_DRAW_BUFFERS=1 if the runner is done with the drawn images of a batch
+# before the next predict_batch call, they are overwritten by the next batch then
+REUSE_DRAW_BUFFERS = os.environ.get("REUSE_DRAW_BUFFERS", "0") == "1"
+# kept by `visionhub-cli dev --watch` between reloads of this module
+__cacheable__ = ("MELODY_MIXER",)
+MELODY_MIXER = globals().get("MELODY_MIXER") or MelodyMixer(
+    str(Path(__file__).resolve().parent / Path("./assets/ya_shagayu_po_moskve.mp3")),
+    cache_dir=os.environ.get("MELODY_CACHE_DIR"),
 )
 
 
@@ -56,8 +66,22 @@ def predict_batch(
     """
     results = []
 
+    images = None
+    if draw:
+        images = _draw_batch(
+            [sample["image"] for sample in samples],
+            [sample.get("meta", {}).get("text", "TEST TEXT") for sample in samples],
+            GLOBAL_KEYS["fps"],
+            in_place=DRAW_IN_PLACE,
+            reuse_buffers=REUSE_DRAW_BUFFERS,
+        )
+
+    sounds = None
+    if GLOBAL_KEYS["is_input_video"]:
+        sounds = MELODY_MIXER.next_sound_chunks(len(samples))
+
     # iterate over batch
-    for sample in samples:
+    for i, sample in enumerate(samples):
         # read input image parameters
         image = sample["image"]
         h, w = image.shape[:2]
@@ -68,48 +92,130 @@ def predict_batch(
 
         # if it was asked to draw the result then do it
         if draw:
-            meta = sample.get("meta", {})
-            text = meta.get("text", "TEST TEXT")
-            image = _draw(image, text, GLOBAL_KEYS["fps"])
-            result["image"] = image
+            result["image"] = images[i]
 
         if GLOBAL_KEYS["is_input_video"]:
-            result["sound"] = MELODY_MIXER.next_sound_chunk()
+            result["sound"] = sounds[i]
 
         # collect results for batch of samples
         results.append(result)
 
     return results
 
-def _draw(image: np.ndarray, text: str, fps=None) -> np.ndarray:
+
+@lru_cache(maxsize=8)
+def _layout(h: int, w: int) -> Dict[str, Any]:
+    """
+    Positions and font sizes of the drawn text, computed once per resolution
+    """
+    return {
+        "text_org": (10, int(h - h / 20)),
+        "text_scale": w // 100,
+        "fps_org": (10, int(min(h, w) / 7.2)),
+        "fps_scale": min(h, w) // 90,
+        "thickness": w // 100,
+    }
+
+
+def _draw_batch(
+    images: List[np.ndarray],
+    texts: List[str],
+    fps=None,
+    in_place: bool = False,
+    reuse_buffers: bool = False,
+) -> List[np.ndarray]:
+    """
+    Draws predictions on the batch of images
+    :param images: list of np.ndarray of shape (H, W, 3) and dtype=np.uint8, order of channels - RGB
+    :param texts: text to draw on each image
+    :param in_place: draw right on the input images instead of copies
+    :param reuse_buffers: draw into buffers kept between batches, the results are valid
+        until the next call
+    :return: list of np.ndarray of shape (H, W, 3) and dtype=np.uint8, order of channels - RGB
+    """
+    if in_place:
+        return [
+            _draw(image, text, fps, out=image if _is_writable(image) else None)
+            for image, text in zip(images, texts)
+        ]
+
+    # one allocation per frame shape for the whole batch
+    slots = {}
+    for image in images:
+        slots[image.shape] = slots.get(image.shape, 0) + 1
+    buffers = {
+        shape: _output_buffer(shape, count)
+        if reuse_buffers
+        else np.empty((count,) + shape, dtype=np.uint8)
+        for shape, count in slots.items()
+    }
+    results = []
+    for image, text in zip(images, texts):
+        slots[image.shape] -= 1
+        out = buffers[image.shape][slots[image.shape]]
+        results.append(_draw(image, text, fps, out=out))
+    return results
+
+
+# output buffers of _draw_batch with reuse_buffers by frame shape, most recent shapes last
+_BUFFERS: Dict[tuple, np.ndarray] = {}
+_MAX_BUFFER_SHAPES = 4
+
+
+def _output_buffer(shape: tuple, count: int) -> np.ndarray:
+    """
+    Buffer for at least `count` frames of `shape`, reused by the next batches
+    """
+    buffer = _BUFFERS.pop(shape, None)
+    if buffer is None or len(buffer) < count:
+        buffer = np.empty((count,) + shape, dtype=np.uint8)
+    _BUFFERS[shape] = buffer
+    while len(_BUFFERS) > _MAX_BUFFER_SHAPES:
+        del _BUFFERS[next(iter(_BUFFERS))]
+    return buffer
+
+
+def _is_writable(image: np.ndarray) -> bool:
+    # cv2 draws only on writable C-contiguous arrays, e.g. not on image[..., ::-1] views
+    return image.flags.writeable and image.flags.c_contiguous
+
+
+def _draw(
+    image: np.ndarray, text: str, fps=None, out: Optional[np.ndarray] = None
+) -> np.ndarray:
     """
     Draws prediction (in this case input meta) on the image
     :param image: np.ndarray of shape (H, W, 3) and dtype=np.uint8, order of channels - RGB
     :param text: text to draw
+    :param out: buffer of the image shape to draw in, may be the image itself
     :return: np.ndarray of shape (H, W, 3) and dtype=np.uint8, order of channels - RGB
     """
-    image = image.copy()
+    if out is None:
+        out = image.copy()
+    elif out is not image:
+        np.copyto(out, image)
 
     h, w = image.shape[:2]
+    layout = _layout(h, w)
     cv2.putText(
-        image,
+        out,
         text,
-        (10, int(h - h / 20)),
+        layout["text_org"],
         cv2.FONT_HERSHEY_PLAIN,
-        w // 100,
+        layout["text_scale"],
         (0, 0, 255),
-        thickness=w // 100,
+        thickness=layout["thickness"],
     )
 
     if fps is not None:
         cv2.putText(
-            image,
+            out,
             f"FPS: {fps}",
-            (10, int(min(h, w) / 7.2)),
+            layout["fps_org"],
             cv2.FONT_HERSHEY_PLAIN,
-            min(h, w) // 90,
+            layout["fps_scale"],
             (0, 255, 0),
-            thickness=w // 100,
+            thickness=layout["thickness"],
         )
 
-    return image
+    return out
@@ -0,0 +1,67 @@
+"""
+Fakes shared by the tests: docker client with one local image and
+the registry stand-in
+"""
+
+import json
+import hashlib
+
+import pytest
+
+from visionhub_cli.src import mock_registry
+
+IMAGE_CONFIG = {
+    "architecture": "amd64",
+    "os": "linux",
+    "rootfs": {"type": "layers", "diff_ids": ["sha256:" + "a" * 64, "sha256:" + "b" * 64]},
+}
+IMAGE_ID = "sha256:" + hashlib.sha256(json.dumps(IMAGE_CONFIG).encode()).hexdigest()
+PUSHED_DIGEST = "sha256:" + "c" * 64
+
+
+class FakeApi:
+    """
+    Low level docker API with one local image, push is recorded
+    """
+
+    def __init__(self, image_id=IMAGE_ID, layers=None):
+        self.image = {
+            "Id": image_id,
+            "Os": "linux",
+            "Architecture": "amd64",
+            "RootFS": {"Layers": layers or IMAGE_CONFIG["rootfs"]["diff_ids"]},
+        }
+        self.pushes = []
+
+    def inspect_image(self, link):
+        return self.image
+
+    def history(self, link):
+        return [
+            {"CreatedBy": "/bin/sh -c pip install torch", "Size": 2000000},
+            {"CreatedBy": "/bin/sh -c #(nop) ADD file:base in /", "Size": 5000},
+        ]
+
+    def push(self, repository, tag, stream, decode):
+        self.pushes.append((repository, tag))
+        yield {"status": "Pushed", "id": "abc"}
+        yield {"status": f"{tag}: digest: {PUSHED_DIGEST} size: 1"}
+
+
+class FakeClient:
+    def __init__(self, api=None):
+        self.api = api or FakeApi()
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """
+    Registry stand-in on a free port, the working directory is temporary
+    """
+    monkeypatch.chdir(tmp_path)
+    state = mock_registry.RegistryState()
+    server = mock_registry.serve(0, state)
+    state.address = f"localhost:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
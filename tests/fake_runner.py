@@ -0,0 +1,91 @@
+"""
+Model container whose runner answers every sample of the dataset queue
+"""
+
+import socket
+import threading
+from typing import List
+
+import zmq
+
+from visionhub_cli.src import controllers
+
+
+def free_ports(count: int) -> List[int]:
+    """
+    Distinct ports nothing listens on. Plain sockets are closed at once,
+    zmq ones are closed later by its io thread
+    """
+    sockets = [socket.socket() for _ in range(count)]
+    for socket_ in sockets:
+        socket_.bind(("127.0.0.1", 0))
+    ports = [socket_.getsockname()[1] for socket_ in sockets]
+    for socket_ in sockets:
+        socket_.close()
+    return ports
+
+
+class FakeContainer:
+    """
+    Runner of the image, answers every sample of the dataset queue.
+    Queues are bound before the container is returned, on free ports by default
+    """
+
+    short_id = "fake"
+
+    def __init__(self, ports):
+        self._context = zmq.Context()
+        self._dataset = self._context.socket(zmq.PULL)
+        self._result = self._context.socket(zmq.PUSH)
+        self.ports = {}
+        for port, socket in (
+            (controllers.RUNNER_DATASET_PORT, self._dataset),
+            (controllers.RUNNER_RESULT_PORT, self._result),
+        ):
+            host_port = ports[f"{port}/tcp"]
+            if host_port is None:
+                host_port = socket.bind_to_random_port("tcp://127.0.0.1")
+            else:
+                socket.bind(f"tcp://127.0.0.1:{host_port}")
+            self.ports[f"{port}/tcp"] = [{"HostPort": str(host_port)}]
+        self.attrs = {"NetworkSettings": {"Ports": self.ports}}
+        self.status = "running"
+        self.received = 0
+        self.removed = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            if self._dataset.poll(50):
+                sample = self._dataset.recv_pyobj()
+                self.received += 1
+                self._result.send_pyobj({"id": sample["id"], "prediction": {}})
+        self._dataset.close(linger=0)
+        self._result.close(linger=0)
+        self._context.term()
+
+    def reload(self):
+        pass
+
+    def remove(self, force=False):
+        self.removed = True
+        self._stop.set()
+        self._thread.join()
+
+
+class FakeContainers:
+    def __init__(self):
+        self.started = []
+
+    def run(self, image, detach, environment, ports):
+        self.started.append((image, environment, ports))
+        container = FakeContainer(ports)
+        self.container = container
+        return container
+
+
+class FakeClient:
+    def __init__(self):
+        self.containers = FakeContainers()
@@ -0,0 +1,69 @@
+"""
+Retries of the platform API client against the local API mock
+"""
+
+import socket
+
+import pytest
+
+from visionhub_cli.src import api_client, mock_api
+
+TOKEN = "mock-token"
+
+
+@pytest.fixture
+def mock(request):
+    state = mock_api.MockState(TOKEN, **getattr(request, "param", {}))
+    server = mock_api.serve(0, state)
+    state.address = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def client(address: str) -> api_client.ApiClient:
+    return api_client.ApiClient(address, timeout=(1, 0.3), retries=3, backoff=0.01)
+
+
+def posts(state: mock_api.MockState):
+    return [request for request in state.requests if request["method"] == "POST"]
+
+
+@pytest.mark.parametrize("mock", [{"delay": 1.0}], indirect=True)
+def test_post_read_timeout_does_not_create_duplicate(mock):
+    with pytest.raises(ValueError, match="not retried"):
+        client(mock.address).request(
+            "post", mock_api.MODEL_PATH, TOKEN, data={"slug": "stub"}
+        )
+    assert len(posts(mock)) == 1
+    assert len(mock.models) == 1
+
+
+@pytest.mark.parametrize("mock", [{"fail_rate": 1.0}], indirect=True)
+def test_post_5xx_is_not_retried(mock):
+    response = client(mock.address).request("post", mock_api.MODEL_PATH, TOKEN, data={})
+    assert response.status_code == 503
+    assert len(posts(mock)) == 1
+
+
+@pytest.mark.parametrize("mock", [{"fail_rate": 1.0}], indirect=True)
+def test_get_5xx_is_retried(mock):
+    response = client(mock.address).get(mock_api.USER_PATH, TOKEN)
+    assert response.status_code == 503
+    assert len(mock.requests) == 4
+
+
+def test_post_is_retried_when_connection_is_refused():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    with pytest.raises(ValueError, match="Can not connect"):
+        client(f"http://127.0.0.1:{port}").request("post", mock_api.MODEL_PATH, TOKEN)
+
+
+def test_not_sent_errors():
+    import requests
+
+    assert api_client.not_sent(requests.ConnectTimeout())
+    assert not api_client.not_sent(requests.ReadTimeout())
+    assert not api_client.not_sent(requests.ConnectionError("Connection aborted."))
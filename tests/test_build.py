@@ -0,0 +1,50 @@
+"""
+JSON log of the build ends with the summary, image size and its limit included
+"""
+
+import json
+
+import pytest
+
+from visionhub_cli.src import config_processor, controllers
+
+from conftest import FakeApi, FakeClient
+
+
+class BuildApi(FakeApi):
+    def __init__(self, size):
+        super().__init__()
+        self.image["Size"] = size
+
+    def build(self, **kwargs):
+        yield {"stream": "Step 1/2 : FROM python:3.9\n"}
+        yield {"stream": " ---> Using cache\n"}
+        yield {"stream": "Step 2/2 : RUN pip install torch\n"}
+        yield {"stream": "Successfully built 0123456789ab\n"}
+
+
+def build_summary(tmp_path, capsys, size, max_image_size):
+    (tmp_path / "Dockerfile").write_text("FROM python:3.9\nRUN pip install torch\n")
+    config = config_processor.ModelConfig.construct(
+        slug="stub", link="models/stub:v1", max_image_size=max_image_size
+    )
+    client = FakeClient(BuildApi(size))
+    assert controllers.build(
+        tmp_path, tmp_path / "model.yaml", config=config, client=client, log_format="json"
+    )
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    return next(event for event in events if event["event"] == "summary")
+
+
+@pytest.mark.parametrize("size, fits", [(2_000_000, False), (500_000, True)])
+def test_summary_has_size_verdict(tmp_path, capsys, size, fits):
+    summary = build_summary(tmp_path, capsys, size, "1MB")
+    assert summary["image_size"] == size
+    assert summary["max_image_size"] == 1 << 20
+    assert summary["fits_max_image_size"] is fits
+
+
+def test_summary_without_size_limit(tmp_path, capsys):
+    summary = build_summary(tmp_path, capsys, 2_000_000, None)
+    assert summary["image_size"] == 2_000_000
+    assert summary["fits_max_image_size"] is None
@@ -0,0 +1,54 @@
+"""
+Cold start events are timed by the daemon timestamps, not by the log arrival
+"""
+
+import time
+
+import pytest
+
+from visionhub_cli.src import coldstart
+
+
+class FakeContainer:
+    def __init__(self):
+        self.attrs = {"State": {"StartedAt": "2021-05-20T10:00:00.000000000Z"}}
+        self.removed = False
+
+    def reload(self):
+        pass
+
+    def logs(self, stream, follow, timestamps):
+        assert timestamps
+        # attached late, the lines were written long before they arrive
+        time.sleep(0.5)
+        yield b"2021-05-20T10:00:00.250000000Z loading weights\n2021-05-20T10:00:0"
+        yield b"1.500000000Z {'prediction': {}}\n"
+        yield b"2021-05-20T10:00:02.000000000Z done"
+
+    def wait(self):
+        self.attrs["State"]["FinishedAt"] = "2021-05-20T10:00:02.125000000Z"
+        return {"StatusCode": 0}
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeContainers:
+    def run(self, image, detach, environment):
+        self.container = FakeContainer()
+        return self.container
+
+
+class FakeClient:
+    def __init__(self):
+        self.containers = FakeContainers()
+
+
+def test_events_are_timed_from_the_container_start():
+    client = FakeClient()
+    result = coldstart.measure_run(client, "models/stub:v1", {"TEST_MODE": 1}, 1, timeout=10)
+    assert result.first_log - result.started == pytest.approx(0.25)
+    assert result.first_result - result.started == pytest.approx(1.5)
+    assert result.exited - result.started == pytest.approx(2.125)
+    assert result.exit_code == 0
+    assert client.containers.container.removed
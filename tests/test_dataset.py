@@ -0,0 +1,39 @@
+"""
+Packed dataset sources read back by their rows
+"""
+
+import numpy as np
+
+from visionhub_cli.src import dataset, local_model
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((2, 3, 3), value, dtype=np.uint8)
+
+
+def test_samples_of_interleaved_sources(tmp_path):
+    path = tmp_path / "data.vhds"
+    with dataset.DatasetWriter(path) as writer:
+        images = [writer.add_source(f"{number}.png", "image") for number in range(3)]
+        video = writer.add_source("clip.mp4", "video", height=2, width=3, fps=25, length=4)
+        for value in range(4):
+            writer.add(frame(100 + value), {"frame": value}, video)
+            writer.add(frame(value % 3), {"image": value % 3}, images[value % 3])
+
+    reader = dataset.DatasetReader(path)
+    assert [sample["meta"] for sample in reader.samples(images[0])] == [{"image": 0}] * 2
+    assert [int(sample["image"][0, 0, 0]) for sample in reader.samples(video)] == [
+        100,
+        101,
+        102,
+        103,
+    ]
+    assert list(reader.samples(10)) == []
+    assert len(list(reader.samples())) == 8
+
+    sources = local_model.load_sources(path, max_frames=3)
+    assert [(name, len(samples)) for name, samples, _ in sources] == [
+        ("images", 4),
+        ("video:clip.mp4", 3),
+    ]
+    assert sources[1][2] == {"height": 2, "width": 3, "fps": 25, "length": 4}
@@ -0,0 +1,62 @@
+"""
+Output video example is encoded while the model runs
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from visionhub_cli.src import controllers, encoder  # noqa: E402
+
+INIT_KWARGS = {"height": 32, "width": 32, "fps": 25, "length": 8}
+
+
+def model(fail_after=None):
+    calls = []
+
+    def predict_batch(samples, draw=True):
+        calls.append(len(samples))
+        if len(calls) == fail_after:
+            raise RuntimeError("model failed")
+        return [{"prediction": {}, "image": sample["image"]} for sample in samples]
+
+    return SimpleNamespace(predict_batch=predict_batch)
+
+
+def frames(count):
+    return (np.full((32, 32, 3), number, dtype=np.uint8) for number in range(count))
+
+
+@pytest.fixture(autouse=True)
+def ffmpeg():
+    try:
+        encoder.find_ffmpeg()
+    except ValueError:
+        pytest.skip("ffmpeg is not found")
+
+
+def test_video_example_is_encoded(tmp_path):
+    path = tmp_path / "video_output_example.mp4"
+    count = controllers.encode_video_example(model(), frames(8), INIT_KWARGS, {}, 4, path)
+    assert count == 8
+    assert path.stat().st_size > 0
+
+
+def test_model_error_is_not_hidden_by_ffmpeg(tmp_path):
+    # ffmpeg fails too, it can not write to the missing directory
+    path = tmp_path / "missing" / "video_output_example.mp4"
+    with pytest.raises(RuntimeError, match="model failed"):
+        controllers.encode_video_example(
+            model(fail_after=2), frames(8), INIT_KWARGS, {}, 4, path
+        )
+
+
+def test_incomplete_video_is_removed(tmp_path):
+    path = tmp_path / "video_output_example.mp4"
+    with pytest.raises(RuntimeError, match="model failed"):
+        controllers.encode_video_example(
+            model(fail_after=2), frames(8), INIT_KWARGS, {}, 4, path
+        )
+    assert not path.exists()
@@ -0,0 +1,40 @@
+"""
+Attribution of the image history to the Dockerfile instructions
+"""
+
+from visionhub_cli.src import image_layers
+from visionhub_cli.src.build_context import CONTEXT_HASH_LABEL
+
+DOCKERFILE = """FROM python:3.9
+RUN pip install --no-cache-dir numpy
+COPY . /app
+"""
+# newest first, as docker returns it; the classic builder appends the build labels
+HISTORY = [
+    {"CreatedBy": f"/bin/sh -c #(nop)  LABEL {CONTEXT_HASH_LABEL}=abc", "Size": 0},
+    {"CreatedBy": "/bin/sh -c #(nop) COPY dir:1234 in /app ", "Size": 50_000_000},
+    {"CreatedBy": "/bin/sh -c pip install --no-cache-dir numpy", "Size": 30_000_000},
+    {"CreatedBy": '/bin/sh -c #(nop)  CMD ["python3"]', "Size": 0},
+    {"CreatedBy": "/bin/sh -c #(nop) ADD file:base in / ", "Size": 100_000_000},
+]
+
+
+def test_build_label_entry_does_not_shift_instructions(tmp_path):
+    (tmp_path / "Dockerfile").write_text(DOCKERFILE)
+    instructions = image_layers.final_stage(image_layers.read_dockerfile(tmp_path))
+    layers = image_layers.image_layers(HISTORY, instructions)
+
+    own = [layer for layer in layers if not layer.base]
+    assert [layer.instruction for layer in own] == instructions
+    assert [layer.size for layer in own] == [30_000_000, 50_000_000]
+    assert sum(layer.size for layer in layers if layer.base) == 100_000_000
+
+    warnings = image_layers.find_bloat(tmp_path, layers)
+    assert any("COPY . /app" in warning for warning in warnings)
+
+
+def test_history_without_label_entry(tmp_path):
+    (tmp_path / "Dockerfile").write_text(DOCKERFILE)
+    instructions = image_layers.final_stage(image_layers.read_dockerfile(tmp_path))
+    layers = image_layers.image_layers(HISTORY[1:], instructions)
+    assert [layer.instruction for layer in layers if not layer.base] == instructions
@@ -0,0 +1,118 @@
+"""
+Load test of a runner that loads its model slower than the result timeout
+"""
+
+import time
+import pickle
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+zmq = pytest.importorskip("zmq")
+
+from visionhub_cli.src import controllers, loadtest  # noqa: E402
+
+from fake_runner import FakeClient, free_ports  # noqa: E402
+
+LOAD_SECONDS = 1.5
+
+
+def slow_runner(dataset_addr: str, result_addr: str, stop: threading.Event):
+    context = zmq.Context()
+    dataset = context.socket(zmq.PULL)
+    dataset.bind(dataset_addr)
+    result = context.socket(zmq.PUSH)
+    result.bind(result_addr)
+    time.sleep(LOAD_SECONDS)  # weights
+    while not stop.is_set():
+        if dataset.poll(50):
+            sample = dataset.recv_pyobj()
+            result.send_pyobj({"id": sample["id"], "prediction": {}})
+    dataset.close(linger=0)
+    result.close(linger=0)
+    context.term()
+
+
+@pytest.fixture
+def addresses():
+    dataset_port, result_port = free_ports(2)
+    dataset_addr = f"tcp://127.0.0.1:{dataset_port}"
+    result_addr = f"tcp://127.0.0.1:{result_port}"
+    stop = threading.Event()
+    runner = threading.Thread(target=slow_runner, args=(dataset_addr, result_addr, stop))
+    runner.start()
+    yield dataset_addr, result_addr
+    stop.set()
+    runner.join()
+
+
+def test_slow_loading_model_is_not_saturated_after_warmup(addresses):
+    # result timeout is shorter than the model load
+    stand_in = loadtest.QueueStandIn(*addresses, timeout=0.5)
+    samples = [{"image": None, "meta": {}}]
+    try:
+        waited = stand_in.wait_ready(samples[0], timeout=10)
+        result = loadtest.LoadGenerator(stand_in, samples).run(10, 1, 0.5)
+    finally:
+        stand_in.close()
+    assert waited >= LOAD_SECONDS * 0.5
+    assert result.received == result.sent
+    assert not result.saturated
+
+
+def test_wait_ready_fails_when_model_exits(addresses):
+    stand_in = loadtest.QueueStandIn(*addresses, timeout=0.5)
+    try:
+        with pytest.raises(ValueError, match="exited"):
+            stand_in.wait_ready({"meta": {}}, timeout=10, is_alive=lambda: False)
+    finally:
+        stand_in.close()
+
+
+def test_packed_layout_test_data_and_runner_ports(tmp_path, monkeypatch):
+    images = tmp_path / "test_data" / "images"
+    images.mkdir(parents=True)
+    with open(images / "sample.pickle", "wb") as file_:
+        pickle.dump({"image": [[0]], "meta": {}}, file_)
+    client = FakeClient()
+    config = SimpleNamespace(link="models/stub:v1", batch_size=1)
+    monkeypatch.setattr(controllers.config_processor, "read_config", lambda path: config)
+    monkeypatch.setattr(controllers, "docker_client", lambda client_=None: client)
+    dataset_port, result_port = free_ports(2)
+
+    results = controllers.loadtest(
+        tmp_path / "model.yaml",
+        f"tcp://localhost:{dataset_port}",
+        f"tcp://localhost:{result_port}",
+        [10],
+        1,
+        0.3,
+        test_data=tmp_path / "test_data",
+        run_container=True,
+        ready_timeout=10,
+    )
+
+    assert results and results[0].received == results[0].sent
+    # the runner binds its own ports, only the host side comes from the addresses
+    _, _, ports = client.containers.started[0]
+    assert ports == {
+        f"{controllers.RUNNER_DATASET_PORT}/tcp": dataset_port,
+        f"{controllers.RUNNER_RESULT_PORT}/tcp": result_port,
+    }
+    assert client.containers.container.removed
+
+
+def test_empty_test_data_is_reported(tmp_path, capsys):
+    (tmp_path / "test_data").mkdir()
+    results = controllers.loadtest(
+        tmp_path / "model.yaml",
+        "tcp://localhost:1",
+        "tcp://localhost:2",
+        [1],
+        1,
+        1.0,
+        test_data=tmp_path / "test_data",
+    )
+    assert results is None
+    assert "There is no test data" in capsys.readouterr().out
@@ -0,0 +1,27 @@
+"""
+Background decoding of the frames stops before the reader is closed
+"""
+
+import time
+
+from visionhub_cli.src import local_model
+
+
+def test_closed_prefetch_waits_for_the_producer():
+    reading = []
+
+    def frames():
+        for number in range(100):
+            reading.append(number)
+            time.sleep(0.05)  # native decode of a frame
+            reading.remove(number)
+            yield number
+
+    items = local_model.prefetch(frames(), 2)
+    assert next(items) == 0
+    items.close()
+    assert reading == []
+
+
+def test_prefetch_yields_every_item():
+    assert list(local_model.prefetch(range(10), 3)) == list(range(10))
@@ -0,0 +1,55 @@
+"""
+Performance check of the release benchmarks the built image through its queues
+"""
+
+import pickle
+
+import pytest
+
+zmq = pytest.importorskip("zmq")
+
+from visionhub_cli.src import controllers, config_processor, perf_gate  # noqa: E402
+
+from fake_runner import FakeClient  # noqa: E402
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return config_processor.ModelConfig.construct(
+        slug="stub", link="models/stub:v1", version="v1", batch_size=2
+    )
+
+
+def test_image_is_benchmarked_through_its_queues(config, tmp_path):
+    images = tmp_path / "test_data" / "images"
+    images.mkdir(parents=True)
+    with open(images / "sample.pickle", "wb") as file_:
+        pickle.dump({"image": [[0]], "meta": {}}, file_)
+    client = FakeClient()
+
+    run = controllers.check_performance(tmp_path, config, client)
+
+    assert isinstance(run, perf_gate.PerfRun)
+    assert run.frames_per_second > 0
+    image, environment, ports = client.containers.started[0]
+    assert image == config.link
+    assert environment["TEST_MODE"] == 0
+    container = client.containers.container
+    # warm-up sample and the best of the repeated benchmarks
+    batches = perf_gate.BENCH_BATCHES * perf_gate.BENCH_REPEATS
+    assert container.received == 1 + batches * config.batch_size
+    assert container.removed
+
+
+def test_missing_test_data_fails_the_check(config, tmp_path, capsys):
+    client = FakeClient()
+    assert not controllers.check_performance(tmp_path, config, client)
+    assert "--skip-perf-check" in capsys.readouterr().out
+    assert client.containers.started == []
+
+
+def test_missing_perf_extra_is_reported(config, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(perf_gate, "missing_modules", lambda: ["zmq"])
+    assert not controllers.check_performance(tmp_path, config, FakeClient())
+    assert "visionhub-cli[perf]" in capsys.readouterr().out
@@ -0,0 +1,112 @@
+"""
+Push progress of the streamed events, retries and the JSON summary
+"""
+
+import json
+
+import docker
+import pytest
+
+from visionhub_cli.src import config_processor, controllers, mock_registry, push_progress
+
+from conftest import IMAGE_CONFIG, PUSHED_DIGEST, FakeApi, FakeClient
+
+
+def pushing(layer_id, current, total):
+    return {
+        "status": "Pushing",
+        "id": layer_id,
+        "progressDetail": {"current": current, "total": total},
+    }
+
+
+class FlakyApi(FakeApi):
+    """
+    Push of the first `failures` attempts breaks after the first layer
+    """
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def push(self, repository, tag, stream, decode):
+        self.pushes.append((repository, tag))
+        yield {"status": "The push refers to repository [models/stub]"}
+        if len(self.pushes) > 1:
+            yield {"status": "Layer already exists", "id": "first"}
+        else:
+            yield pushing("first", 50, 100)
+            yield {"status": "Pushed", "id": "first"}
+        if len(self.pushes) <= self.failures:
+            raise docker.errors.APIError("connection reset")
+        yield pushing("second", 30, 30)
+        yield {"status": "Pushed", "id": "second"}
+        yield {"status": "Layer already exists", "id": "base"}
+        yield {"status": f"{tag}: digest: {PUSHED_DIGEST} size: 1"}
+
+
+@pytest.fixture
+def push_env(registry, tmp_path):
+    link = f"{registry.address}/models/stub:v1"
+    config = config_processor.ModelConfig.construct(slug="stub", link=link)
+    return config, tmp_path / "push.json"
+
+
+def read_summary(path):
+    with open(path) as file_:
+        return json.load(file_)
+
+
+def test_tracker_counts_layers_and_bytes():
+    tracker = push_progress.PushTracker()
+    for event in FlakyApi(failures=0).push("models/stub", "v1", True, True):
+        tracker.update(event)
+    assert [layer.id for layer in tracker.pushed()] == ["first", "second"]
+    assert [layer.id for layer in tracker.skipped()] == ["base"]
+    assert tracker.uploaded_bytes() == 130
+    assert tracker.digest == PUSHED_DIGEST
+
+
+def test_tracker_raises_registry_error():
+    tracker = push_progress.PushTracker()
+    with pytest.raises(push_progress.PushError, match="denied"):
+        tracker.update({"error": "denied: requested access to the resource is denied"})
+
+
+def test_retried_push_counts_layer_of_failed_attempt_as_pushed(push_env):
+    config, summary_path = push_env
+    client = FakeClient(FlakyApi(failures=1))
+    assert controllers.push(
+        None, config, client, backoff=0, summary_path=summary_path
+    )
+    summary = read_summary(summary_path)
+    assert summary["ok"] and not summary["skipped"]
+    assert summary["attempts"] == 2
+    assert summary["layers_pushed"] == 2
+    assert summary["layers_skipped"] == 1
+    assert summary["total_bytes"] == 130
+    assert summary["digest"] == PUSHED_DIGEST
+
+
+def test_push_fails_after_the_last_retry(push_env, capsys):
+    config, summary_path = push_env
+    client = FakeClient(FlakyApi(failures=3))
+    assert not controllers.push(
+        None, config, client, retries=2, backoff=0, summary_path=summary_path
+    )
+    summary = read_summary(summary_path)
+    assert not summary["ok"]
+    assert summary["attempts"] == 3
+    assert "connection reset" in summary["error"]
+    assert "Can not push image" in capsys.readouterr().out
+
+
+def test_push_is_skipped_when_registry_has_the_image(push_env, registry):
+    config, summary_path = push_env
+    mock_registry.seed_image(registry, "models/stub", "v1", IMAGE_CONFIG, [b"l1", b"l2"])
+    client = FakeClient()
+    assert controllers.push(None, config, client, summary_path=summary_path)
+    assert client.api.pushes == []
+    summary = read_summary(summary_path)
+    assert summary["ok"] and summary["skipped"]
+    assert summary["attempts"] == 0
@@ -0,0 +1,62 @@
+"""
+Push check against the registry stand-in
+"""
+
+import hashlib
+
+import requests
+
+from visionhub_cli.src import controllers, mock_registry, registry as registry_
+
+from conftest import IMAGE_CONFIG, IMAGE_ID, FakeClient
+
+OTHER_CONFIG = dict(IMAGE_CONFIG, rootfs={"type": "layers", "diff_ids": ["sha256:" + "d" * 64]})
+
+
+def link(registry) -> str:
+    return f"{registry.address}/models/stub:v1"
+
+
+def test_chunked_blob_upload(registry):
+    url = f"http://{registry.address}/v2/models/stub/blobs/uploads/"
+    location = requests.post(url).headers["Location"]
+    chunks = [b"layer ", b"in ", b"chunks"]
+    response = requests.patch(f"http://{registry.address}{location}", data=iter(chunks))
+    assert response.status_code == 202
+    data = b"".join(chunks)
+    digest = "sha256:" + hashlib.sha256(data).hexdigest()
+    response = requests.put(f"http://{registry.address}{location}?digest={digest}")
+    assert response.status_code == 201
+    assert registry.blobs[digest] == data
+
+
+def test_fetch_remote_of_matching_image(registry):
+    mock_registry.seed_image(registry, "models/stub", "v1", IMAGE_CONFIG, [b"l1", b"l2"])
+    remote = registry_.fetch_remote(link(registry), {"os": "linux", "architecture": "amd64"})
+    assert remote.image_id == IMAGE_ID
+    assert remote.diff_ids == IMAGE_CONFIG["rootfs"]["diff_ids"]
+
+
+def test_fetch_remote_of_other_image(registry):
+    mock_registry.seed_image(registry, "models/stub", "v1", OTHER_CONFIG, [b"l3"])
+    remote = registry_.fetch_remote(link(registry), {"os": "linux", "architecture": "amd64"})
+    assert remote.image_id != IMAGE_ID
+    assert remote.diff_ids == OTHER_CONFIG["rootfs"]["diff_ids"]
+
+
+def test_fetch_remote_of_missing_tag(registry):
+    assert registry_.fetch_remote(link(registry), {"os": "linux"}) is None
+
+
+def test_is_pushed_when_registry_has_the_image(registry, capsys):
+    mock_registry.seed_image(registry, "models/stub", "v1", IMAGE_CONFIG, [b"l1", b"l2"])
+    client = FakeClient()
+    assert controllers.is_pushed(link(registry), client.api.image, client)
+    assert "Registry already has" in capsys.readouterr().out
+
+
+def test_is_not_pushed_when_registry_has_other_image(registry, capsys):
+    mock_registry.seed_image(registry, "models/stub", "v1", OTHER_CONFIG, [b"l3"])
+    client = FakeClient()
+    assert not controllers.is_pushed(link(registry), client.api.image, client)
+    assert "2 of 2 layers are not in the registry" in capsys.readouterr().out
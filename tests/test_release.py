@@ -0,0 +1,82 @@
+"""
+Release of an image whose build context label is up to date
+"""
+
+from pathlib import Path
+
+import pytest
+
+from visionhub_cli.src import controllers, config_processor, mock_registry
+
+from conftest import IMAGE_CONFIG, FakeClient
+
+
+@pytest.fixture
+def release_env(registry, monkeypatch):
+    link = f"{registry.address}/models/stub:v1"
+    config = config_processor.ModelConfig.construct(slug="stub", link=link, version="v1")
+    client = FakeClient()
+    deploys = []
+    monkeypatch.setattr(config_processor, "read_config", lambda path: config)
+    monkeypatch.setattr(controllers, "docker_client", lambda client_=None: client)
+    monkeypatch.setattr(controllers, "read_token", lambda address: "token")
+    monkeypatch.setattr(controllers, "is_deployed", lambda address, token, slug: True)
+    monkeypatch.setattr(controllers, "prepare_deploy", lambda *args: ({}, {}, {}))
+    monkeypatch.setattr(controllers, "is_up_to_date", lambda *args, **kwargs: True)
+    monkeypatch.setattr(controllers, "check_image_size", lambda *args: True)
+    benchmarks = []
+    monkeypatch.setattr(
+        controllers, "check_performance", lambda *args: benchmarks.append(args) or True
+    )
+    monkeypatch.setattr(
+        controllers, "send_deploy", lambda *args: deploys.append(args) or True
+    )
+    return client, deploys, benchmarks
+
+
+def release(directory: Path, **kwargs) -> bool:
+    return controllers.release(directory, directory / "model.yaml", "http://mock", **kwargs)
+
+
+def test_built_locally_never_pushed_is_pushed_before_deploy(release_env, registry, tmp_path):
+    client, deploys, benchmarks = release_env
+    assert release(tmp_path)
+    assert len(benchmarks) == 1
+    assert client.api.pushes == [(f"{registry.address}/models/stub", "v1")]
+    assert len(deploys) == 1
+
+
+def test_up_to_date_image_already_in_registry_is_not_pushed(release_env, registry, tmp_path):
+    client, deploys, benchmarks = release_env
+    mock_registry.seed_image(registry, "models/stub", "v1", IMAGE_CONFIG, [b"l1", b"l2"])
+    assert release(tmp_path)
+    assert benchmarks == []
+    assert client.api.pushes == []
+    assert len(deploys) == 1
+
+
+def test_skip_perf_check_does_not_benchmark(release_env, monkeypatch, tmp_path):
+    client, deploys, benchmarks = release_env
+    assert release(tmp_path, skip_perf_check=True)
+    assert benchmarks == []
+    assert len(deploys) == 1
+
+
+def test_release_all_model_is_benchmarked_before_push(release_env, registry, tmp_path):
+    client, deploys, benchmarks = release_env
+    config = controllers.config_processor.read_config(None)
+    durations = controllers.release_model(tmp_path, tmp_path / "model.yaml", config, client)
+    assert len(benchmarks) == 1
+    assert list(durations) == ["check size", "check performance", "push"]
+    assert client.api.pushes == [(f"{registry.address}/models/stub", "v1")]
+
+
+def test_release_all_model_already_in_registry_is_not_benchmarked(
+    release_env, registry, tmp_path
+):
+    client, deploys, benchmarks = release_env
+    mock_registry.seed_image(registry, "models/stub", "v1", IMAGE_CONFIG, [b"l1", b"l2"])
+    config = controllers.config_processor.read_config(None)
+    controllers.release_model(tmp_path, tmp_path / "model.yaml", config, client)
+    assert benchmarks == []
+    assert client.api.pushes == []
@@ -0,0 +1,45 @@
+"""
+Base images of release --all: registry first, then the local image
+"""
+
+import docker
+import pytest
+
+from visionhub_cli.src import controllers
+
+
+class FakeImages:
+    def __init__(self, remote=(), local=()):
+        self.remote = set(remote)
+        self.local = set(local)
+
+    def pull(self, repository, tag):
+        if f"{repository}:{tag}" not in self.remote:
+            raise docker.errors.NotFound("manifest unknown")
+        self.local.add(f"{repository}:{tag}")
+
+    def get(self, image):
+        if image not in self.local:
+            raise docker.errors.ImageNotFound(f"No such image: {image}")
+        return image
+
+
+class FakeClient:
+    def __init__(self, images):
+        self.images = images
+
+
+def test_pulls_remote_base_image():
+    images = FakeImages(remote={"python:3.9"})
+    assert controllers.pull_base_image(FakeClient(images), "python:3.9")
+    assert "python:3.9" in images.local
+
+
+def test_uses_local_base_image_missing_in_registries():
+    images = FakeImages(local={"team/base:dev"})
+    assert controllers.pull_base_image(FakeClient(images), "team/base:dev")
+
+
+def test_fails_without_remote_and_local_base_image():
+    with pytest.raises(ValueError, match="neither in a registry nor local"):
+        controllers.pull_base_image(FakeClient(FakeImages()), "team/base:dev")
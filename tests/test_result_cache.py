@@ -0,0 +1,55 @@
+"""
+Result cache of models whose output depends on `init` and on the earlier calls
+"""
+
+from types import SimpleNamespace
+
+from visionhub_cli.src import result_cache
+
+SAMPLES = [{"image": None, "meta": {"frame": number}} for number in range(4)]
+
+
+def fps_model():
+    state = {"fps": 0}
+    return SimpleNamespace(
+        init=lambda fps, **kwargs: state.update(fps=fps),
+        predict_batch=lambda samples, draw=True: [
+            {"prediction": {"fps": state["fps"]}} for _ in samples
+        ],
+    )
+
+
+def mixer_model():
+    state = {"chunk": 0}
+
+    def predict_batch(samples, draw=True):
+        results = []
+        for _ in samples:
+            results.append({"prediction": {}, "sound": state["chunk"]})
+            state["chunk"] += 1
+        return results
+
+    return SimpleNamespace(init=lambda **kwargs: state.update(chunk=0), predict_batch=predict_batch)
+
+
+def test_init_kwargs_are_part_of_the_key():
+    model = result_cache.CachedModel(fps_model(), result_cache.ResultCache("v1"))
+    model.init(fps=25)
+    assert model.predict_batch(SAMPLES)[0]["prediction"] == {"fps": 25}
+    model.init(fps=30)
+    assert model.predict_batch(SAMPLES)[0]["prediction"] == {"fps": 30}
+    model.init(fps=25)
+    assert model.predict_batch(SAMPLES)[0]["prediction"] == {"fps": 25}
+    assert model.cache.stats.hits == len(SAMPLES)
+
+
+def test_stateful_model_is_not_replayed(tmp_path):
+    for _ in range(2):
+        cache = result_cache.ResultCache("v1", directory=tmp_path)
+        model = result_cache.CachedModel(mixer_model(), cache)
+        model.init(fps=25)
+        first = model.predict_batch(SAMPLES[:2]) + model.predict_batch(SAMPLES[2:])
+        model.init(fps=25)
+        second = model.predict_batch(SAMPLES)
+        assert [result["sound"] for result in first + second] == [0, 1, 2, 3] * 2
+        assert cache.stats.hits == 0
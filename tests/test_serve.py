@@ -0,0 +1,53 @@
+"""
+Warm-up of the serving workers and a round trip through the queues
+"""
+
+import threading
+
+import pytest
+
+zmq = pytest.importorskip("zmq")
+
+from visionhub_cli.src import loadtest, serve  # noqa: E402
+
+from fake_runner import free_ports  # noqa: E402
+
+MODEL = """
+import time
+
+time.sleep(0.3)  # weights
+
+
+def predict_batch(samples, draw=True):
+    return [{"prediction": {"size": len(samples)}} for _ in samples]
+"""
+
+
+def batcher(directory, workers):
+    dataset_port, result_port = free_ports(2)
+    addresses = f"tcp://127.0.0.1:{dataset_port}", f"tcp://127.0.0.1:{result_port}"
+    return serve.DynamicBatcher(directory, *addresses, 2, 0.01, workers), addresses
+
+
+def test_every_worker_loads_the_model_before_serving(tmp_path):
+    (tmp_path / "model.py").write_text(MODEL)
+    server, addresses = batcher(tmp_path, 3)
+    pids = server.warmup()
+    assert len(pids) == 3
+
+    thread = threading.Thread(target=server.serve, args=(2.0,))
+    thread.start()
+    stand_in = loadtest.QueueStandIn(*addresses, timeout=2)
+    try:
+        stand_in.send({"image": None, "meta": {}, "id": 7})
+        assert stand_in.receive() == {"prediction": {"size": 1}, "id": 7}
+    finally:
+        stand_in.close()
+        thread.join()
+
+
+def test_broken_model_fails_the_warmup(tmp_path):
+    (tmp_path / "model.py").write_text("raise RuntimeError('no weights')\n")
+    server, _ = batcher(tmp_path, 2)
+    with pytest.raises(ValueError, match="can not load the model"):
+        server.warmup()
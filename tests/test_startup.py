@@ -0,0 +1,26 @@
+"""
+Startup budget of the CLI: `python -X importtime -m visionhub_cli --help`
+"""
+
+from visionhub_cli.src import importtime
+
+BUDGET_MS = 150.0
+REPEAT = 3
+
+
+def test_help_does_not_import_heavy_modules():
+    records = importtime.measure_import_time(["--help"])
+    assert records, "-X importtime produced no report"
+    imported = {record.module.split(".")[0] for record in records}
+    assert not imported & set(importtime.HEAVY_MODULES)
+
+
+def test_help_fits_startup_budget():
+    # best of several runs, a single run is noisy on a loaded machine
+    costs = [
+        importtime.top_level_cost(importtime.measure_import_time(["--help"])).get(
+            "visionhub_cli", 0
+        )
+        for _ in range(REPEAT)
+    ]
+    assert min(costs) / 1000 <= BUDGET_MS
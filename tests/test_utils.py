@@ -0,0 +1,53 @@
+"""
+Lazy imports are finished before the modules are shared between threads,
+output of the parallel stages is prefixed line by line
+"""
+
+import subprocess
+import sys
+import threading
+
+import click
+
+from visionhub_cli.src.utils import output_prefix, prefixed_stdout
+
+SCRIPT = """
+import sys
+from types import ModuleType
+from visionhub_cli.src.utils import lazy_import, load_lazy_modules
+
+module = lazy_import("colorsys")
+assert type(module) is not ModuleType
+load_lazy_modules(module)
+assert type(module) is ModuleType and "rgb_to_hsv" in vars(module)
+"""
+
+
+def test_load_lazy_modules_finishes_the_import():
+    # a fresh interpreter, the module must not be imported yet
+    subprocess.run([sys.executable, "-c", SCRIPT], check=True)
+
+
+def test_parallel_output_is_prefixed_by_line(capsys):
+    barrier = threading.Barrier(2)
+
+    def stage(name):
+        with output_prefix(f"[{name}] "):
+            click.echo("Step 1/2", nl=False)
+            barrier.wait()
+            click.echo(" done")
+            click.echo("Step 2/2")
+
+    with prefixed_stdout():
+        threads = [threading.Thread(target=stage, args=(name,)) for name in ("a", "b")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        click.echo("Done")
+
+    lines = capsys.readouterr().out.splitlines()
+    assert sorted(lines) == sorted(
+        [f"[{name}] {line}" for name in "ab" for line in ("Step 1/2 done", "Step 2/2")]
+        + ["Done"]
+    )
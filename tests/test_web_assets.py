@@ -0,0 +1,38 @@
+"""
+Web assets are cached by the source hash and written through unique temporary files
+"""
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from visionhub_cli.src import web_assets  # noqa: E402
+
+
+def test_source_is_hashed_once_and_cached(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "preview.png"
+    image = np.random.default_rng(0).integers(0, 255, (2000, 1000, 3), dtype=np.uint8)
+    cv2.imwrite(str(source), image)
+    hashed = []
+    hash_file = web_assets.hash_file
+    monkeypatch.setattr(
+        web_assets, "hash_file", lambda path: hashed.append(path) or hash_file(path)
+    )
+
+    first = web_assets.optimize({"preview": source}, workers=1)
+    second = web_assets.optimize({"preview": source}, workers=1)
+
+    assert hashed == [source, source]
+    assert not first[0].cached and second[0].cached
+    assert first[0].path == second[0].path
+    assert first[0].path.name == "preview.jpg"
+    assert list(first[0].path.parent.glob("*.tmp")) == []
+
+
+def test_temporary_paths_are_unique(tmp_path):
+    path = tmp_path / "preview.jpg"
+    first, second = web_assets.temporary_path(path), web_assets.temporary_path(path)
+    assert first != second
+    assert first.parent == tmp_path and first.suffix == ".tmp"
@@ -7,6 +7,7 @@ from pathlib import Path
 import click
 
 from .src import controllers
+from .src.utils import parse_int_list, parse_float_list
 
 VERSION = "0.2.7"
 
@@ -56,41 +57,146 @@ def generate_template(config_file: str):
 @click.argument("directory", required=False, default=".")
 @click.argument("config_file", required=False, default=".visionhub/model.yaml")
 @click.option("-a", "--address", default="https://api.visionhub.ru")
-def release(address: str, directory: Optional[str], config_file: Optional[str]):
+@click.option("--force", is_flag=True, help="Build, test and push even if nothing changed")
+@click.option(
+    "--all",
+    "release_all",
+    is_flag=True,
+    help="Build, test and push every model with .visionhub/model.yaml under DIRECTORY",
+)
+@click.option("-w", "--workers", default=4, help="Parallel models for --all")
+@click.option(
+    "--max-throughput-drop",
+    default=15.0,
+    help="Allowed throughput drop vs the last released version, percent",
+)
+@click.option(
+    "--max-latency-rise",
+    default=15.0,
+    help="Allowed p95 latency rise vs the last released version, percent",
+)
+@click.option("--accept-regression", is_flag=True, help="Push even if the model got slower")
+@click.option(
+    "--skip-perf-check",
+    is_flag=True,
+    help="Push without benchmarking the image, e.g. if there is no test_data",
+)
+@click.option(
+    "--optimize-assets",
+    is_flag=True,
+    help="Send downscaled and recompressed preview and examples",
+)
+def release(
+    address: str,
+    directory: Optional[str],
+    config_file: Optional[str],
+    force: bool,
+    release_all: bool,
+    workers: int,
+    max_throughput_drop: float,
+    max_latency_rise: float,
+    accept_regression: bool,
+    skip_perf_check: bool,
+    optimize_assets: bool,
+):
     """
     Build model and push results to the docker registry
     """
-    controllers.build(Path(directory), Path(config_file))
-    click.echo("Run tests ...")
-    if not controllers.test(config_file):
-        click.echo("You cannot push model if test are failed")
+    if release_all:
+        controllers.release_all(
+            Path(directory),
+            workers,
+            force=force,
+            skip_perf_check=skip_perf_check,
+            max_throughput_drop=max_throughput_drop,
+            max_latency_rise=max_latency_rise,
+            accept_regression=accept_regression,
+        )
         return
-    controllers.push(Path(config_file))
-    controllers.deploy(address, Path(config_file))
+    controllers.release(
+        Path(directory),
+        Path(config_file),
+        address,
+        force=force,
+        max_throughput_drop=max_throughput_drop,
+        max_latency_rise=max_latency_rise,
+        accept_regression=accept_regression,
+        optimize_assets=optimize_assets,
+        skip_perf_check=skip_perf_check,
+    )
 
 
 @main.command()
 @click.argument("directory", required=False, default=".")
 @click.argument("config_file", required=False, default=".visionhub/model.yaml")
-def build(directory: Optional[str], config_file: Optional[str]):
+@click.option("--force", is_flag=True, help="Build even if nothing changed")
+@click.option(
+    "--log-format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    help="json prints every build event as a JSON line",
+)
+@click.option("--history", default=None, help="Append JSON summary of the build to the file")
+def build(
+    directory: Optional[str],
+    config_file: Optional[str],
+    force: bool,
+    log_format: str,
+    history: Optional[str],
+):
     """
     Build model using `docker build`
     """
-    controllers.build(Path(directory), Path(config_file))
+    controllers.build(
+        Path(directory),
+        Path(config_file),
+        force=force,
+        log_format=log_format,
+        history_path=Path(history) if history else None,
+    )
 
 
 @main.command()
 @click.argument("config_file", required=False, default=".visionhub/model.yaml")
-def test(config_file: Optional[str]):
+@click.option("--profile", is_flag=True, help="Measure memory, CPU and time per batch size")
+@click.option(
+    "--batch-sizes",
+    default="1",
+    callback=parse_int_list,
+    help="Batch sizes for --profile, batch_size of the config is always added",
+)
+def test(config_file: Optional[str], profile: bool, batch_sizes: list):
     """
     Build model using `docker build`
     """
+    if profile:
+        controllers.profile_test(Path(config_file), batch_sizes)
+        return
     controllers.test(Path(config_file))
 
 
 @main.command()
 @click.argument("config_file", required=False, default=".visionhub/model.yaml")
-def push(config_file: Optional[str]):
+@click.option("-n", "--runs", default=5, help="Container starts to measure")
+@click.option(
+    "--result-pattern",
+    default="prediction",
+    help="Regular expression of the log line with the first result",
+)
+@click.option("--timeout", default=300.0, help="Seconds to wait for one test run")
+def coldstart(config_file: Optional[str], runs: int, result_pattern: str, timeout: float):
+    """
+    Measure time from `docker run` to the first result of the test run
+    """
+    controllers.coldstart(Path(config_file), runs, result_pattern, timeout)
+
+
+@main.command()
+@click.argument("config_file", required=False, default=".visionhub/model.yaml")
+@click.option("--retries", default=3, help="Retries of the failed push")
+@click.option("--summary", default=None, help="Write JSON summary of the push to the file")
+@click.option("--force", is_flag=True, help="Push even if the registry has the same image")
+def push(config_file: Optional[str], retries: int, summary: Optional[str], force: bool):
     """
     Push model to the docker registry
     """
@@ -98,21 +204,329 @@ def push(config_file: Optional[str]):
     if not controllers.test(config_file):
         click.echo("You cannot push model if test are failed")
         return
-    controllers.push(Path(config_file))
+    controllers.push(
+        Path(config_file),
+        retries=retries,
+        summary_path=Path(summary) if summary else None,
+        force=force,
+    )
 
 
 @main.command()
 @click.argument("config_file", required=False, default=".visionhub/model.yaml")
 @click.option("-a", "--address", default="https://api.visionhub.ru")
-def deploy(config_file: Optional[str], address: str):
+@click.option("--dry-run", is_flag=True, help="Show changed fields and size, send nothing")
+@click.option("--force", is_flag=True, help="Send all fields, ignore last deploy")
+@click.option(
+    "--optimize-assets",
+    is_flag=True,
+    help="Send downscaled and recompressed preview and examples",
+)
+def deploy(
+    config_file: Optional[str],
+    address: str,
+    dry_run: bool,
+    force: bool,
+    optimize_assets: bool,
+):
     """
     Deploy model to the visionhub platform
     """
+    if dry_run:
+        controllers.deploy(
+            address,
+            Path(config_file),
+            dry_run=True,
+            force=force,
+            optimize_assets=optimize_assets,
+        )
+        return
     click.echo("Run tests ...")
     if not controllers.test(config_file):
         click.echo("You cannot push model if test are failed")
         return
-    controllers.deploy(address, Path(config_file))
+    controllers.deploy(
+        address, Path(config_file), force=force, optimize_assets=optimize_assets
+    )
+
+
+@main.command()
+@click.argument("directory", required=False, default=".")
+@click.option(
+    "--test-data", default="test_data", help="Directory with images/ and videos/ or .vhds file"
+)
+@click.option(
+    "--batch-sizes", default="1,8,32", callback=parse_int_list, help="Comma separated"
+)
+@click.option("--batches", default=20, help="Measured batches per batch size")
+@click.option("--max-frames", default=64, help="Frames to read from each video")
+@click.option("--cache", is_flag=True, help="Reuse predict_batch results of seen samples")
+@click.option("--cache-size", default=1024, help="Results kept in memory by --cache")
+@click.option("--cache-dir", default=None, help="Also keep results on disk, implies --cache")
+def bench(
+    directory: str,
+    test_data: str,
+    batch_sizes: list,
+    batches: int,
+    max_frames: int,
+    cache: bool,
+    cache_size: int,
+    cache_dir: Optional[str],
+):
+    """
+    Measure throughput and latency of model.py predict_batch in-process
+    """
+    controllers.bench(
+        Path(directory),
+        Path(directory) / test_data,
+        batch_sizes,
+        batches,
+        max_frames,
+        cache=cache,
+        cache_size=cache_size,
+        cache_dir=Path(cache_dir) if cache_dir else None,
+    )
+
+
+@main.command()
+@click.argument("config_file", required=False, default=".visionhub/model.yaml")
+@click.option("--dataset-addr", default="tcp://localhost:5556")
+@click.option("--result-addr", default="tcp://localhost:5555")
+@click.option(
+    "--rates",
+    default="1,2,4,8,16,32",
+    callback=parse_float_list,
+    help="Offered samples/sec, comma separated. Stops at the first saturated rate",
+)
+@click.option("-c", "--concurrency", default=16, help="Maximum samples in flight")
+@click.option("-d", "--duration", default=10.0, help="Seconds per rate")
+@click.option(
+    "--test-data",
+    default=None,
+    help="Directory with images/ and videos/ or .vhds file, synthetic images by default",
+)
+@click.option("--height", default=720, help="Height of synthetic images")
+@click.option("--width", default=1280, help="Width of synthetic images")
+@click.option("--run-container", is_flag=True, help="Start the model image for the test")
+@click.option("--ready-timeout", default=600.0, help="Seconds to wait for the warm-up result")
+def loadtest(
+    config_file: str,
+    dataset_addr: str,
+    result_addr: str,
+    rates: list,
+    concurrency: int,
+    duration: float,
+    test_data: Optional[str],
+    height: int,
+    width: int,
+    run_container: bool,
+    ready_timeout: float,
+):
+    """
+    Load model container through its dataset/result queues and measure throughput
+    """
+    controllers.loadtest(
+        Path(config_file),
+        dataset_addr,
+        result_addr,
+        rates,
+        concurrency,
+        duration,
+        test_data=Path(test_data) if test_data else None,
+        image_size=(height, width),
+        run_container=run_container,
+        ready_timeout=ready_timeout,
+    )
+
+
+@main.command()
+@click.argument("directory", required=False, default=".")
+@click.option("--config", "config_file", default=".visionhub/model.yaml")
+@click.option("--dataset-addr", default="tcp://*:5556")
+@click.option("--result-addr", default="tcp://*:5555")
+@click.option("-w", "--workers", default=None, type=int, help="Default is CPU count, 1 for GPU models")
+@click.option("-b", "--batch-size", default=None, type=int, help="Default is from config")
+@click.option("--max-wait", default=10.0, help="Milliseconds a sample waits for a full batch")
+@click.option("--draw/--no-draw", default=True)
+@click.option("-d", "--duration", default=None, type=float, help="Stop after seconds")
+def serve(
+    directory: str,
+    config_file: str,
+    dataset_addr: str,
+    result_addr: str,
+    workers: Optional[int],
+    batch_size: Optional[int],
+    max_wait: float,
+    draw: bool,
+    duration: Optional[float],
+):
+    """
+    Serve model.py locally through the container queues with dynamic batching
+    """
+    controllers.serve(
+        Path(directory),
+        Path(config_file),
+        dataset_addr,
+        result_addr,
+        workers=workers,
+        batch_size=batch_size,
+        max_wait=max_wait / 1000,
+        draw=draw,
+        duration=duration,
+    )
+
+
+@main.command()
+@click.argument("directory", required=False, default=".")
+@click.option(
+    "--test-data", default="test_data", help="Directory with images/ and videos/ or .vhds file"
+)
+@click.option("--watch", is_flag=True, help="Reload changed modules and run again on every save")
+@click.option("-b", "--batch-size", default=4)
+@click.option("-n", "--samples", default=8, help="Images and frames of every video to run")
+def dev(directory: str, test_data: str, watch: bool, batch_size: int, samples: int):
+    """
+    Run model.py in a long-lived worker on a few samples of test_data
+    """
+    controllers.dev(Path(directory), Path(directory) / test_data, batch_size, samples, watch)
+
+
+@main.command()
+@click.argument("directory", required=False, default=".")
+@click.option("--video", required=True, help="Video or packed .vhds file to run the model on")
+@click.option("--config", "config_file", default=".visionhub/model.yaml")
+@click.option("-b", "--batch-size", default=None, type=int, help="Default is from config")
+@click.option("--prefetch", default=4, help="Decoded batches kept ahead of the model")
+@click.option("--draw/--no-draw", default=True)
+@click.option("-o", "--output", default=None, help="Write predictions as JSON lines")
+@click.option("--cache", is_flag=True, help="Reuse predict_batch results of seen samples")
+@click.option("--cache-size", default=1024, help="Results kept in memory by --cache")
+@click.option("--cache-dir", default=None, help="Also keep results on disk, implies --cache")
+def run(
+    directory: str,
+    video: str,
+    config_file: str,
+    batch_size: Optional[int],
+    prefetch: int,
+    draw: bool,
+    output: Optional[str],
+    cache: bool,
+    cache_size: int,
+    cache_dir: Optional[str],
+):
+    """
+    Run model.py locally on a video the way VID2* modes work
+    """
+    controllers.run_video(
+        Path(directory),
+        Path(video),
+        Path(directory) / config_file,
+        batch_size=batch_size,
+        prefetch_size=prefetch,
+        draw=draw,
+        output_path=Path(output) if output else None,
+        cache=cache,
+        cache_size=cache_size,
+        cache_dir=Path(cache_dir) if cache_dir else None,
+    )
+
+
+@main.command()
+@click.argument("directory", required=False, default=".")
+@click.option(
+    "--test-data", default="test_data", help="Directory with images/ and videos/ or .vhds file"
+)
+@click.option("-b", "--batch-size", default=8)
+@click.option("--batches", default=10, help="Batches of images to run")
+@click.option("--max-frames", default=128, help="Frames to read from each video")
+@click.option("-o", "--output", default="profile.folded", help="Collapsed stacks file")
+@click.option("--interval", default=1.0, help="Sampling interval in milliseconds")
+@click.option("--draw/--no-draw", default=True)
+def profile(
+    directory: str,
+    test_data: str,
+    batch_size: int,
+    batches: int,
+    max_frames: int,
+    output: str,
+    interval: float,
+    draw: bool,
+):
+    """
+    Profile model.py predict_batch on test_data and write flamegraph stacks
+    """
+    controllers.profile(
+        Path(directory),
+        Path(directory) / test_data,
+        batch_size,
+        batches,
+        max_frames,
+        output_path=Path(output),
+        interval=interval / 1000,
+        draw=draw,
+    )
+
+
+@main.group()
+def dataset():
+    """
+    Manage local test data
+    """
+
+
+@dataset.command()
+@click.argument("test_data", required=False, default="test_data")
+@click.option("-o", "--output", default="test_data.vhds")
+@click.option("--max-frames", default=None, type=int, help="Frames to pack from each video")
+@click.option(
+    "--trust-pickles",
+    is_flag=True,
+    help="Convert .pickle samples too. Unpickling runs code, use only for own files",
+)
+def pack(test_data: str, output: str, max_frames: Optional[int], trust_pickles: bool):
+    """
+    Pack images, videos and meta of test data into a memory-mapped .vhds file
+    """
+    controllers.pack_dataset(Path(test_data), Path(output), max_frames, trust_pickles)
+
+
+@main.group()
+def examples():
+    """
+    Manage input and output examples of the model
+    """
+
+
+@examples.command()
+@click.argument("directory", required=False, default=".")
+@click.option("--config", "config_file", default=".visionhub/model.yaml")
+@click.option("-o", "--output-dir", default="assets", help="Directory for the output examples")
+@click.option("-b", "--batch-size", default=None, type=int, help="Default is from config")
+@click.option("--img2vid-seconds", default=5.0, help="Length of the IMG2VID output video")
+@click.option("--img2vid-fps", default=25, help="FPS of the IMG2VID output video")
+@click.option("--audio-fps", default=44100, help="Sample rate of the sound the model returns")
+def generate(
+    directory: str,
+    config_file: str,
+    output_dir: str,
+    batch_size: Optional[int],
+    img2vid_seconds: float,
+    img2vid_fps: int,
+    audio_fps: int,
+):
+    """
+    Run the model on the input examples and write the output examples.
+    Videos are encoded with ffmpeg while the model runs
+    """
+    controllers.generate_examples(
+        Path(directory),
+        Path(directory) / config_file,
+        Path(output_dir),
+        batch_size=batch_size,
+        img2vid_seconds=img2vid_seconds,
+        img2vid_fps=img2vid_fps,
+        audio_fps=audio_fps,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+"""
+HTTP client of the visionhub platform API: one pooled session per address,
+timeouts, retries with exponential backoff on 5xx and connection errors,
+multipart uploads streamed from disk.
+POST and PATCH are not idempotent, they are retried only if the connection
+failed before the request was sent
+"""
+
+import os
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, BinaryIO, List, Mapping, Optional, Tuple, Union
+
+import click
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+RETRY_STATUSES = (500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("get", "head", "options", "put", "delete")
+CHUNK_SIZE = 1 << 16
+
+
+class MultipartStream:
+    """
+    File-like multipart/form-data body, files are read from disk by chunks.
+    Length is known ahead, so the body is sent with Content-Length
+    """
+
+    def __init__(self, data: Mapping[str, Any], files: Mapping[str, Path]):
+        self.boundary = uuid.uuid4().hex
+        self._parts: List[Union[bytes, Path]] = []
+        for name, value in form_fields(data):
+            self._parts.append(self._header(name) + value.encode() + b"\r\n")
+        for name, path in files.items():
+            self._parts.append(self._header(name, os.path.basename(path)))
+            self._parts.append(Path(path))
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode())
+        self.len = sum(
+            part.stat().st_size if isinstance(part, Path) else len(part)
+            for part in self._parts
+        )
+        self._index = 0
+        self._offset = 0
+        self._file: Optional[BinaryIO] = None
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _header(self, name: str, filename: Optional[str] = None) -> bytes:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if filename is not None:
+            header += "Content-Type: application/octet-stream\r\n"
+        return (header + "\r\n").encode()
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.len
+        chunks = []
+        while size > 0 and self._index < len(self._parts):
+            part = self._parts[self._index]
+            if isinstance(part, Path):
+                if self._file is None:
+                    self._file = open(part, "rb")
+                chunk = self._file.read(min(size, CHUNK_SIZE))
+                if not chunk:
+                    self._file.close()
+                    self._file = None
+                    self._index += 1
+                    continue
+            else:
+                chunk = part[self._offset : self._offset + size]
+                self._offset += len(chunk)
+                if self._offset == len(part):
+                    self._offset = 0
+                    self._index += 1
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def form_fields(data: Mapping[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Form fields the same way requests encodes them: lists are repeated, None is skipped
+    """
+    fields = []
+    for name, value in data.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for item in values:
+            if item is not None:
+                fields.append((name, str(item)))
+    return fields
+
+
+def not_sent(exc: Exception) -> bool:
+    """
+    Connection failed before the request was sent, so its retry can not apply it twice
+    """
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    # requests wraps urllib3 MaxRetryError, its reason is the original error
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, NewConnectionError)
+
+
+class ApiClient:
+    """
+    Client of the platform API at `address`
+    """
+
+    def __init__(
+        self,
+        address: str,
+        timeout: Tuple[float, float] = (10, 300),
+        retries: int = 3,
+        backoff: float = 1.0,
+        pool_size: int = 4,
+    ):
+        self.address = address.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        token: Optional[str] = None,
+        data: Optional[Mapping[str, Any]] = None,
+        files: Optional[Mapping[str, Path]] = None,
+    ) -> requests.Response:
+        """
+        Send request, retry on 5xx and connection errors. Non-idempotent methods
+        are retried only on errors of connecting. Files are given as paths and
+        reopened on every attempt
+        """
+        idempotent = method.lower() in IDEMPOTENT_METHODS
+        headers = {}
+        if token is not None:
+            headers["Authorization"] = "Token " + token
+        for attempt in range(self.retries + 1):
+            body = None
+            try:
+                if files:
+                    body = MultipartStream(data or {}, files)
+                    headers["Content-Type"] = body.content_type
+                    headers["Content-Length"] = str(body.len)
+                response = self.session.request(
+                    method,
+                    self.address + path,
+                    data=body if files else data,
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if not idempotent and not not_sent(exc):
+                    raise ValueError(
+                        f"{method.upper()} {path} to {self.address} failed after it was "
+                        f"sent, it is not retried, the server may have applied it: {exc}"
+                    )
+                if attempt == self.retries:
+                    raise ValueError(f"Can not connect to {self.address}: {exc}")
+                reason = type(exc).__name__
+            else:
+                if (
+                    not idempotent
+                    or response.status_code not in RETRY_STATUSES
+                    or attempt == self.retries
+                ):
+                    return response
+                reason = f"status {response.status_code}"
+            finally:
+                if body is not None:
+                    body.close()
+            delay = self.backoff * 2 ** attempt
+            click.echo(f"{method.upper()} {path} failed ({reason}), retry in {delay:.0f}s")
+            time.sleep(delay)
+
+    def get(self, path: str, token: Optional[str] = None) -> requests.Response:
+        return self.request("get", path, token)
+
+
+@lru_cache(maxsize=None)
+def get_client(address: str) -> ApiClient:
+    """
+    Client shared by all commands, keeps connections alive between requests.
+    VISIONHUB_TIMEOUT (read timeout, seconds) and VISIONHUB_RETRIES configure it
+    """
+    return ApiClient(
+        address,
+        timeout=(10, float(os.environ.get("VISIONHUB_TIMEOUT", 300))),
+        retries=int(os.environ.get("VISIONHUB_RETRIES", 3)),
+    )
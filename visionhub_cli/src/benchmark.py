@@ -0,0 +1,119 @@
+"""
+In-process benchmark of the model's predict_batch
+"""
+
+import time
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Sequence
+
+from pydantic import BaseModel
+
+
+class BenchResult(BaseModel):
+    """
+    Measurements of one (source, batch_size, draw) combination
+    """
+
+    source: str
+    batch_size: int
+    draw: bool
+    batches: int
+    frames_per_second: float
+    batch_p50: float
+    batch_p95: float
+    batch_p99: float
+    sample_p50: float
+    sample_p95: float
+    sample_p99: float
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Percentile with linear interpolation, q in [0, 100]
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def make_batches(samples: List[Dict[str, Any]], batch_size: int, count: int):
+    """
+    Cycle over samples to make `count` batches of `batch_size`
+    """
+    for index in range(count):
+        start = index * batch_size
+        yield [samples[(start + i) % len(samples)] for i in range(batch_size)]
+
+
+def measure(
+    model: ModuleType,
+    source: str,
+    samples: List[Dict[str, Any]],
+    batch_size: int,
+    draw: bool,
+    batches: int,
+    warmup: int = 1,
+    before: Callable[[], None] = lambda: None,
+) -> BenchResult:
+    """
+    Run predict_batch on batches of samples and collect latencies.
+    `before` is called once before warmup, e.g. to call model's init
+    """
+    before()
+    for batch in make_batches(samples, batch_size, warmup):
+        model.predict_batch(batch, draw=draw)
+
+    latencies = []
+    for batch in make_batches(samples, batch_size, batches):
+        start = time.perf_counter()
+        model.predict_batch(batch, draw=draw)
+        latencies.append(time.perf_counter() - start)
+    return bench_result(source, batch_size, draw, latencies)
+
+
+def bench_result(
+    source: str, batch_size: int, draw: bool, latencies: List[float]
+) -> BenchResult:
+    """
+    Throughput and percentiles of the batch latencies
+    """
+    batches = len(latencies)
+    per_sample = [latency / batch_size for latency in latencies]
+    total = sum(latencies)
+    return BenchResult(
+        source=source,
+        batch_size=batch_size,
+        draw=draw,
+        batches=batches,
+        frames_per_second=batches * batch_size / total if total else 0.0,
+        batch_p50=percentile(latencies, 50),
+        batch_p95=percentile(latencies, 95),
+        batch_p99=percentile(latencies, 99),
+        sample_p50=percentile(per_sample, 50),
+        sample_p95=percentile(per_sample, 95),
+        sample_p99=percentile(per_sample, 99),
+    )
+
+
+def format_table(results: List[BenchResult]) -> str:
+    """
+    Format results as a plain text table, latencies in milliseconds
+    """
+    header = (
+        f"{'source':<24} {'batch':>5} {'draw':>5} {'fps':>9} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'s_p50':>8} {'s_p95':>8} {'s_p99':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result.source[:24]:<24} {result.batch_size:>5} {str(result.draw):>5} "
+            f"{result.frames_per_second:>9.1f} "
+            f"{result.batch_p50 * 1000:>8.2f} {result.batch_p95 * 1000:>8.2f} "
+            f"{result.batch_p99 * 1000:>8.2f} {result.sample_p50 * 1000:>8.2f} "
+            f"{result.sample_p95 * 1000:>8.2f} {result.sample_p99 * 1000:>8.2f}"
+        )
+    return "\n".join(lines)
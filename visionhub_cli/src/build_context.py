@@ -0,0 +1,81 @@
+"""
+Content hash of the docker build context, stored as an image label
+to skip builds when nothing changed
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import IO, Any, List, Optional, Tuple
+
+from docker.errors import ImageNotFound
+from docker.utils.build import exclude_paths, tar
+
+CONTEXT_HASH_LABEL = "ru.visionhub.cli.context-hash"
+CHUNK_SIZE = 1 << 20
+# tokens, manifests and logs of the cli change on every run, the config is hashed separately
+STATE_DIR = ".visionhub/"
+
+
+def read_dockerignore(directory: Path) -> List[str]:
+    """
+    Read .dockerignore patterns the same way docker-py does
+    """
+    dockerignore = directory / ".dockerignore"
+    if not dockerignore.is_file():
+        return []
+    with open(dockerignore, "r") as file_:
+        lines = [line.strip() for line in file_.read().splitlines()]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def context_files(directory: Path) -> List[str]:
+    """
+    Sorted relative paths of files that docker sends as the build context
+    """
+    paths = exclude_paths(str(directory), read_dockerignore(directory))
+    return sorted(
+        path for path in paths if os.path.isfile(os.path.join(directory, path))
+    )
+
+
+def context_hash(directory: Path, config: Any) -> str:
+    """
+    Hash of file names, modes and contents of the build context and the model config
+    """
+    digest = hashlib.sha256()
+    for relative_path in context_files(directory):
+        if relative_path.startswith(STATE_DIR):
+            continue
+        path = directory / relative_path
+        digest.update(relative_path.encode() + b"\0")
+        digest.update(str(path.stat().st_mode & 0o777).encode() + b"\0")
+        with open(path, "rb") as file_:
+            for chunk in iter(lambda: file_.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+    digest.update(json.dumps(config.dict(), default=str, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def context_archive(directory: Path) -> Tuple[IO[bytes], int]:
+    """
+    Tar of the build context as docker-py makes it, with its size in bytes
+    """
+    archive = tar(str(directory), exclude=read_dockerignore(directory))
+    archive.seek(0, os.SEEK_END)
+    size = archive.tell()
+    archive.seek(0)
+    return archive, size
+
+
+def image_context_hash(api_client: Any, tag: str) -> Optional[str]:
+    """
+    Context hash label of the local image, None if there is no such image
+    """
+    try:
+        image = api_client.inspect_image(tag)
+    except ImageNotFound:
+        return None
+    labels = image.get("Config", {}).get("Labels") or {}
+    return labels.get(CONTEXT_HASH_LABEL)
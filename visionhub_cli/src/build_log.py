@@ -0,0 +1,124 @@
+"""
+Steps, timings and cache hits of the decoded `docker build` stream
+"""
+
+import re
+import time
+import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .utils import format_size
+
+STEP_PATTERN = re.compile(r"^Step (\d+)/(\d+) : (.*)$")
+USING_CACHE = "---> Using cache"
+BUILT_PATTERN = re.compile(r"^Successfully built ([0-9a-f]+)")
+
+
+class BuildStep(BaseModel):
+    """
+    One Dockerfile instruction of the build
+    """
+
+    number: int
+    instruction: str
+    cached: bool = False
+    duration: float = 0.0
+
+
+class BuildSummary(BaseModel):
+    """
+    Machine readable result of the build.
+    fits_max_image_size is None if the config has no max_image_size
+    """
+
+    link: str
+    ok: bool
+    started_at: str
+    context_hash: str = ""
+    context_bytes: int = 0
+    image_id: Optional[str] = None
+    image_size: Optional[int] = None
+    max_image_size: Optional[int] = None
+    fits_max_image_size: Optional[bool] = None
+    duration: float = 0.0
+    steps: List[BuildStep] = []
+    error: Optional[str] = None
+
+    @property
+    def cached_steps(self) -> int:
+        return sum(step.cached for step in self.steps)
+
+
+class BuildTracker:
+    """
+    Consumes decoded build events, a step lasts until the next one starts
+    """
+
+    def __init__(self, link: str, context_hash: str = "", context_bytes: int = 0):
+        self.summary = BuildSummary(
+            link=link,
+            ok=False,
+            started_at=datetime.datetime.now().isoformat(timespec="seconds"),
+            context_hash=context_hash,
+            context_bytes=context_bytes,
+        )
+        self.started = time.perf_counter()
+        self._step_started = self.started
+
+    def update(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Returns event of the structured log for the stream line, if any
+        """
+        if "error" in event:
+            self._finish_step()
+            self.summary.error = event["error"].strip()
+            return {"event": "error", "message": self.summary.error}
+        line = event.get("stream", "").strip()
+        if not line:
+            return None
+        match = STEP_PATTERN.match(line)
+        if match:
+            self._finish_step()
+            step = BuildStep(number=int(match.group(1)), instruction=match.group(3))
+            self.summary.steps.append(step)
+            self._step_started = time.perf_counter()
+            return {"event": "step", "number": step.number, "instruction": step.instruction}
+        if line.startswith(USING_CACHE) and self.summary.steps:
+            self.summary.steps[-1].cached = True
+            return {"event": "cache", "number": self.summary.steps[-1].number}
+        match = BUILT_PATTERN.match(line)
+        if match:
+            self._finish_step()
+            self.summary.image_id = match.group(1)
+        return {"event": "output", "line": line}
+
+    def _finish_step(self):
+        if self.summary.steps and not self.summary.steps[-1].duration:
+            self.summary.steps[-1].duration = time.perf_counter() - self._step_started
+
+    def finish(self) -> BuildSummary:
+        self._finish_step()
+        self.summary.ok = self.summary.error is None
+        self.summary.duration = time.perf_counter() - self.started
+        return self.summary
+
+
+def format_summary(summary: BuildSummary, top: int = 5) -> str:
+    """
+    Totals and the slowest steps of the build
+    """
+    lines = [
+        f"Build {'finished' if summary.ok else 'failed'} in {summary.duration:.1f}s, "
+        f"context {format_size(summary.context_bytes)}, "
+        f"{summary.cached_steps}/{len(summary.steps)} steps from cache"
+    ]
+    slowest = sorted(summary.steps, key=lambda step: step.duration, reverse=True)[:top]
+    for step in slowest:
+        mark = "cached" if step.cached else "built"
+        lines.append(
+            f"  {step.duration:>7.1f}s  {mark:<6}  Step {step.number}: "
+            f"{step.instruction[:60]}"
+        )
+    return "\n".join(lines)
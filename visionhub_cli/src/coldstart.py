@@ -0,0 +1,138 @@
+"""
+Cold start of the model container: time from `docker run` to the first
+log line and to the first result of the test run. Log lines are timed by
+the daemon timestamps against the container start, so the latency of
+attaching to the logs is not counted
+"""
+
+import re
+import time
+import datetime
+import statistics
+import threading
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+# the model returns {"prediction": ...}, the runner logs results in TEST_MODE
+DEFAULT_RESULT_PATTERN = r"prediction"
+# RFC3339 time of the docker daemon, with nanoseconds
+TIMESTAMP_PATTERN = re.compile(
+    r"^(?P<base>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(?P<fraction>\d+))?"
+    r"(?P<zone>Z|[+-]\d\d:\d\d)$"
+)
+
+
+class ColdStartRun(BaseModel):
+    """
+    Seconds since the `docker run` call, None if the event did not happen
+    """
+
+    run: int
+    started: float
+    first_log: Optional[float] = None
+    first_result: Optional[float] = None
+    exited: Optional[float] = None
+    exit_code: Optional[int] = None
+    timed_out: bool = False
+
+
+def parse_timestamp(value: str) -> float:
+    """
+    Seconds since the epoch of the daemon time, e.g. 2021-05-20T10:00:00.123456789Z
+    """
+    match = TIMESTAMP_PATTERN.match(value.strip())
+    if match is None:
+        raise ValueError(f"Unexpected docker timestamp {value!r}")
+    zone = "+00:00" if match.group("zone") == "Z" else match.group("zone")
+    seconds = datetime.datetime.fromisoformat(match.group("base") + zone).timestamp()
+    return seconds + float("0." + (match.group("fraction") or "0"))
+
+
+def measure_run(
+    client: Any,
+    image: str,
+    environment: Dict[str, Any],
+    run: int,
+    result_pattern: str = DEFAULT_RESULT_PATTERN,
+    timeout: float = 300.0,
+) -> ColdStartRun:
+    """
+    Start container and follow its logs until it exits or `timeout` passes.
+    Events after the start are `started` plus their daemon time since StartedAt
+    """
+    pattern = re.compile(result_pattern)
+    start = time.perf_counter()
+    container = client.containers.run(image=image, detach=True, environment=environment)
+    result = ColdStartRun(run=run, started=time.perf_counter() - start)
+    container.reload()
+    started_at = parse_timestamp(container.attrs["State"]["StartedAt"])
+
+    def since_run(timestamp: str) -> float:
+        return result.started + parse_timestamp(timestamp) - started_at
+
+    def on_line(line: bytes):
+        timestamp, _, text = line.decode(errors="replace").partition(" ")
+        if result.first_log is None:
+            result.first_log = since_run(timestamp)
+        if result.first_result is None and pattern.search(text):
+            result.first_result = since_run(timestamp)
+
+    def follow():
+        buffer = b""
+        try:
+            for chunk in container.logs(stream=True, follow=True, timestamps=True):
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    on_line(line)
+            if buffer:
+                on_line(buffer)
+        except Exception:  # log stream is closed when the container is removed
+            pass
+
+    reader = threading.Thread(target=follow, daemon=True)
+    reader.start()
+    try:
+        reader.join(timeout)
+        if reader.is_alive():
+            result.timed_out = True
+        else:
+            result.exit_code = container.wait().get("StatusCode")
+            container.reload()
+            result.exited = since_run(container.attrs["State"]["FinishedAt"])
+    finally:
+        container.remove(force=True)
+    reader.join(5)
+    return result
+
+
+def format_table(runs: List[ColdStartRun], pull_time: Optional[float] = None) -> str:
+    columns = (
+        ("started", "run -> started"),
+        ("first_log", "first log"),
+        ("first_result", "first result"),
+        ("exited", "exited"),
+    )
+    lines = []
+    if pull_time is not None:
+        lines.append(f"Image pull (not cached locally): {pull_time:.2f}s, not included below")
+    lines.append(f"{'run':>4} " + " ".join(f"{title:>15}" for _, title in columns))
+    for run in runs:
+        cells = []
+        for key, _ in columns:
+            value = getattr(run, key)
+            cells.append(f"{value:>14.2f}s" if value is not None else f"{'-':>15}")
+        status = ""
+        if run.timed_out:
+            status = " timeout"
+        elif run.exit_code:
+            status = f" exit {run.exit_code}"
+        lines.append(f"{run.run:>4} " + " ".join(cells) + status)
+    for name, function in (("min", min), ("med", statistics.median), ("max", max)):
+        cells = []
+        for key, _ in columns:
+            values = [getattr(run, key) for run in runs if getattr(run, key) is not None]
+            cells.append(f"{function(values):>14.2f}s" if values else f"{'-':>15}")
+        lines.append(f"{name:>4} " + " ".join(cells))
+    return "\n".join(lines)
@@ -3,6 +3,7 @@ Model config processor using pydantic
 """
 
 import os
+import json
 from typing import Any, List, Callable, Optional, Union
 from pathlib import Path
 from enum import Enum
@@ -149,6 +150,11 @@ class ModelConfig(BaseModel):
         description="Json example of result",
         parse_str=lambda x: x if not os.path.isfile(x) else Path(x),
     )
+    max_image_size: Optional[str] = Field(
+        required=False,
+        description="Maximum size of the docker image, e.g. 2GB, release fails above it",
+        default_if_needed=None,
+    )
 
 
 def model_field_prompt(model_field: ModelField, ctx: dict) -> Any:
@@ -226,3 +232,21 @@ def read_config(config_path: Path) -> ModelConfig:
     with open(config_path, "r") as file_:
         model_dict = yaml.full_load(file_)
         return ModelConfig(**model_dict)
+
+
+def update_config_fields(config_path: Path, fields: dict):
+    """
+    Set top level fields of the config file, comments and order of the other lines are kept
+    """
+    with open(config_path, "r") as file_:
+        lines = file_.read().splitlines()
+    for key, value in fields.items():
+        line = f"{key}: {json.dumps(str(value))}"
+        for i, existing in enumerate(lines):
+            if existing.startswith(f"{key}:"):
+                lines[i] = line
+                break
+        else:
+            lines.append(line)
+    with open(config_path, "w") as file_:
+        file_.write("\n".join(lines) + "\n")
@@ -0,0 +1,122 @@
+"""
+Resource profile of a test run of the model container from `docker stats`
+"""
+
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .utils import format_size
+
+
+class ContainerProfile(BaseModel):
+    """
+    Peak memory, CPU and wall time of one container run
+    """
+
+    batch_size: int
+    exit_code: Optional[int]
+    oom_killed: bool = False
+    wall_time: float = 0.0
+    peak_memory: int = 0
+    memory_limit: int = 0
+    average_cpu: float = 0.0
+    peak_cpu: float = 0.0
+    logs: str = ""
+
+
+def memory_usage(stats: Dict[str, Any]) -> int:
+    """
+    Memory used by the container without page cache, as `docker stats` shows it
+    """
+    memory = stats.get("memory_stats") or {}
+    usage = memory.get("usage", 0)
+    details = memory.get("stats") or {}
+    cache = details.get("inactive_file", details.get("total_inactive_file", 0))
+    return max(0, usage - cache)
+
+
+def cpu_percent(stats: Dict[str, Any]) -> Optional[float]:
+    """
+    CPU utilisation since the previous sample, 100% is one fully used core
+    """
+    cpu = stats.get("cpu_stats") or {}
+    precpu = stats.get("precpu_stats") or {}
+    if "system_cpu_usage" not in cpu or "system_cpu_usage" not in precpu:
+        return None
+    cpu_delta = cpu["cpu_usage"]["total_usage"] - precpu["cpu_usage"]["total_usage"]
+    system_delta = cpu["system_cpu_usage"] - precpu["system_cpu_usage"]
+    if system_delta <= 0:
+        return None
+    cores = cpu.get("online_cpus") or len(cpu["cpu_usage"].get("percpu_usage") or [1])
+    return cpu_delta / system_delta * cores * 100
+
+
+def profile_container(
+    client: Any, image: str, batch_size: int, environment: Dict[str, Any]
+) -> ContainerProfile:
+    """
+    Run container until it exits, sampling `docker stats` in a background thread
+    """
+    container = client.containers.run(
+        image=image, detach=True, environment=dict(environment, BATCH_SIZE=batch_size)
+    )
+    samples: List[Dict[str, Any]] = []
+
+    def collect():
+        try:
+            for stats in container.stats(stream=True, decode=True):
+                samples.append(stats)
+        except Exception:  # stats stream is closed when the container is removed
+            pass
+
+    collector = threading.Thread(target=collect, daemon=True)
+    start = time.perf_counter()
+    collector.start()
+    try:
+        exit_code = container.wait().get("StatusCode")
+        wall_time = time.perf_counter() - start
+        container.reload()
+        oom_killed = container.attrs.get("State", {}).get("OOMKilled", False)
+        logs = container.logs(stdout=True, stderr=True).decode(errors="replace")
+    finally:
+        container.remove(force=True)
+    collector.join(timeout=5)
+
+    cpus = [value for value in map(cpu_percent, samples) if value is not None]
+    limits = [(stats.get("memory_stats") or {}).get("limit", 0) for stats in samples]
+    return ContainerProfile(
+        batch_size=batch_size,
+        exit_code=exit_code,
+        oom_killed=oom_killed,
+        wall_time=wall_time,
+        peak_memory=max(map(memory_usage, samples), default=0),
+        memory_limit=max(limits, default=0),
+        average_cpu=sum(cpus) / len(cpus) if cpus else 0.0,
+        peak_cpu=max(cpus, default=0.0),
+        logs=logs,
+    )
+
+
+def format_table(profiles: List[ContainerProfile], declared_batch_size: int, gpu: bool) -> str:
+    lines = [
+        f"Declared in config: batch_size={declared_batch_size}, gpu={gpu}",
+        f"{'batch':>6} {'status':<10} {'wall, s':>8} {'peak RSS':>10} "
+        f"{'avg CPU%':>9} {'peak CPU%':>10}",
+    ]
+    for profile in profiles:
+        if profile.oom_killed:
+            status = "OOM"
+        elif profile.exit_code == 0:
+            status = "ok"
+        else:
+            status = f"exit {profile.exit_code}"
+        mark = " <- declared" if profile.batch_size == declared_batch_size else ""
+        lines.append(
+            f"{profile.batch_size:>6} {status:<10} {profile.wall_time:>8.1f} "
+            f"{format_size(profile.peak_memory):>10} {profile.average_cpu:>9.0f} "
+            f"{profile.peak_cpu:>10.0f}{mark}"
+        )
+    return "\n".join(lines)
@@ -3,19 +3,66 @@ Controllers for visionhub-cli. Main bussines logic
 """
 
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from functools import partial
 import os
+import json
+import time
+import inspect
+import threading
 
-import requests
-import docker
 import click
 
-from .config_processor import (
-    construct_model_config_from_prompt,
-    construct_model_config,
-    write_config,
-    read_config,
+from .utils import (
+    exception_handler,
+    lazy_import,
+    load_lazy_modules,
+    format_size,
+    parse_size,
+    output_prefix,
+    prefixed_stdout,
+)
+from . import local_model, deploy_manifest, monorepo
+
+# heavy dependencies are loaded by the commands that use them
+requests = lazy_import("requests")
+api_client = lazy_import(".api_client", __package__)
+docker = lazy_import("docker")
+config_processor = lazy_import(".config_processor", __package__)
+benchmark = lazy_import(".benchmark", __package__)
+build_context = lazy_import(".build_context", __package__)
+scheduler = lazy_import(".scheduler", __package__)
+push_progress = lazy_import(".push_progress", __package__)
+loadtest_ = lazy_import(".loadtest", __package__)
+container_profile = lazy_import(".container_profile", __package__)
+stage_profiler = lazy_import(".stage_profiler", __package__)
+dataset = lazy_import(".dataset", __package__)
+build_log = lazy_import(".build_log", __package__)
+image_layers = lazy_import(".image_layers", __package__)
+coldstart_ = lazy_import(".coldstart", __package__)
+perf_gate = lazy_import(".perf_gate", __package__)
+serve_ = lazy_import(".serve", __package__)
+encoder = lazy_import(".encoder", __package__)
+web_assets = lazy_import(".web_assets", __package__)
+registry = lazy_import(".registry", __package__)
+result_cache = lazy_import(".result_cache", __package__)
+dev_ = lazy_import(".dev", __package__)
+# used by the stage threads of release, imported before the threads start
+RELEASE_MODULES = (
+    requests,
+    api_client,
+    docker,
+    config_processor,
+    build_context,
+    scheduler,
+    push_progress,
+    loadtest_,
+    build_log,
+    image_layers,
+    perf_gate,
+    web_assets,
+    registry,
 )
-from .utils import exception_handler
 
 
 @exception_handler
@@ -24,9 +71,7 @@ def login(token: str, address: str):
     Check token, save to ~/.visionhub/tokens
     """
 
-    resp = requests.get(
-        address + "/api/frontend/user/", headers={"Authorization": "Token " + token}
-    )
+    resp = api_client.get_client(address).get("/api/frontend/user/", token)
     if not resp.ok:
         raise ValueError("Token is incorrect")
 
@@ -42,8 +87,8 @@ def create(result_config_path: Path):
     Request required fields from user to create config
     """
 
-    model_config = construct_model_config_from_prompt()
-    write_config(result_config_path, model_config)
+    model_config = config_processor.construct_model_config_from_prompt()
+    config_processor.write_config(result_config_path, model_config)
 
 
 @exception_handler
@@ -51,46 +96,143 @@ def generate_template(result_config_path: Path):
     """
     Generate template with stub values
     """
-    model_config = construct_model_config()
-    write_config(result_config_path, model_config)
+    model_config = config_processor.construct_model_config()
+    config_processor.write_config(result_config_path, model_config)
+
+
+def docker_client(client=None):
+    """
+    Return given docker client or connect to the local docker
+    """
+    if client is not None:
+        return client
+    try:
+        return docker.from_env()
+    except docker.errors.DockerException:
+        raise ValueError("You should start docker firstly")
+
+
+@exception_handler
+def is_up_to_date(
+    directory: Path, config_path: Path, config=None, client=None
+) -> bool:
+    """
+    Check that local image was built from the same build context and config
+    """
+
+    config = config or config_processor.read_config(config_path)
+    cli = docker_client(client).api
+    expected = build_context.context_hash(directory, config)
+    return build_context.image_context_hash(cli, config.link) == expected
 
 
 @exception_handler
-def build(directory: Path, config_path: Path):
+def build(
+    directory: Path,
+    config_path: Path,
+    force: bool = False,
+    config=None,
+    client=None,
+    log_format: str = "text",
+    history_path: Optional[Path] = None,
+) -> bool:
     """
-    Build docker image and tag it with config["slug"] and version config["version"]
+    Build docker image and tag it with config["slug"] and version config["version"].
+    Build is skipped if the image has the same build context hash.
+    With log_format "json" every build event is printed as a JSON line
     """
 
-    config = read_config(config_path)
+    config = config or config_processor.read_config(config_path)
 
     if not config.slug:
         raise ValueError("Config must contain slug name")
 
+    as_json = log_format == "json"
+    cli = docker_client(client).api
+    context_hash = build_context.context_hash(directory, config)
+    if not force and build_context.image_context_hash(cli, config.link) == context_hash:
+        if as_json:
+            click.echo(json.dumps({"event": "skipped", "link": config.link}))
+        else:
+            click.echo(f"Image {config.link} is up to date, build skipped 💤")
+        return True
+    context, context_bytes = build_context.context_archive(directory)
+    tracker = build_log.BuildTracker(config.link, context_hash, context_bytes)
+    if as_json:
+        click.echo(json.dumps({"event": "context", "bytes": context_bytes}))
+    else:
+        click.echo(f"Sending build context {format_size(context_bytes)}")
     try:
-        cli = docker.from_env().api
-    except docker.errors.DockerException:
-        click.echo("You should start docker firstly")
-        return
-    for response in cli.build(path=str(directory), tag=config.link, decode=True):
-
-        if "stream" in response and response["stream"] != "\n":
-            click.echo(response["stream"].replace("\n", ""))
-        if "error" in response:
-            click.echo(response["error"])
-            click.echo("Can not build image 😭")
-            return
+        for response in cli.build(
+            fileobj=context,
+            custom_context=True,
+            tag=config.link,
+            decode=True,
+            labels={build_context.CONTEXT_HASH_LABEL: context_hash},
+        ):
+            event = tracker.update(response)
+            if as_json:
+                if event is not None:
+                    click.echo(json.dumps(event))
+            elif "stream" in response and response["stream"] != "\n":
+                click.echo(response["stream"].replace("\n", ""))
+            if "error" in response:
+                break
+    finally:
+        context.close()
+
+    summary = tracker.finish()
+    report = None
+    max_size = parse_size(config.max_image_size) if config.max_image_size else None
+    if summary.ok:
+        report = image_layers.analyze_image(cli, config.link, directory)
+        summary.image_size = report.size
+        summary.max_image_size = max_size
+        if max_size is not None:
+            summary.fits_max_image_size = report.size <= max_size
+    if history_path is not None:
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(history_path, "a") as file_:
+            file_.write(summary.json() + "\n")
+    if as_json:
+        click.echo(json.dumps(dict(json.loads(summary.json()), event="summary")))
+        if report is not None:
+            click.echo(json.dumps(dict(json.loads(report.json()), event="image")))
+        return summary.ok
+    click.echo(build_log.format_summary(summary))
+    if not summary.ok:
+        click.echo(summary.error)
+        click.echo("Can not build image 😭")
+        return False
     click.echo(f"Built image and tagged {config.link} 📦")
+    click.echo(image_layers.format_report(report, max_size))
+    return True
 
 
 @exception_handler
-def test(config_path: Path) -> bool:
-    config = read_config(config_path)
+def check_image_size(directory: Path, config, client=None) -> bool:
+    """
+    Fail if the local image is larger than max_image_size of the config
+    """
+    if not config.max_image_size:
+        return True
+    max_size = parse_size(config.max_image_size)
+    size = docker_client(client).api.inspect_image(config.link).get("Size", 0)
+    if size > max_size:
+        click.echo(
+            f"Image {config.link} is {format_size(size)}, "
+            f"larger than max_image_size {format_size(max_size)} 🐘"
+        )
+        return False
+    click.echo(f"Image size {format_size(size)} fits max_image_size {format_size(max_size)}")
+    return True
+
+
+@exception_handler
+def test(config_path: Path, config=None, client=None) -> bool:
+    config = config or config_processor.read_config(config_path)
     link = config.link
-    try:
-        cli = docker.from_env()
-    except docker.errors.DockerException:
-        click.echo("You should start docker firstly")
-        return
+    cli = docker_client(client)
     try:
         logs = cli.containers.run(
             image=link,
@@ -109,72 +251,263 @@ def test(config_path: Path) -> bool:
 
 
 @exception_handler
-def push(config_path: Path):
+def profile_test(config_path: Path, batch_sizes: Optional[List[int]] = None) -> bool:
     """
-    Push image that to registry
+    Run test container at every batch size and record peak memory, CPU and time.
+    Declared batch_size of the config is always measured
     """
+    config = config_processor.read_config(config_path)
+    cli = docker_client()
+    batch_sizes = sorted(set(batch_sizes or [1]) | {config.batch_size})
 
-    cli = docker.from_env()
+    profiles = []
+    for batch_size in batch_sizes:
+        click.echo(f"Run test with BATCH_SIZE={batch_size} ...")
+        profile = container_profile.profile_container(
+            cli, config.link, batch_size, {"TEST_MODE": 1}
+        )
+        profiles.append(profile)
+        if profile.exit_code != 0:
+            click.echo(profile.logs)
+    click.echo(container_profile.format_table(profiles, config.batch_size, config.gpu))
 
-    config = read_config(config_path)
+    declared = next(p for p in profiles if p.batch_size == config.batch_size)
+    if declared.exit_code != 0:
+        click.echo(f"Test fails at the declared batch_size={config.batch_size} 😵")
+        return False
+    click.echo("Test passed ✅")
+    return True
+
+
+@exception_handler
+def coldstart(
+    config_path: Path,
+    runs: int = 5,
+    result_pattern: str = "prediction",
+    timeout: float = 300.0,
+) -> List["coldstart_.ColdStartRun"]:
+    """
+    Start the test container `runs` times and time its start, first log line
+    and first result. Pull of a missing image is measured separately
+    """
+    config = config_processor.read_config(config_path)
+    cli = docker_client()
+
+    pull_time = None
+    try:
+        cli.images.get(config.link)
+    except docker.errors.ImageNotFound:
+        click.echo(f"Pull {config.link} ...")
+        start = time.perf_counter()
+        cli.images.pull(config.link)
+        pull_time = time.perf_counter() - start
+
+    results = []
+    for run in range(1, runs + 1):
+        click.echo(f"Cold start {run}/{runs} ...")
+        results.append(
+            coldstart_.measure_run(
+                cli,
+                config.link,
+                {"TEST_MODE": 1, "BATCH_SIZE": config.batch_size},
+                run,
+                result_pattern,
+                timeout,
+            )
+        )
+    click.echo(coldstart_.format_table(results, pull_time))
+    if not any(result.first_result is not None for result in results):
+        click.echo(f"No log line matched {result_pattern!r}, first result is unknown")
+    return results
+
+
+@exception_handler
+def push(
+    config_path: Path,
+    config=None,
+    client=None,
+    retries: int = 3,
+    backoff: float = 2.0,
+    summary_path: Optional[Path] = None,
+    force: bool = False,
+) -> bool:
+    """
+    Push image that to registry, stream per layer progress.
+    Push is skipped if the registry tag already points to the local image.
+    Failed push is retried with exponential backoff, registry skips already pushed layers
+    """
+
+    cli = docker_client(client)
+
+    config = config or config_processor.read_config(config_path)
     if not config.slug or not config.link:
         raise ValueError("Config must contain slug and link fields")
 
-    repository = config.link.split(":")[0]
-    tag = config.link.split(":")[1]
+    # rpartition, the registry host may have a port
+    repository, tag = monorepo.split_image(config.link)
+
+    try:
+        image = cli.api.inspect_image(config.link)
+    except docker.errors.ImageNotFound:
+        raise ValueError(f"There is no local image {config.link}, build it firstly")
+    if not force and is_pushed(config.link, image, cli):
+        if summary_path is not None:
+            with open(summary_path, "w") as file_:
+                summary = push_progress.PushSummary(link=config.link, ok=True, skipped=True)
+                file_.write(summary.json(indent=2))
+        return True
 
     click.echo("Pushing...")
-    cli.images.push(repository, tag=tag)
+    trackers = []
+    error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff * 2 ** (attempt - 1)
+            click.echo(f"Push failed: {error}. Retry in {delay:.0f}s")
+            time.sleep(delay)
+        tracker = push_progress.PushTracker()
+        trackers.append(tracker)
+        last_report = 0.0
+        try:
+            for event in cli.api.push(repository, tag=tag, stream=True, decode=True):
+                tracker.update(event)
+                if time.perf_counter() - last_report >= 1:
+                    last_report = time.perf_counter()
+                    click.echo("\n".join(tracker.progress_lines()))
+            error = None
+            break
+        except (
+            push_progress.PushError,
+            docker.errors.APIError,
+            requests.exceptions.RequestException,
+        ) as exc:
+            error = str(exc)
+
+    summary = push_progress.summarize(config.link, trackers, error)
+    if summary_path is not None:
+        with open(summary_path, "w") as file_:
+            file_.write(summary.json(indent=2))
+    click.echo(
+        f"{format_size(summary.total_bytes)} uploaded in {summary.duration:.1f}s, "
+        f"{summary.layers_pushed} layers pushed, "
+        f"{summary.layers_skipped} already existed"
+    )
+    if error is not None:
+        click.echo(f"Can not push image: {error} 😭")
+        return False
+    if summary.digest:
+        registry.record_push(config.link, summary.digest, image)
     click.echo(f"Image pushed {config.link} 🚀")
+    return True
 
 
-@exception_handler
-def deploy(address: str, config_path: Path):
+def is_pushed(link: str, image: dict, client) -> bool:
     """
-    Deploy model to the visionhub platform
+    Compare local image with the registry tag, show layers the push would upload.
+    Registry errors are reported and do not block the push
     """
+    try:
+        remote = registry.fetch_remote(link, registry.local_platform(image))
+    except (registry.RegistryError, requests.exceptions.RequestException) as exc:
+        click.echo(f"Can not check the registry: {exc}")
+        return False
+    if remote is not None and remote.image_id == image["Id"]:
+        click.echo(
+            f"Registry already has {link} ({remote.manifest_digest[:19]}), push skipped 💤"
+        )
+        return True
+    layers = registry.new_layers(image, client.api.history(link), remote)
+    total = len(image.get("RootFS", {}).get("Layers", []))
+    click.echo(f"{len(layers)} of {total} layers are not in the registry:")
+    for diff_id, instruction, size in layers:
+        description = f"  {format_size(size):>10}  {instruction[:80]}" if instruction else ""
+        click.echo(f"  {diff_id[7:19]}{description}")
+    return False
+
 
+def read_token(address: str) -> str:
     try:
         with open(f".visionhub/{address.split('://')[1]}", "r") as f:
-            token = f.read().split(",")[1]
+            return f.read().split(",")[1]
     except FileNotFoundError:
         raise ValueError(
             "You are not loggined. Firstly you should call visionhub-cli login"
         )
 
-    config = read_config(config_path)
+
+def prepare_deploy(
+    config, optimize_assets: bool = False
+) -> Tuple[dict, Dict[str, Path], Dict[str, str]]:
+    """
+    Split config to plain fields and file fields, hash them for the manifest.
+    With `optimize_assets` preview and examples are replaced by their web versions
+    """
 
     data = config.dict()
-    files = {}
+    file_paths = {}
     for field in config.dict():
         if isinstance(data[field], str) and os.path.isfile(data[field]):
-            files[field] = open(data.pop(field), "rb")
+            file_paths[field] = Path(data.pop(field))
 
     for field in config.dict():
         if isinstance(data[field], Path) and os.path.isfile(data[field]):
-            # TODO: close files
-            files[field] = open(data[field], "rb")
+            file_paths[field] = data[field]
         if field == "supported_modes":
             data[field] = list(map(lambda x: x.value, data[field]))
 
+    if optimize_assets:
+        assets = web_assets.optimize(file_paths)
+        file_paths.update({asset.field: asset.path for asset in assets})
+        click.echo(web_assets.format_report(assets))
+
     data.pop("version")
+    data.pop("max_image_size")
     data["supported_modes"] = data["modes"]
+    return data, file_paths, deploy_manifest.fingerprint(data, file_paths)
 
+
+def is_deployed(address: str, token: str, slug: str) -> bool:
     click.echo("Check is model is already deployed")
-    response = requests.get(
-        address + f"/api/frontend/model/{config.slug}/",
-        headers={"Authorization": "Token " + token},
-    )
+    response = api_client.get_client(address).get(f"/api/frontend/model/{slug}/", token)
     is_create = response.status_code == 404
     click.echo(f"Model is presented in visionhub platform {not is_create}")
+    return not is_create
+
+
+def send_deploy(
+    address: str,
+    token: str,
+    config,
+    prepared: Tuple[dict, Dict[str, Path], Dict[str, str]],
+    is_create: bool,
+    dry_run: bool = False,
+    force: bool = False,
+) -> bool:
+    """
+    Send fields changed since the last successful deploy
+    """
+
+    data, file_paths, manifest = prepared
+    previous = {}
+    if not is_create and not force:
+        previous = deploy_manifest.load_manifest(address, config.slug)
+    changed = deploy_manifest.changed_fields(previous, manifest)
+    size = deploy_manifest.payload_size(data, file_paths, changed)
+    for field in changed:
+        click.echo(f"  {'file ' if field in file_paths else 'value'} {field}")
+    click.echo(f"{len(changed)} changed fields, {format_size(size)} to send")
+    if dry_run:
+        return True
+    if not changed:
+        click.echo("Nothing changed since the last deploy 💤")
+        return True
+
+    data = {field: data[field] for field in changed if field in data}
+    files = {field: file_paths[field] for field in changed if field in file_paths}
     method = "post" if is_create else "patch"
-    uri = address + "/api/frontend/model/" + ("" if is_create else config.slug + "/")
-    response = requests.request(
-        method,
-        uri,
-        data=data,
-        files=files,
-        headers={"Authorization": "Token " + token},
+    path = "/api/frontend/model/" + ("" if is_create else config.slug + "/")
+    response = api_client.get_client(address).request(
+        method, path, token, data=data, files=files
     )
     if response.status_code not in (201, 200):
         try:
@@ -185,6 +518,973 @@ def deploy(address: str, config_path: Path):
                 file_.write(response.content)
             raise ValueError("Visionhub returns error writed to .visionhub/log")
 
-    for _file in files.values():
-        _file.close()
+    deploy_manifest.save_manifest(address, config.slug, manifest)
     click.echo(f"Deployet at {address}/api/frontend/model/{config.slug} 🚀")
+    return True
+
+
+@exception_handler
+def deploy(
+    address: str,
+    config_path: Path,
+    dry_run: bool = False,
+    force: bool = False,
+    config=None,
+    optimize_assets: bool = False,
+) -> bool:
+    """
+    Deploy model to the visionhub platform.
+    Only fields changed since the last successful deploy are sent
+    """
+
+    token = read_token(address)
+    config = config or config_processor.read_config(config_path)
+    prepared = prepare_deploy(config, optimize_assets)
+    is_create = not is_deployed(address, token, config.slug)
+    return send_deploy(address, token, config, prepared, is_create, dry_run, force)
+
+
+# ports the runner of the model image binds, see example/Dockerfile
+RUNNER_DATASET_PORT = 5556
+RUNNER_RESULT_PORT = 5555
+
+
+def is_running(container) -> bool:
+    container.reload()
+    return container.status in ("created", "running")
+
+
+def start_runner(
+    client, config, dataset_port: Optional[int] = None, result_port: Optional[int] = None
+):
+    """
+    Start the model image in the serving mode with the runner queues published
+    on the given host ports, free ones by default. Returns the container,
+    dataset and result addresses
+    """
+    container = client.containers.run(
+        image=config.link,
+        detach=True,
+        environment={"TEST_MODE": 0, "BATCH_SIZE": config.batch_size},
+        ports={
+            f"{RUNNER_DATASET_PORT}/tcp": dataset_port,
+            f"{RUNNER_RESULT_PORT}/tcp": result_port,
+        },
+    )
+    container.reload()
+    published = container.attrs.get("NetworkSettings", {}).get("Ports") or {}
+    try:
+        dataset_addr, result_addr = (
+            f"tcp://localhost:{published[f'{port}/tcp'][0]['HostPort']}"
+            for port in (RUNNER_DATASET_PORT, RUNNER_RESULT_PORT)
+        )
+    except (KeyError, IndexError, TypeError):
+        logs = container.logs().decode(errors="replace")
+        container.remove(force=True)
+        raise ValueError(f"Container of {config.link} did not start:\n{logs}")
+    return container, dataset_addr, result_addr
+
+
+@exception_handler
+def check_performance(
+    directory: Path,
+    config,
+    client=None,
+    max_throughput_drop: float = 15.0,
+    max_latency_rise: float = 15.0,
+    accept_regression: bool = False,
+    ready_timeout: float = 600.0,
+):
+    """
+    Benchmark the built image through its queues on the fixed workload, save result
+    to the local database and compare with the last released version.
+    Returns the saved run. Model's `init` is not called, the runner has no such message
+    """
+    missing = perf_gate.missing_modules()
+    if missing:
+        raise ValueError(
+            f"Performance check requires {', '.join(missing)}, install them with "
+            "`pip install 'visionhub-cli[perf]'` or use --skip-perf-check"
+        )
+    test_data = directory / "test_data"
+    if not test_data.exists():
+        raise ValueError(
+            f"There is no {test_data} to benchmark the image, "
+            "use --skip-perf-check to release without the performance check"
+        )
+    sources = local_model.load_sources(test_data, perf_gate.BENCH_MAX_FRAMES)
+    if not sources:
+        raise ValueError(f"There is no test data in {test_data}")
+
+    container, dataset_addr, result_addr = start_runner(docker_client(client), config)
+    stand_in = None
+    results = []
+    try:
+        stand_in = loadtest_.QueueStandIn(dataset_addr, result_addr)
+        waited = stand_in.wait_ready(
+            sources[0][1][0], ready_timeout, partial(is_running, container)
+        )
+        click.echo(f"Image {config.link} is ready in {waited:.1f}s, benchmark ...")
+        for source, samples, _ in sources:
+            repeats = [
+                loadtest_.measure_batches(
+                    stand_in, source, samples, config.batch_size, perf_gate.BENCH_BATCHES
+                )
+                for _ in range(perf_gate.BENCH_REPEATS)
+            ]
+            results.append(max(repeats, key=lambda result: result.frames_per_second))
+    finally:
+        if stand_in is not None:
+            stand_in.close()
+        container.remove(force=True)
+
+    connection = perf_gate.connect()
+    baseline = perf_gate.last_released(connection, config.slug)
+    run = perf_gate.save(
+        connection, perf_gate.summarize(config.slug, config.version, results)
+    )
+    click.echo(
+        f"Benchmark: {run.frames_per_second:.1f} fps, "
+        f"batch p95 {run.latency_p95 * 1000:.1f} ms"
+    )
+    if baseline is None:
+        click.echo("There is no released version to compare with")
+        return run
+    found = perf_gate.regressions(run, baseline, max_throughput_drop, max_latency_rise)
+    for regression in found:
+        click.echo(f"Regression: {regression}")
+    if found and not accept_regression:
+        click.echo("Push is blocked, use --accept-regression to release anyway 🐌")
+        return False
+    return run
+
+
+def performance_stage(
+    directory: Path,
+    config,
+    client,
+    up_to_date: bool,
+    skip_perf_check: bool = False,
+    max_throughput_drop: float = 15.0,
+    max_latency_rise: float = 15.0,
+    accept_regression: bool = False,
+):
+    """
+    Performance check of the release. Nothing is benchmarked if the registry
+    already has the up to date image, its push is a no-op
+    """
+    if skip_perf_check:
+        return lambda: click.echo("Performance check is skipped") or True
+    if up_to_date and is_pushed(config.link, client.api.inspect_image(config.link), client):
+        return lambda: click.echo("Image is released, performance check skipped 💤") or True
+    return partial(
+        check_performance,
+        directory,
+        config,
+        client,
+        max_throughput_drop,
+        max_latency_rise,
+        accept_regression,
+    )
+
+
+def record_release(results: Dict[str, object]) -> bool:
+    """
+    Mark benchmark of the pushed image as the released one
+    """
+    run = results.get("check performance")
+    if isinstance(run, perf_gate.PerfRun):
+        perf_gate.mark_released(perf_gate.connect(), run.id)
+    return True
+
+
+@exception_handler
+def release(
+    directory: Path,
+    config_path: Path,
+    address: str,
+    force: bool = False,
+    max_throughput_drop: float = 15.0,
+    max_latency_rise: float = 15.0,
+    accept_regression: bool = False,
+    optimize_assets: bool = False,
+    skip_perf_check: bool = False,
+):
+    """
+    Build, test, push and deploy the model. Independent stages run concurrently,
+    config and docker client are shared between stages.
+    Push waits for the performance check of the image against the last released version
+    """
+
+    load_lazy_modules(*RELEASE_MODULES)
+    config = config_processor.read_config(config_path)
+    client = docker_client()
+    token = read_token(address)
+
+    up_to_date = not force and is_up_to_date(
+        directory, config_path, config=config, client=client
+    )
+    stages = [
+        scheduler.Stage(
+            "prepare assets", partial(prepare_deploy, config, optimize_assets)
+        ),
+        scheduler.Stage(
+            "check platform",
+            lambda: "patch" if is_deployed(address, token, config.slug) else "post",
+        ),
+    ]
+    deploy_requires = ("prepare assets", "check platform", "push")
+    if up_to_date:
+        # the label is set by any build, the image may be not pushed yet
+        click.echo("Image is up to date, build and test are skipped 💤")
+    else:
+        stages += [
+            scheduler.Stage(
+                "build",
+                partial(build, directory, config_path, force, config=config, client=client),
+            ),
+            scheduler.Stage(
+                "test",
+                partial(test, config_path, config=config, client=client),
+                requires=("build",),
+            ),
+        ]
+    stages += [
+        scheduler.Stage(
+            "check size",
+            partial(check_image_size, directory, config, client),
+            requires=() if up_to_date else ("build",),
+        ),
+        scheduler.Stage(
+            "check performance",
+            performance_stage(
+                directory,
+                config,
+                client,
+                up_to_date,
+                skip_perf_check,
+                max_throughput_drop,
+                max_latency_rise,
+                accept_regression,
+            ),
+            # measured after the test container exits, not next to it
+            requires=() if up_to_date else ("test",),
+        ),
+        scheduler.Stage(
+            "push",
+            # skipped inside if the registry already has the image
+            partial(push, config_path, config=config, client=client),
+            requires=("check size", "check performance")
+            + (() if up_to_date else ("test",)),
+        ),
+        scheduler.Stage(
+            "record release",
+            record_release,
+            requires=("push", "check performance"),
+            pass_results=True,
+        ),
+    ]
+    stages.append(
+        scheduler.Stage(
+            "deploy",
+            lambda results: send_deploy(
+                address,
+                token,
+                config,
+                results["prepare assets"],
+                results["check platform"] == "post",
+            ),
+            requires=deploy_requires,
+            pass_results=True,
+        )
+    )
+    reports = scheduler.run_stages(stages)
+    click.echo(scheduler.format_report(reports))
+    return all(report.status == scheduler.DONE for report in reports)
+
+
+# benchmarks of the models released in parallel would slow down each other
+_BENCHMARK_LOCK = threading.Lock()
+
+
+def release_model(
+    directory: Path,
+    config_path: Path,
+    config,
+    client,
+    force: bool = False,
+    skip_perf_check: bool = False,
+    max_throughput_drop: float = 15.0,
+    max_latency_rise: float = 15.0,
+    accept_regression: bool = False,
+) -> Dict[str, float]:
+    """
+    Build, test, benchmark and push one model, return duration of every stage.
+    Build and test are skipped for the up to date image, push checks the registry.
+    Benchmarks run one at a time. Raises ValueError with the failed stage
+    """
+
+    up_to_date = not force and is_up_to_date(
+        directory, config_path, config=config, client=client
+    )
+    check = performance_stage(
+        directory,
+        config,
+        client,
+        up_to_date,
+        skip_perf_check,
+        max_throughput_drop,
+        max_latency_rise,
+        accept_regression,
+    )
+
+    def check_performance_alone(config, client):
+        with _BENCHMARK_LOCK:
+            return check()
+
+    stages = [
+        ("build", partial(build, directory, config_path, force)),
+        ("test", partial(test, config_path)),
+        ("check size", lambda config, client: check_image_size(directory, config, client)),
+        ("check performance", check_performance_alone),
+        ("push", partial(push, config_path)),
+    ]
+    if up_to_date:
+        stages = stages[2:]
+    durations = {}
+    results = {}
+    for name, stage in stages:
+        start = time.perf_counter()
+        results[name] = stage(config=config, client=client)
+        durations[name] = time.perf_counter() - start
+        if not results[name]:
+            raise ValueError(f"{name} failed")
+    record_release(results)
+    return durations
+
+
+def pull_base_image(client, image: str) -> bool:
+    """
+    Pull base image, fall back to the local one, e.g. built from another repository.
+    Raises ValueError if there is no such image at all
+    """
+    repository, tag = monorepo.split_image(image)
+    try:
+        client.images.pull(repository, tag=tag)
+        return True
+    except docker.errors.APIError as exc:
+        error = exc
+    try:
+        client.images.get(image)
+    except docker.errors.ImageNotFound:
+        raise ValueError(f"Base image {image} is neither in a registry nor local: {error}")
+    click.echo(f"Can not pull {image}, the local image is used")
+    return True
+
+
+def run_prefixed(prefix: str, func):
+    """
+    Run func with its output lines prefixed, to tell apart the parallel stages
+    """
+    with output_prefix(prefix):
+        return func()
+
+
+@exception_handler
+def release_all(
+    root: Path,
+    workers: int,
+    force: bool = False,
+    skip_perf_check: bool = False,
+    max_throughput_drop: float = 15.0,
+    max_latency_rise: float = 15.0,
+    accept_regression: bool = False,
+) -> bool:
+    """
+    Build, test, benchmark and push every model under root with bounded parallelism.
+    Base images are pulled once, models based on other models wait for them.
+    Output lines of every model are prefixed with its slug
+    """
+
+    models = monorepo.discover_models(root)
+    if not models:
+        raise ValueError(f"There are no {monorepo.CONFIG_RELATIVE_PATH} under {root}")
+    load_lazy_modules(*RELEASE_MODULES)
+    client = docker_client()
+    configs = {
+        model.config_path: config_processor.read_config(model.config_path)
+        for model in models
+    }
+    links = {config.link: f"release {config.slug}" for config in configs.values()}
+
+    pulls = {}
+    stages = []
+    for model in models:
+        config = configs[model.config_path]
+        requires = []
+        for image in monorepo.base_images(model.directory / "Dockerfile"):
+            if image in links:
+                requires.append(links[image])
+                continue
+            if image not in pulls:
+                pulls[image] = scheduler.Stage(
+                    f"pull {image}",
+                    partial(
+                        run_prefixed, f"[{image}] ", partial(pull_base_image, client, image)
+                    ),
+                )
+            requires.append(pulls[image].name)
+        stages.append(
+            scheduler.Stage(
+                f"release {config.slug}",
+                partial(
+                    run_prefixed,
+                    f"[{config.slug}] ",
+                    partial(
+                        release_model,
+                        model.directory,
+                        model.config_path,
+                        config,
+                        client,
+                        force,
+                        skip_perf_check,
+                        max_throughput_drop,
+                        max_latency_rise,
+                        accept_regression,
+                    ),
+                ),
+                requires=tuple(requires),
+            )
+        )
+    click.echo(
+        f"Found {len(models)} models, {len(pulls)} shared base images, {workers} workers"
+    )
+    with prefixed_stdout():
+        reports = scheduler.run_stages(list(pulls.values()) + stages, max_workers=workers)
+    click.echo(scheduler.format_report(reports[: len(pulls)]))
+
+    click.echo(
+        f"{'model':<32} {'status':<10} {'build':>8} {'test':>8} {'perf':>8} "
+        f"{'push':>8} {'total':>8}"
+    )
+    for report in reports[len(pulls) :]:
+        durations = report.result or {}
+        status = report.status
+        if report.status == scheduler.DONE and "build" not in durations:
+            status = "up to date"
+        columns = " ".join(
+            f"{durations[name]:>8.1f}" if name in durations else f"{'-':>8}"
+            for name in ("build", "test", "check performance", "push")
+        )
+        click.echo(
+            f"{report.name[len('release '):]:<32} {status:<10} {columns} "
+            f"{report.duration:>8.1f}"
+        )
+    return all(report.status == scheduler.DONE for report in reports)
+
+
+@exception_handler
+def loadtest(
+    config_path: Path,
+    dataset_addr: str,
+    result_addr: str,
+    rates: List[float],
+    concurrency: int,
+    duration: float,
+    test_data: Optional[Path] = None,
+    image_size: Tuple[int, int] = (720, 1280),
+    run_container: bool = False,
+    ready_timeout: float = 600.0,
+) -> List["loadtest_.LoadStepResult"]:
+    """
+    Push samples into the model container queues with increasing rate until saturation.
+    Measurement starts after the model returned the warm-up result
+    """
+
+    if test_data is not None:
+        samples = [
+            sample
+            for _, source_samples, _ in local_model.load_sources(
+                test_data, loadtest_.MAX_FRAMES
+            )
+            for sample in source_samples
+        ]
+        if not samples:
+            raise ValueError(f"There is no test data in {test_data}")
+    else:
+        samples = loadtest_.synthetic_samples(*image_size)
+
+    container = None
+    if run_container:
+        config = config_processor.read_config(config_path)
+        container, dataset_addr, result_addr = start_runner(
+            docker_client(),
+            config,
+            int(dataset_addr.rsplit(":", 1)[1]),
+            int(result_addr.rsplit(":", 1)[1]),
+        )
+        click.echo(f"Started container {container.short_id} of {config.link}")
+
+    def is_alive() -> bool:
+        return container is None or is_running(container)
+
+    stand_in = loadtest_.QueueStandIn(dataset_addr, result_addr)
+    try:
+        click.echo("Wait for the warm-up result ...")
+        waited = stand_in.wait_ready(samples[0], ready_timeout, is_alive)
+        click.echo(f"Model is ready in {waited:.1f}s")
+        generator = loadtest_.LoadGenerator(stand_in, samples)
+        results = loadtest_.sweep(
+            generator,
+            rates,
+            concurrency,
+            duration,
+            on_step=lambda result: click.echo(
+                f"rate {result.offered_rate:.1f}/s: achieved {result.achieved_rate:.1f}/s"
+            ),
+        )
+    finally:
+        stand_in.close()
+        if container is not None:
+            container.remove(force=True)
+    click.echo(loadtest_.format_table(results))
+    if results and results[-1].saturated:
+        click.echo(f"Saturated at {results[-1].offered_rate:.1f} samples/s")
+    return results
+
+
+@exception_handler
+def serve(
+    directory: Path,
+    config_path: Path,
+    dataset_addr: str,
+    result_addr: str,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    max_wait: float = 0.01,
+    draw: bool = True,
+    duration: Optional[float] = None,
+) -> "serve_.ServeStats":
+    """
+    Serve model.py from worker processes behind a dynamic batcher
+    until interrupted or `duration` passed
+    """
+    config = config_processor.read_config(config_path)
+    batch_size = batch_size or config.batch_size
+    if workers is None:
+        workers = 1 if config.gpu else os.cpu_count() or 1
+    if config.gpu and workers > 1:
+        click.echo(f"Model requires GPU, every of {workers} workers loads its own copy")
+
+    batcher = serve_.DynamicBatcher(
+        directory, dataset_addr, result_addr, batch_size, max_wait, workers, draw
+    )
+    click.echo(f"Load model into {workers} workers ...")
+    batcher.warmup()
+    click.echo(
+        f"Serving at {dataset_addr} -> {result_addr}, batch_size={batch_size}, "
+        f"max wait {max_wait * 1000:.0f} ms. Press Ctrl+C to stop"
+    )
+    stats = batcher.serve(duration)
+    click.echo(serve_.format_stats(stats, batch_size, workers))
+    return stats
+
+
+@exception_handler
+def dev(
+    directory: Path,
+    test_data: Path,
+    batch_size: int,
+    samples: int,
+    watch: bool = False,
+    interval: float = 0.5,
+):
+    """
+    Run init and predict_batch of model.py on a few samples of test_data in
+    a worker process. With `watch` changed modules are reloaded and the model
+    runs again after every change of the python files of the directory
+    """
+    if not test_data.exists():
+        raise ValueError(f"There is no {test_data}")
+    session = dev_.DevSession(directory, test_data, batch_size, samples)
+    files = dev_.python_files(directory)
+    last_ok = None
+    try:
+        iteration = session.run([])
+        click.echo(dev_.format_iteration(iteration, last_ok))
+        if not watch:
+            return iteration
+        click.echo(f"Watching python files of {directory.resolve()}, press Ctrl+C to stop")
+        while True:
+            if not iteration.error:
+                last_ok = iteration
+            time.sleep(interval)
+            current = dev_.python_files(directory)
+            changed = dev_.changed_files(files, current)
+            if not changed:
+                continue
+            files = current
+            iteration = session.run(changed)
+            click.echo(dev_.format_iteration(iteration, last_ok))
+    except KeyboardInterrupt:
+        return None
+    finally:
+        session.close()
+
+
+@exception_handler
+def run_video(
+    directory: Path,
+    video_path: Path,
+    config_path: Path,
+    batch_size: Optional[int] = None,
+    prefetch_size: int = 4,
+    draw: bool = True,
+    output_path: Optional[Path] = None,
+    cache: bool = False,
+    cache_size: int = 1024,
+    cache_dir: Optional[Path] = None,
+) -> Dict[str, float]:
+    """
+    Run model.py on the video the way VID2* modes do: call init, then feed
+    batches of frames. Frames are decoded in a background thread.
+    With `cache` results of already seen frames are taken from the result cache
+    """
+
+    if batch_size is None:
+        if not config_path.is_file():
+            raise ValueError(f"There is no {config_path}, pass batch size explicitly")
+        batch_size = config_processor.read_config(config_path).batch_size
+
+    model = local_model.load_model(directory)
+    if cache or cache_dir is not None:
+        model = cached_model(model, directory, cache_size, cache_dir)
+    if video_path.suffix == dataset.EXTENSION:
+        reader = local_model.PackedVideoReader(video_path)
+    else:
+        reader = local_model.VideoReader(video_path)
+    local_model.init_model(model, **reader.init_kwargs())
+    click.echo(
+        f"{video_path.name}: {reader.width}x{reader.height}, {reader.fps} fps, "
+        f"{reader.length} frames, batch_size={batch_size}"
+    )
+
+    timings = {"decode": 0.0, "wait": 0.0, "predict": 0.0}
+    frames = local_model.prefetch(
+        local_model.timed(reader.frames(), timings, "decode"),
+        prefetch_size * batch_size,
+    )
+    output = open(output_path, "w") if output_path is not None else None
+    count = 0
+    start = time.perf_counter()
+    try:
+        for batch in local_model.batched(
+            local_model.timed(frames, timings, "wait"), batch_size
+        ):
+            predict_start = time.perf_counter()
+            results = model.predict_batch(
+                [{"image": frame, "meta": {}} for frame in batch], draw=draw
+            )
+            timings["predict"] += time.perf_counter() - predict_start
+            count += len(batch)
+            if output is not None:
+                for result in results:
+                    output.write(json.dumps(result["prediction"]) + "\n")
+    finally:
+        frames.close()
+        reader.close()
+        if output is not None:
+            output.close()
+    timings["total"] = time.perf_counter() - start
+
+    click.echo(
+        f"{count} frames in {timings['total']:.2f}s "
+        f"({count / timings['total'] if timings['total'] else 0:.1f} fps)"
+    )
+    for key in ("decode", "wait", "predict"):
+        click.echo(f"  {key:<8} {timings[key]:>8.2f}s")
+    click.echo(f"  peak RSS {format_size(local_model.peak_rss())}")
+    if isinstance(model, result_cache.CachedModel):
+        click.echo(result_cache.format_stats(model.cache.stats))
+    return timings
+
+
+def cached_model(model, directory: Path, cache_size: int, cache_dir: Optional[Path]):
+    """
+    Model with predict_batch results cached for the current code of the directory
+    """
+    cache = result_cache.ResultCache(
+        result_cache.code_version(directory), max_entries=cache_size, directory=cache_dir
+    )
+    return result_cache.CachedModel(model, cache)
+
+
+@exception_handler
+def profile(
+    directory: Path,
+    test_data: Path,
+    batch_size: int,
+    batches: int,
+    max_frames: int,
+    output_path: Optional[Path] = None,
+    interval: float = 0.001,
+    draw: bool = True,
+) -> Dict[str, float]:
+    """
+    Run model.py on test_data under the sampling profiler,
+    write collapsed stacks and print time per stage
+    """
+
+    model = local_model.load_model(directory)
+    with stage_profiler.SamplingProfiler(interval) as profiler:
+        for _, samples, init_kwargs in local_model.load_sources(test_data, max_frames):
+            if init_kwargs:
+                local_model.init_model(model, **init_kwargs)
+                batches_ = local_model.batched(samples, batch_size)
+            else:
+                batches_ = benchmark.make_batches(samples, batch_size, batches)
+            for batch in batches_:
+                model.predict_batch(batch, draw=draw)
+
+    if not profiler.stacks:
+        raise ValueError("Profiler got no samples, is there test data?")
+    if output_path is not None:
+        with open(output_path, "w") as file_:
+            file_.write(profiler.collapsed() + "\n")
+        click.echo(f"Collapsed stacks writed to {output_path}, e.g. flamegraph.pl {output_path}")
+    breakdown = profiler.breakdown()
+    click.echo(stage_profiler.format_breakdown(breakdown))
+    return breakdown
+
+
+@exception_handler
+def pack_dataset(
+    test_data: Path, output_path: Path, max_frames: Optional[int], trust_pickles: bool
+):
+    """
+    Pack test_data into a memory-mappable .vhds file
+    """
+    if not test_data.is_dir():
+        raise ValueError(f"There is no directory {test_data}")
+    count = dataset.pack(test_data, output_path, max_frames, trust_pickles)
+    click.echo(
+        f"Packed {count} samples to {output_path} "
+        f"({format_size(output_path.stat().st_size)}) 📦"
+    )
+
+
+def example_meta(config) -> dict:
+    """
+    meta_input_example of the config, given as JSON string or path to JSON file
+    """
+    meta = config.meta_input_example
+    if isinstance(meta, Path):
+        with open(meta, "r") as file_:
+            return json.load(file_)
+    return json.loads(meta)
+
+
+def encode_video_example(
+    model,
+    frames,
+    init_kwargs: Dict[str, int],
+    meta: dict,
+    batch_size: int,
+    output_path: Path,
+    audio_source: Optional[Path] = None,
+    audio_fps: int = 44100,
+) -> int:
+    """
+    Feed frames to predict_batch and stream drawn frames and sound chunks to ffmpeg.
+    The encoder is started after the first batch, when the output size and
+    the sound format are known. Returns number of encoded frames
+    """
+    init = getattr(model, "init", None)
+    if init is not None and "audio_fps" in inspect.signature(init).parameters:
+        init_kwargs = dict(init_kwargs, audio_fps=audio_fps)
+    local_model.init_model(model, **init_kwargs)
+    fps = init_kwargs["fps"]
+    video = None
+    try:
+        for batch in local_model.batched(frames, batch_size):
+            results = model.predict_batch(
+                [{"image": frame, "meta": meta} for frame in batch], draw=True
+            )
+            if video is None:
+                if "image" not in results[0]:
+                    raise ValueError("Model returned no image for draw=True")
+                height, width = results[0]["image"].shape[:2]
+                sound = results[0].get("sound")
+                video = encoder.VideoEncoder(
+                    output_path,
+                    width,
+                    height,
+                    fps,
+                    audio_fps=audio_fps if sound is not None else None,
+                    audio_channels=sound.shape[1] if sound is not None and sound.ndim > 1 else 1,
+                    audio_source=audio_source,
+                )
+            for result in results:
+                video.write_frame(result["image"])
+                if "sound" in result:
+                    video.write_sound(result["sound"])
+    except BaseException:
+        # error of ffmpeg on close must not hide the error of the model
+        if video is not None:
+            video.abort()
+        raise
+    if video is None:
+        return 0
+    video.close()
+    return video.frames
+
+
+@exception_handler
+def generate_examples(
+    directory: Path,
+    config_path: Path,
+    output_dir: Path,
+    batch_size: Optional[int] = None,
+    img2vid_seconds: float = 5.0,
+    img2vid_fps: int = 25,
+    audio_fps: int = 44100,
+) -> Dict[str, Path]:
+    """
+    Run model.py on the input examples of the config, write output examples
+    to output_dir and set their paths in the config
+    """
+    config = config_processor.read_config(config_path)
+    batch_size = batch_size or config.batch_size
+    modes = {mode.value for mode in config.modes}
+    meta = example_meta(config)
+    model = local_model.load_model(directory)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = {}
+
+    if modes & {"IMG2IMG", "VID2IMG"}:
+        path = output_dir / "image_output_example.jpg"
+        if "IMG2IMG" in modes:
+            if config.image_input_example is None:
+                raise ValueError("Config must contain image_input_example")
+            image = local_model.read_image(config.image_input_example)
+            result = model.predict_batch([{"image": image, "meta": meta}], draw=True)[0]
+        else:
+            if config.video_input_example is None:
+                raise ValueError("Config must contain video_input_example")
+            reader = local_model.VideoReader(config.video_input_example)
+            local_model.init_model(model, **reader.init_kwargs())
+            result = None
+            try:
+                for batch in local_model.batched(reader.frames(), batch_size):
+                    results = model.predict_batch(
+                        [{"image": frame, "meta": meta} for frame in batch], draw=True
+                    )
+                    result = results[-1]
+            finally:
+                reader.close()
+            if result is None:
+                raise ValueError(f"There are no frames in {config.video_input_example}")
+        if "image" not in result:
+            raise ValueError("Model returned no image for draw=True")
+        local_model.write_image(path, result["image"])
+        outputs["image_output_example"] = path
+
+    if modes & {"VID2VID", "IMG2VID"}:
+        path = output_dir / "video_output_example.mp4"
+        if "VID2VID" in modes:
+            if config.video_input_example is None:
+                raise ValueError("Config must contain video_input_example")
+            reader = local_model.VideoReader(config.video_input_example)
+            frames = local_model.prefetch(reader.frames(), 2 * batch_size)
+            try:
+                count = encode_video_example(
+                    model,
+                    frames,
+                    reader.init_kwargs(),
+                    meta,
+                    batch_size,
+                    path,
+                    audio_source=config.video_input_example,
+                    audio_fps=audio_fps,
+                )
+            finally:
+                frames.close()
+                reader.close()
+        else:
+            if config.image_input_example is None:
+                raise ValueError("Config must contain image_input_example")
+            image = local_model.read_image(config.image_input_example)
+            length = int(img2vid_seconds * img2vid_fps)
+            init_kwargs = {
+                "height": image.shape[0],
+                "width": image.shape[1],
+                "fps": img2vid_fps,
+                "length": length,
+            }
+            count = encode_video_example(
+                model,
+                (image for _ in range(length)),
+                init_kwargs,
+                meta,
+                batch_size,
+                path,
+                audio_fps=audio_fps,
+            )
+        click.echo(f"Encoded {count} frames")
+        outputs["video_output_example"] = path
+
+    for field, path in outputs.items():
+        click.echo(f"{field}: {path} ({format_size(path.stat().st_size)})")
+    config_processor.update_config_fields(config_path, outputs)
+    click.echo(f"Config {config_path} updated, peak RSS {format_size(local_model.peak_rss())}")
+    return outputs
+
+
+@exception_handler
+def bench(
+    directory: Path,
+    test_data: Path,
+    batch_sizes: List[int],
+    batches: int,
+    max_frames: int,
+    cache: bool = False,
+    cache_size: int = 1024,
+    cache_dir: Optional[Path] = None,
+) -> List["benchmark.BenchResult"]:
+    """
+    Benchmark predict_batch of model.py in-process on test_data images and videos.
+    With `cache` repeated samples are answered from the result cache,
+    the numbers show the cost of the lookups, not of the model
+    """
+
+    model = local_model.load_model(directory)
+    if cache or cache_dir is not None:
+        model = cached_model(model, directory, cache_size, cache_dir)
+
+    sources = local_model.load_sources(test_data, max_frames)
+    if not sources:
+        raise ValueError(f"There is no test data in {test_data}")
+
+    results = []
+    for source, samples, init_kwargs in sources:
+        before = lambda: None
+        if init_kwargs:
+            before = partial(local_model.init_model, model, **init_kwargs)
+        for batch_size in batch_sizes:
+            for draw in (False, True):
+                click.echo(f"Bench {source} batch_size={batch_size} draw={draw} ...")
+                results.append(
+                    benchmark.measure(
+                        model,
+                        source,
+                        samples,
+                        batch_size,
+                        draw,
+                        batches,
+                        before=before,
+                    )
+                )
+    click.echo(benchmark.format_table(results))
+    if isinstance(model, result_cache.CachedModel):
+        click.echo(result_cache.format_stats(model.cache.stats))
+    return results
@@ -0,0 +1,202 @@
+"""
+Packed test samples: raw uint8 frames with a fixed-layout index,
+read back through np.memmap as zero-copy views. Nothing is unpickled on read.
+
+Layout of a .vhds file, little endian:
+    header  64 bytes: magic, version, count, index_offset, info_offset, info_length
+    frames  raw (H, W, C) uint8 arrays, every frame starts at a 64 byte boundary
+    meta    JSON of every sample meta
+    index   `count` records of INDEX_DTYPE
+    info    JSON with the sources list: images and videos with their fps and length
+"""
+
+import json
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from . import local_model
+
+MAGIC = b"VHDS"
+VERSION = 1
+EXTENSION = ".vhds"
+HEADER = struct.Struct("<4sIQQQQ")
+HEADER_SIZE = 64
+ALIGNMENT = 64
+INDEX_DTYPE = np.dtype(
+    [
+        ("offset", "<u8"),
+        ("height", "<u4"),
+        ("width", "<u4"),
+        ("channels", "<u4"),
+        ("source", "<u4"),
+        ("meta_offset", "<u8"),
+        ("meta_length", "<u4"),
+        ("reserved", "<u4"),
+    ]
+)
+
+
+class DatasetWriter:
+    """
+    Appends frames to the file as they come, index is written on close
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(b"\0" * HEADER_SIZE)
+        self._records: List[tuple] = []
+        self._metas: List[bytes] = []
+        self.sources: List[Dict[str, Any]] = []
+
+    def add_source(self, name: str, kind: str, **info) -> int:
+        """
+        Register image set or video, returns its number for `add`
+        """
+        self.sources.append(dict(info, name=name, kind=kind))
+        return len(self.sources) - 1
+
+    def add(self, image: np.ndarray, meta: Dict[str, Any], source: int):
+        if image.dtype != np.uint8:
+            raise ValueError(f"Only uint8 images can be packed, got {image.dtype}")
+        if image.ndim == 2:
+            image = image[:, :, None]
+        position = self._file.tell()
+        padding = -position % ALIGNMENT
+        self._file.write(b"\0" * padding)
+        offset = position + padding
+        self._file.write(np.ascontiguousarray(image).tobytes())
+        meta_bytes = json.dumps(meta).encode()
+        self._records.append((offset, *image.shape, source, 0, len(meta_bytes), 0))
+        self._metas.append(meta_bytes)
+
+    @property
+    def count(self) -> int:
+        return len(self._records)
+
+    def close(self):
+        index = np.array(self._records, dtype=INDEX_DTYPE)
+        for i, meta_bytes in enumerate(self._metas):
+            index["meta_offset"][i] = self._file.tell()
+            self._file.write(meta_bytes)
+        padding = -self._file.tell() % ALIGNMENT
+        self._file.write(b"\0" * padding)
+        index_offset = self._file.tell()
+        self._file.write(index.tobytes())
+        info = json.dumps({"sources": self.sources}).encode()
+        info_offset = self._file.tell()
+        self._file.write(info)
+        self._file.seek(0)
+        self._file.write(
+            HEADER.pack(MAGIC, VERSION, len(index), index_offset, info_offset, len(info))
+        )
+        self._file.close()
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DatasetReader:
+    """
+    Memory-mapped packed samples, images are read-only views of the file
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(self._data) < HEADER_SIZE:
+            raise ValueError(f"{path} is not a packed dataset")
+        magic, version, count, index_offset, info_offset, info_length = HEADER.unpack(
+            bytes(self._data[: HEADER.size])
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a packed dataset")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported version {version}")
+        index_end = index_offset + count * INDEX_DTYPE.itemsize
+        if index_end > info_offset or info_offset + info_length > len(self._data):
+            raise ValueError(f"{path} is truncated")
+        self.index = np.frombuffer(
+            self._data, dtype=INDEX_DTYPE, count=count, offset=index_offset
+        )
+        info = bytes(self._data[info_offset : info_offset + info_length])
+        self.sources: List[Dict[str, Any]] = json.loads(info)["sources"]
+        # rows of every source in the file order, grouped once for all sources
+        order = np.argsort(self.index["source"], kind="stable")
+        numbers, starts = np.unique(self.index["source"][order], return_index=True)
+        self._rows: Dict[int, np.ndarray] = dict(
+            zip(numbers.tolist(), np.split(order, starts[1:]))
+        )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def image(self, i: int) -> np.ndarray:
+        record = self.index[i]
+        shape = (int(record["height"]), int(record["width"]), int(record["channels"]))
+        offset = int(record["offset"])
+        size = shape[0] * shape[1] * shape[2]
+        if offset + size > len(self._data):
+            raise ValueError(f"{self.path} is truncated")
+        return self._data[offset : offset + size].reshape(shape)
+
+    def meta(self, i: int) -> Dict[str, Any]:
+        record = self.index[i]
+        start = int(record["meta_offset"])
+        return json.loads(bytes(self._data[start : start + int(record["meta_length"])]))
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return {"image": self.image(i), "meta": self.meta(i)}
+
+    def samples(self, source: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        rows = range(len(self)) if source is None else self._rows.get(source, ())
+        for i in rows:
+            yield self[int(i)]
+
+
+def pack(
+    test_data: Path,
+    output_path: Path,
+    max_frames: Optional[int] = None,
+    trust_pickles: bool = False,
+) -> int:
+    """
+    Pack images, videos and (optionally) pickled samples of test_data.
+    Meta of an image is read from the JSON file next to it, e.g. surfing.json.
+    Returns number of packed samples
+    """
+    with DatasetWriter(output_path) as writer:
+        for path in sorted(p for p in test_data.rglob("*") if p.is_file()):
+            suffix = path.suffix.lower()
+            name = str(path.relative_to(test_data))
+            if suffix in local_model.IMAGE_EXTENSIONS:
+                source = writer.add_source(name, "image")
+                writer.add(local_model.read_image(path), read_sidecar_meta(path), source)
+            elif suffix == ".pickle" and trust_pickles:
+                source = writer.add_source(name, "image")
+                for sample in local_model.pickled_samples(path):
+                    writer.add(sample["image"], sample.get("meta", {}), source)
+            elif suffix in local_model.VIDEO_EXTENSIONS:
+                reader = local_model.VideoReader(path)
+                source = writer.add_source(name, "video", **reader.init_kwargs())
+                meta = read_sidecar_meta(path)
+                count = writer.count
+                for frame in reader.frames(max_frames):
+                    writer.add(frame, meta, source)
+                reader.close()
+                writer.sources[source]["length"] = writer.count - count
+        return writer.count
+
+
+def read_sidecar_meta(path: Path) -> Dict[str, Any]:
+    meta_path = path.with_suffix(".json")
+    if not meta_path.is_file():
+        return {}
+    with open(meta_path, "r") as file_:
+        return json.load(file_)
@@ -0,0 +1,77 @@
+"""
+Manifest of the last successful deploy. Keeps content hashes of every
+deployed field, so the next deploy sends only changed fields
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Mapping
+
+MANIFESTS_DIR = Path(".visionhub/manifests")
+CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_:
+        for chunk in iter(lambda: file_.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_value(value: Any) -> bytes:
+    return json.dumps(value, default=str, sort_keys=True).encode()
+
+
+def fingerprint(data: Mapping[str, Any], files: Mapping[str, Path]) -> Dict[str, str]:
+    """
+    Hash of every field: content of the file for file fields, value otherwise
+    """
+    result = {
+        field: "value:" + hashlib.sha256(encode_value(value)).hexdigest()
+        for field, value in data.items()
+    }
+    for field, path in files.items():
+        result[field] = "file:" + hash_file(path)
+    return result
+
+
+def manifest_path(address: str, slug: str) -> Path:
+    return MANIFESTS_DIR / address.split("://")[-1].replace("/", "_") / f"{slug}.json"
+
+
+def load_manifest(address: str, slug: str) -> Dict[str, str]:
+    try:
+        with open(manifest_path(address, slug), "r") as file_:
+            return json.load(file_)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(address: str, slug: str, manifest: Mapping[str, str]):
+    path = manifest_path(address, slug)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as file_:
+        json.dump(manifest, file_, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def changed_fields(old: Mapping[str, str], new: Mapping[str, str]) -> List[str]:
+    return sorted(field for field, digest in new.items() if old.get(field) != digest)
+
+
+def payload_size(
+    data: Mapping[str, Any], files: Mapping[str, Path], fields: List[str]
+) -> int:
+    """
+    Approximate number of bytes deploy sends for the fields
+    """
+    size = 0
+    for field in fields:
+        if field in files:
+            size += files[field].stat().st_size
+        else:
+            size += len(str(data[field]).encode())
+    return size
@@ -0,0 +1,216 @@
+"""
+Fast dev loop: model.py lives in a long-lived worker process, edited python
+modules of the model directory are re-executed in place and init/predict_batch
+run again on a few samples of test_data.
+
+Module level names listed in `__cacheable__` survive the reload, the module
+reuses them instead of loading weights again:
+
+    __cacheable__ = ("NET",)
+    NET = globals().get("NET") or load_net()
+"""
+
+import sys
+import json
+import time
+import signal
+import traceback
+import multiprocessing
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from . import local_model
+
+PREDICTION_WIDTH = 160
+
+
+class Iteration(BaseModel):
+    """
+    One run of the model after a change, times in seconds
+    """
+
+    number: int
+    changed: List[str] = []
+    reloaded: List[str] = []
+    timings: Dict[str, float] = {}
+    prediction: str = ""
+    error: Optional[str] = None
+
+
+def python_files(directory: Path) -> Dict[Path, float]:
+    """
+    Modification times of the python files of the model directory
+    """
+    files = {}
+    for path in directory.rglob("*.py"):
+        relative = path.relative_to(directory)
+        if any(part.startswith(".") or part == "__pycache__" for part in relative.parts):
+            continue
+        files[path.resolve()] = path.stat().st_mtime
+    return files
+
+
+def changed_files(before: Dict[Path, float], after: Dict[Path, float]) -> List[Path]:
+    return sorted(
+        path for path in set(before) | set(after) if before.get(path) != after.get(path)
+    )
+
+
+def reload_module(module: ModuleType):
+    """
+    Execute the new code of the module in its namespace. Names of `__cacheable__`
+    are kept, other names are removed, so nothing stale is left from the old code
+    """
+    keep = set(getattr(module, "__cacheable__", ()))
+    for name in list(vars(module)):
+        if not (name.startswith("__") and name.endswith("__")) and name not in keep:
+            delattr(module, name)
+    module.__spec__.loader.exec_module(module)
+
+
+def model_modules(directory: Path) -> Dict[Path, ModuleType]:
+    """
+    Imported modules defined in the files of the model directory
+    """
+    modules = {}
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and Path(path).resolve().parent == directory.resolve():
+            modules[Path(path).resolve()] = module
+    return modules
+
+
+class Worker:
+    """
+    Owns the model in the worker process, runs one iteration per command
+    """
+
+    def __init__(self, directory: Path, test_data: Path, batch_size: int, samples: int):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.sources = local_model.load_sources(test_data, samples)
+        for i, (name, source_samples, init_kwargs) in enumerate(self.sources):
+            self.sources[i] = (name, source_samples[:samples], init_kwargs)
+        self.model: Optional[ModuleType] = None
+        self.number = 0
+
+    def load(self, changed: List[Path]) -> List[str]:
+        if self.model is None:
+            self.model = local_model.load_model(self.directory)
+            return [self.model.__name__]
+        modules = model_modules(self.directory)
+        model_path = Path(self.model.__file__).resolve()
+        reloaded = []
+        for path in changed:
+            if path in modules and path != model_path:
+                reload_module(modules[path])
+                reloaded.append(modules[path].__name__)
+        # model.py binds names of the reloaded modules by `from ... import`
+        reload_module(self.model)
+        reloaded.append(self.model.__name__)
+        return reloaded
+
+    def run(self, changed: List[Path]) -> Iteration:
+        self.number += 1
+        iteration = Iteration(
+            number=self.number, changed=[path.name for path in changed]
+        )
+        try:
+            start = time.perf_counter()
+            iteration.reloaded = self.load(changed)
+            iteration.timings["reload"] = time.perf_counter() - start
+            for name, samples, init_kwargs in self.sources:
+                if init_kwargs:
+                    start = time.perf_counter()
+                    local_model.init_model(self.model, **init_kwargs)
+                    iteration.timings[f"{name} init"] = time.perf_counter() - start
+                start = time.perf_counter()
+                results = []
+                for batch in local_model.batched(samples, self.batch_size):
+                    results += self.model.predict_batch(batch, draw=True)
+                iteration.timings[f"{name} predict"] = time.perf_counter() - start
+                if not iteration.prediction and results:
+                    iteration.prediction = json.dumps(
+                        results[0].get("prediction"), default=str
+                    )[:PREDICTION_WIDTH]
+        except Exception:  # broken edit must not stop the loop
+            iteration.error = traceback.format_exc()
+        return iteration
+
+
+def _serve_worker(connection, directory: str, test_data: str, batch_size: int, samples: int):
+    # Ctrl+C stops the loop in the main process, it stops the worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = Worker(Path(directory), Path(test_data), batch_size, samples)
+    while True:
+        changed = connection.recv()
+        if changed is None:
+            break
+        connection.send(worker.run(changed))
+
+
+class DevSession:
+    """
+    Worker process with the model, restarted if it dies
+    """
+
+    def __init__(self, directory: Path, test_data: Path, batch_size: int, samples: int):
+        self._args = (str(directory), str(test_data), batch_size, samples)
+        self._process: Optional[multiprocessing.Process] = None
+        self._connection = None
+
+    def _start(self):
+        self._connection, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve_worker, args=(child, *self._args), daemon=True
+        )
+        self._process.start()
+        child.close()
+
+    def run(self, changed: List[Path]) -> Iteration:
+        if self._process is None or not self._process.is_alive():
+            self._start()
+            changed = []
+        try:
+            self._connection.send(changed)
+            return self._connection.recv()
+        except (EOFError, BrokenPipeError):
+            code = self._process.exitcode if self._process else None
+            self._process = None
+            return Iteration(
+                number=0,
+                error=f"Worker process died (exit code {code}), "
+                "the model is loaded from scratch on the next change",
+            )
+
+    def close(self):
+        if self._process is not None and self._process.is_alive():
+            try:
+                self._connection.send(None)
+            except BrokenPipeError:
+                pass
+            self._process.join(5)
+            if self._process.is_alive():
+                self._process.terminate()
+
+
+def format_iteration(iteration: Iteration, previous: Optional[Iteration]) -> str:
+    changed = ", ".join(iteration.changed) or "start"
+    lines = [f"#{iteration.number} {changed}: reloaded {', '.join(iteration.reloaded)}"]
+    if iteration.error:
+        lines.append(iteration.error.rstrip())
+        return "\n".join(lines)
+    before = previous.timings if previous is not None and not previous.error else {}
+    for key, value in iteration.timings.items():
+        delta = ""
+        if key in before and key != "reload":
+            change = value - before[key]
+            share = f", {change / before[key]:+.0%}" if before[key] else ""
+            delta = f"  ({change * 1000:+.1f} ms{share})"
+        lines.append(f"  {key:<40} {value * 1000:>9.1f} ms{delta}")
+    if iteration.prediction:
+        lines.append(f"  prediction {iteration.prediction}")
+    return "\n".join(lines)
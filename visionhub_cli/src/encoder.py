@@ -0,0 +1,168 @@
+"""
+Video encoding through an ffmpeg subprocess. Frames go to its stdin,
+sound chunks to a second pipe, both are written by background threads
+from bounded queues, so only a few frames are held in memory
+"""
+
+import os
+import queue
+import shutil
+import threading
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+# frames waiting for ffmpeg
+QUEUE_SIZE = 16
+# ffmpeg stops reading sound that is ahead of the encoded video, and the video
+# encoder holds a few dozens of frames in its lookahead, so sound chunks need
+# a deeper queue than frames. Chunks are small, seconds of sound take a few MB
+SOUND_QUEUE_SECONDS = 10
+_END = object()
+
+
+def find_ffmpeg() -> str:
+    """
+    VISIONHUB_FFMPEG, ffmpeg from PATH or the binary of imageio-ffmpeg (a moviepy dependency)
+    """
+    path = os.environ.get("VISIONHUB_FFMPEG") or shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        raise ValueError("ffmpeg is not found, install it or set VISIONHUB_FFMPEG")
+
+
+class _PipeWriter:
+    """
+    Writes byte buffers from a bounded queue to a pipe in a background thread
+    """
+
+    def __init__(self, pipe, size: int = QUEUE_SIZE):
+        self._pipe = pipe
+        self._queue: "queue.Queue" = queue.Queue(size)
+        self.error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                data = self._queue.get()
+                if data is _END:
+                    break
+                self._pipe.write(data)
+        except (BrokenPipeError, OSError) as exc:
+            self.error = exc
+            # drain the queue, so the producer is not blocked forever
+            while self._queue.get() is not _END:
+                pass
+        finally:
+            try:
+                self._pipe.close()
+            except OSError:
+                pass
+
+    def put(self, data: bytes):
+        self._queue.put(data)
+
+    def close(self):
+        self._queue.put(_END)
+        self._thread.join()
+
+
+class VideoEncoder:
+    """
+    H.264/AAC mp4 from RGB frames and optional float32 sound chunks.
+    If the model returns no sound, audio of `audio_source` (the input video) is kept
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        width: int,
+        height: int,
+        fps: int,
+        audio_fps: Optional[int] = None,
+        audio_channels: int = 2,
+        audio_source: Optional[Path] = None,
+        crf: int = 23,
+    ):
+        self.path = path
+        self.frame_bytes = width * height * 3
+        command = [find_ffmpeg(), *"-hide_banner -loglevel error -y".split()]
+        # formats of the raw inputs are given, probing them would read seconds of
+        # one pipe while the other one is full and deadlock with the bounded queues
+        no_probe = "-probesize 32 -analyzeduration 0"
+        command += (
+            f"-f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {fps} {no_probe} -i pipe:0"
+        ).split()
+        pass_fds = ()
+        audio_write = None
+        if audio_fps is not None:
+            audio_read, audio_write = os.pipe()
+            pass_fds = (audio_read,)
+            command += (
+                f"-f f32le -ar {audio_fps} -ac {audio_channels} {no_probe} -i pipe:{audio_read}"
+            ).split()
+            command += "-map 0:v -map 1:a".split()
+        elif audio_source is not None:
+            # the file may have no sound or longer sound than the model output
+            command += ["-i", str(audio_source), *"-map 0:v -map 1:a? -shortest".split()]
+        else:
+            command += ["-map", "0:v"]
+        command += (
+            f"-c:v libx264 -crf {crf} -preset medium -pix_fmt yuv420p "
+            "-c:a aac -movflags +faststart"
+        ).split()
+        command.append(str(path))
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stderr=subprocess.PIPE, pass_fds=pass_fds
+        )
+        self._video = _PipeWriter(self._process.stdin)
+        self._audio = None
+        if audio_write is not None:
+            os.close(audio_read)
+            self._audio = _PipeWriter(
+                os.fdopen(audio_write, "wb"), size=int(SOUND_QUEUE_SECONDS * fps)
+            )
+        self.frames = 0
+
+    def write_frame(self, frame) -> None:
+        # a copy, the model may reuse its output buffers in the next batch
+        data = frame.tobytes()
+        if len(data) != self.frame_bytes:
+            raise ValueError(
+                f"Frame {self.frames} has shape {frame.shape}, the video has other size"
+            )
+        self._video.put(data)
+        self.frames += 1
+
+    def write_sound(self, chunk) -> None:
+        if self._audio is not None:
+            self._audio.put(chunk.astype("<f4", copy=False).tobytes())
+
+    def close(self) -> None:
+        self._video.close()
+        if self._audio is not None:
+            self._audio.close()
+        # stdin is already closed by its writer, communicate() would flush it
+        stderr = self._process.stderr.read()
+        if self._process.wait() != 0:
+            raise ValueError(f"ffmpeg failed to encode {self.path}: {stderr.decode().strip()}")
+
+    def abort(self) -> None:
+        """
+        Stop ffmpeg on an error of the caller without raising its own error,
+        the incomplete video is removed
+        """
+        self._process.kill()
+        self._video.close()
+        if self._audio is not None:
+            self._audio.close()
+        self._process.wait()
+        self._process.stderr.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,230 @@
+"""
+Layer sizes of the built image attributed to the Dockerfile instructions,
+common causes of image bloat and the image size budget
+"""
+
+import os
+import hashlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .build_context import context_files, CHUNK_SIZE, CONTEXT_HASH_LABEL
+from .utils import format_size
+
+NOP_PREFIX = "/bin/sh -c #(nop) "
+SHELL_PREFIX = "/bin/sh -c "
+BUILDKIT_SUFFIX = " # buildkit"
+# smaller identical files (configs, small assets) are not worth to report
+DUPLICATE_MIN_SIZE = 1 << 20
+
+
+class Layer(BaseModel):
+    """
+    One entry of the image history
+    """
+
+    instruction: str
+    size: int
+    base: bool = False
+
+
+class ImageReport(BaseModel):
+    """
+    Size of the image, its layers and found bloat
+    """
+
+    link: str
+    size: int
+    base_size: int = 0
+    layers: List[Layer] = []
+    warnings: List[str] = []
+
+
+def read_dockerfile(directory: Path) -> List[str]:
+    """
+    Instructions of the Dockerfile with continuation lines joined
+    """
+    path = directory / "Dockerfile"
+    if not path.is_file():
+        return []
+    instructions = []
+    current = ""
+    with open(path, "r") as file_:
+        for line in file_:
+            stripped = line.strip()
+            if not current and (not stripped or stripped.startswith("#")):
+                continue
+            if stripped.startswith("#"):
+                continue
+            if stripped.endswith("\\"):
+                current += stripped[:-1].strip() + " "
+                continue
+            instructions.append(current + stripped)
+            current = ""
+    if current:
+        instructions.append(current.strip())
+    return instructions
+
+
+def final_stage(instructions: List[str]) -> List[str]:
+    """
+    Instructions after the last FROM, they make the layers on top of the base image
+    """
+    starts = [
+        i for i, instruction in enumerate(instructions)
+        if instruction.upper().startswith("FROM ")
+    ]
+    return instructions[starts[-1] + 1 :] if starts else instructions
+
+
+def history_instruction(created_by: str) -> str:
+    """
+    Dockerfile-like instruction from the CreatedBy field of the image history
+    """
+    if created_by.startswith(NOP_PREFIX):
+        return created_by[len(NOP_PREFIX) :].strip()
+    if created_by.endswith(BUILDKIT_SUFFIX):
+        return created_by[: -len(BUILDKIT_SUFFIX)].strip()
+    if created_by.startswith(SHELL_PREFIX):
+        return "RUN " + created_by[len(SHELL_PREFIX) :].strip()
+    return created_by.strip()
+
+
+def builder_label(entry: Dict[str, Any]) -> bool:
+    """
+    LABEL entry the classic builder appends for the `labels` build argument,
+    it has no line in the Dockerfile
+    """
+    instruction = history_instruction(entry.get("CreatedBy", ""))
+    return instruction.upper().startswith("LABEL ") and CONTEXT_HASH_LABEL in instruction
+
+
+def image_layers(history: List[Dict[str, Any]], instructions: List[str]) -> List[Layer]:
+    """
+    Layers from the oldest to the newest. Both builders make one history entry
+    per instruction, so the newest entries match the final stage of the Dockerfile
+    once the entry of the build labels is dropped
+    """
+    entries = list(reversed(history))
+    while entries and builder_label(entries[-1]):
+        entries.pop()
+    own = len(instructions) if len(instructions) <= len(entries) else 0
+    layers = []
+    for i, entry in enumerate(entries):
+        base = i < len(entries) - own
+        if base:
+            instruction = history_instruction(entry.get("CreatedBy", ""))
+        else:
+            instruction = instructions[i - (len(entries) - own)]
+        layers.append(Layer(instruction=instruction, size=entry.get("Size", 0), base=base))
+    return layers
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_:
+        for chunk in iter(lambda: file_.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def duplicate_files(directory: Path, paths: List[str]) -> List[List[str]]:
+    """
+    Groups of identical large files of the build context
+    """
+    by_size = defaultdict(list)
+    for path in paths:
+        size = os.path.getsize(directory / path)
+        if size >= DUPLICATE_MIN_SIZE:
+            by_size[size].append(path)
+    groups = []
+    for same_size in by_size.values():
+        if len(same_size) < 2:
+            continue
+        by_hash = defaultdict(list)
+        for path in same_size:
+            by_hash[file_hash(directory / path)].append(path)
+        groups += [group for group in by_hash.values() if len(group) > 1]
+    return groups
+
+
+def find_bloat(directory: Path, layers: List[Layer]) -> List[str]:
+    warnings = []
+    full_copy = None
+    copies = []
+    for layer in layers:
+        if layer.base:
+            continue
+        instruction = layer.instruction
+        keyword = instruction.split(" ", 1)[0].upper()
+        if keyword == "RUN" and "apt-get install" in instruction:
+            if "/var/lib/apt/lists" not in instruction:
+                warnings.append(
+                    f"apt cache is kept in the layer ({format_size(layer.size)}), "
+                    "add `&& rm -rf /var/lib/apt/lists/*` to the same RUN"
+                )
+        if keyword == "RUN" and "pip install" in instruction:
+            if "--no-cache-dir" not in instruction:
+                warnings.append(
+                    f"pip cache is kept in the layer ({format_size(layer.size)}), "
+                    "use `pip install --no-cache-dir`"
+                )
+        if keyword in ("COPY", "ADD") and "--from=" not in instruction:
+            sources = instruction.split()[1:-1]
+            if "." in sources or "./" in sources:
+                full_copy = layer
+                warnings.append(
+                    f"`{instruction}` copies the whole build context "
+                    f"({format_size(layer.size)}), copy only the files the model needs "
+                    "or exclude test data, assets and notebooks in .dockerignore"
+                )
+            else:
+                copies.append(layer)
+    if full_copy is not None:
+        for layer in copies:
+            warnings.append(
+                f"`{layer.instruction}` ({format_size(layer.size)}) duplicates files "
+                f"already copied by `{full_copy.instruction}`"
+            )
+
+    for group in duplicate_files(directory, context_files(directory)):
+        size = os.path.getsize(directory / group[0])
+        warnings.append(
+            f"{len(group)} identical files of {format_size(size)} in the build context: "
+            + ", ".join(group)
+        )
+    return warnings
+
+
+def analyze_image(api_client: Any, link: str, directory: Path) -> ImageReport:
+    """
+    Inspect the local image `link` built from `directory`
+    """
+    layers = image_layers(
+        api_client.history(link), final_stage(read_dockerfile(directory))
+    )
+    return ImageReport(
+        link=link,
+        size=api_client.inspect_image(link).get("Size", 0),
+        base_size=sum(layer.size for layer in layers if layer.base),
+        layers=layers,
+        warnings=find_bloat(directory, layers),
+    )
+
+
+def format_report(report: ImageReport, max_size: Optional[int] = None) -> str:
+    budget = f" of {format_size(max_size)} budget" if max_size else ""
+    lines = [
+        f"Image {report.link}: {format_size(report.size)}{budget}",
+        f"  {format_size(report.base_size):>10}  base image",
+    ]
+    for layer in report.layers:
+        if layer.base or not layer.size:
+            continue
+        lines.append(f"  {format_size(layer.size):>10}  {layer.instruction[:80]}")
+    for warning in report.warnings:
+        lines.append(f"Warning: {warning}")
+    return "\n".join(lines)
@@ -0,0 +1,113 @@
+"""
+Startup time check of visionhub-cli using `python -X importtime`
+
+Usage: python -m visionhub_cli.src.importtime [--budget-ms 150] [-- <cli args>]
+"""
+
+import sys
+import subprocess
+from typing import Dict, List, NamedTuple, Sequence
+
+import click
+
+HEAVY_MODULES = ("docker", "requests", "pydantic", "yaml", "numpy", "cv2", "zmq")
+
+
+class ImportRecord(NamedTuple):
+    """
+    One line of `-X importtime` output, times in microseconds
+    """
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """
+    Parse `-X importtime` report lines
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # header line
+            continue
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        records.append(
+            ImportRecord(
+                module=stripped,
+                self_us=int(fields[0]),
+                cumulative_us=int(fields[1]),
+                depth=(len(name) - len(stripped) - 1) // 2,
+            )
+        )
+    return records
+
+
+def measure_import_time(cli_args: Sequence[str]) -> List[ImportRecord]:
+    """
+    Run visionhub-cli in a fresh interpreter and collect its import report
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "visionhub_cli", *cli_args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    return parse_importtime(process.stderr)
+
+
+def top_level_cost(records: List[ImportRecord]) -> Dict[str, int]:
+    """
+    Cumulative import time grouped by top level package
+    """
+    result: Dict[str, int] = {}
+    for record in records:
+        if record.depth == 0:
+            package = record.module.split(".")[0]
+            result[package] = result.get(package, 0) + record.cumulative_us
+    return result
+
+
+def format_report(records: List[ImportRecord], limit: int = 15) -> str:
+    lines = [f"{'package':<32} {'cumulative, ms':>14}"]
+    costs = sorted(top_level_cost(records).items(), key=lambda x: -x[1])
+    for package, cumulative_us in costs[:limit]:
+        lines.append(f"{package:<32} {cumulative_us / 1000:>14.1f}")
+    return "\n".join(lines)
+
+
+@click.command()
+@click.option("--budget-ms", default=150.0, help="Maximum import time of visionhub_cli")
+@click.option("--repeat", default=3, help="Best of N runs is compared with budget")
+@click.argument("cli_args", nargs=-1)
+def main(budget_ms: float, repeat: int, cli_args: Sequence[str]):
+    """
+    Check that CLI startup fits the budget and does not import heavy modules
+    """
+    cli_args = cli_args or ("--version",)
+    runs = [measure_import_time(cli_args) for _ in range(repeat)]
+    best = min(runs, key=lambda records: top_level_cost(records).get("visionhub_cli", 0))
+    click.echo(format_report(best))
+
+    failed = False
+    imported_heavy = sorted(
+        {record.module.split(".")[0] for record in best} & set(HEAVY_MODULES)
+    )
+    if imported_heavy:
+        click.echo(f"Heavy modules imported at startup: {', '.join(imported_heavy)}")
+        failed = True
+    startup_ms = top_level_cost(best).get("visionhub_cli", 0) / 1000
+    click.echo(f"visionhub_cli import: {startup_ms:.1f} ms (budget {budget_ms:.1f} ms)")
+    if startup_ms > budget_ms:
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Local stand-in for the platform side of the container runner queues
+and an open-loop load generator on top of it.
+
+The runner binds `dataset_addr` and `result_addr` (see example/Dockerfile),
+the stand-in connects a PUSH socket to the dataset queue and a PULL socket
+to the result queue. Samples are sent as pickled dicts with an extra "id" key;
+results without "id" are matched to samples in the order they were sent.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .benchmark import BenchResult, bench_result, make_batches, percentile
+
+try:
+    import zmq
+except ImportError:
+    zmq = None
+
+# id of the warm-up sample, the measured samples have integer ids
+WARMUP_ID = "warmup"
+# frames taken from every video of the test data
+MAX_FRAMES = 64
+
+
+class LoadStepResult(BaseModel):
+    """
+    Measurements of one offered rate, times in seconds
+    """
+
+    offered_rate: float
+    achieved_rate: float
+    sent: int
+    received: int
+    queue_p50: float
+    queue_p95: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    saturated: bool
+
+
+class QueueStandIn:
+    """
+    Platform side of the dataset/result queues
+    """
+
+    def __init__(self, dataset_addr: str, result_addr: str, timeout: float = 30.0):
+        if zmq is None:
+            raise ValueError("loadtest requires pyzmq, install it with `pip install pyzmq`")
+        self._context = zmq.Context()
+        self._dataset = self._context.socket(zmq.PUSH)
+        self._dataset.connect(dataset_addr)
+        self._result = self._context.socket(zmq.PULL)
+        self._result.setsockopt(zmq.RCVTIMEO, int(timeout * 1000))
+        self._result.connect(result_addr)
+
+    def send(self, sample: Dict[str, Any]):
+        self._dataset.send_pyobj(sample)
+
+    def receive(self) -> Optional[Dict[str, Any]]:
+        """
+        Next result, None on timeout
+        """
+        try:
+            return self._result.recv_pyobj()
+        except zmq.Again:
+            return None
+
+    def wait_ready(
+        self,
+        sample: Dict[str, Any],
+        timeout: float = 600.0,
+        is_alive: Callable[[], bool] = lambda: True,
+    ) -> float:
+        """
+        Send one warm-up sample and wait for its result, the model may load
+        its weights for minutes. Returns seconds waited
+        """
+        start = time.perf_counter()
+        self.send(dict(sample, id=WARMUP_ID))
+        while time.perf_counter() - start < timeout:
+            if self._result.poll(1000):
+                self._result.recv_pyobj()
+                return time.perf_counter() - start
+            if not is_alive():
+                raise ValueError("Model exited before it returned the warm-up result")
+        raise ValueError(f"Model returned no warm-up result in {timeout:.0f}s")
+
+    def close(self):
+        self._dataset.close(linger=0)
+        self._result.close(linger=0)
+        self._context.term()
+
+
+class LoadGenerator:
+    """
+    Sends samples on a fixed schedule with bounded number of samples in flight.
+    Queueing delay is the time between scheduled and actual send,
+    latency is the time between scheduled send and received result
+    """
+
+    def __init__(self, stand_in: QueueStandIn, samples: List[Dict[str, Any]]):
+        if not samples:
+            raise ValueError("There are no samples for the load test")
+        self.stand_in = stand_in
+        self.samples = samples
+        self._next_id = 0
+
+    def run(self, rate: float, concurrency: int, duration: float) -> LoadStepResult:
+        slots = threading.Semaphore(concurrency)
+        scheduled: Dict[int, float] = {}
+        in_order = deque()
+        queue_delays = []
+        latencies = []
+        lock = threading.Lock()
+        sending_done = threading.Event()
+        total = max(1, int(rate * duration))
+
+        def receive():
+            while not (sending_done.is_set() and not scheduled):
+                result = self.stand_in.receive()
+                if result is None:
+                    # runner dropped samples or is stuck, stop waiting
+                    break
+                now = time.perf_counter()
+                with lock:
+                    sample_id = result.get("id") if isinstance(result, dict) else None
+                    if sample_id not in scheduled and in_order:
+                        sample_id = in_order[0]
+                    if sample_id not in scheduled:
+                        continue
+                    in_order.remove(sample_id)
+                    latencies.append(now - scheduled.pop(sample_id))
+                slots.release()
+
+        receiver = threading.Thread(target=receive, daemon=True)
+        receiver.start()
+        start = time.perf_counter()
+        for index in range(total):
+            planned = start + index / rate
+            delay = planned - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if not slots.acquire(timeout=max(duration, 1.0) * 2):
+                break
+            sample_id = self._next_id
+            self._next_id += 1
+            sample = dict(self.samples[index % len(self.samples)], id=sample_id)
+            with lock:
+                scheduled[sample_id] = planned
+                in_order.append(sample_id)
+            queue_delays.append(time.perf_counter() - planned)
+            self.stand_in.send(sample)
+        sending_done.set()
+        receiver.join()
+        elapsed = time.perf_counter() - start
+
+        achieved = len(latencies) / elapsed if elapsed else 0.0
+        return LoadStepResult(
+            offered_rate=rate,
+            achieved_rate=achieved,
+            sent=len(queue_delays),
+            received=len(latencies),
+            queue_p50=percentile(queue_delays, 50),
+            queue_p95=percentile(queue_delays, 95),
+            latency_p50=percentile(latencies, 50),
+            latency_p95=percentile(latencies, 95),
+            latency_p99=percentile(latencies, 99),
+            saturated=achieved < 0.9 * rate or len(latencies) < len(queue_delays),
+        )
+
+
+def sweep(
+    generator: LoadGenerator,
+    rates: List[float],
+    concurrency: int,
+    duration: float,
+    on_step: Callable[[LoadStepResult], None] = lambda result: None,
+) -> List[LoadStepResult]:
+    """
+    Increase offered rate until the model is saturated
+    """
+    results = []
+    for rate in rates:
+        result = generator.run(rate, concurrency, duration)
+        results.append(result)
+        on_step(result)
+        if result.saturated:
+            break
+    return results
+
+
+def measure_batches(
+    stand_in: QueueStandIn,
+    source: str,
+    samples: List[Dict[str, Any]],
+    batch_size: int,
+    batches: int,
+) -> BenchResult:
+    """
+    Closed-loop benchmark of the model container: send a batch of samples,
+    wait for all its results, repeat. Comparable with benchmark.measure
+    """
+    latencies = []
+    for number, batch in enumerate(make_batches(samples, batch_size, batches)):
+        start = time.perf_counter()
+        for index, sample in enumerate(batch):
+            stand_in.send(dict(sample, id=number * batch_size + index))
+        for _ in batch:
+            if stand_in.receive() is None:
+                raise ValueError(f"Model returned no result for {source} in time")
+        latencies.append(time.perf_counter() - start)
+    return bench_result(source, batch_size, True, latencies)
+
+
+def synthetic_samples(height: int, width: int, count: int = 8) -> List[Dict[str, Any]]:
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    return [
+        {"image": rng.integers(0, 256, (height, width, 3), dtype=np.uint8), "meta": {}}
+        for _ in range(count)
+    ]
+
+
+def format_table(results: List[LoadStepResult]) -> str:
+    """
+    Format results as a plain text table, times in milliseconds
+    """
+    header = (
+        f"{'offered':>8} {'achieved':>9} {'sent':>6} {'recv':>6} {'q_p50':>8} "
+        f"{'q_p95':>8} {'p50':>8} {'p95':>8} {'p99':>8} saturated"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(
+            f"{result.offered_rate:>8.1f} {result.achieved_rate:>9.1f} "
+            f"{result.sent:>6} {result.received:>6} "
+            f"{result.queue_p50 * 1000:>8.1f} {result.queue_p95 * 1000:>8.1f} "
+            f"{result.latency_p50 * 1000:>8.1f} {result.latency_p95 * 1000:>8.1f} "
+            f"{result.latency_p99 * 1000:>8.1f} {result.saturated}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,322 @@
+"""
+Load model.py and test data locally, without docker
+"""
+
+import sys
+import time
+import resource
+import queue
+import pickle
+import itertools
+import threading
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+
+def load_model(directory: Path, module_name: str = "model") -> ModuleType:
+    """
+    Import `model.py` from directory the same way the container runner does.
+    Directory is added to sys.path, so model can import its neighbour modules
+    """
+    model_path = directory / f"{module_name}.py"
+    if not model_path.is_file():
+        raise ValueError(f"There is no {model_path}")
+    model = load_model_module(model_path)
+    if not hasattr(model, "predict_batch"):
+        raise ValueError(f"{model_path} must define predict_batch")
+    return model
+
+
+def load_model_module(model_path: Path) -> ModuleType:
+    """
+    Import module from path and register it in sys.modules
+    """
+    directory = str(model_path.resolve().parent)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(model_path.stem, str(model_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[model_path.stem] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_image(path: Path) -> Any:
+    """
+    Read image as np.ndarray of shape (H, W, 3) with RGB channels order
+    """
+    import cv2
+
+    image = cv2.imread(str(path))
+    if image is None:
+        raise ValueError(f"Can not read image {path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def write_image(path: Path, image: Any):
+    """
+    Write RGB np.ndarray image, format is chosen by the file extension
+    """
+    import cv2
+
+    if not cv2.imwrite(str(path), cv2.cvtColor(image, cv2.COLOR_RGB2BGR)):
+        raise ValueError(f"Can not write image {path}")
+
+
+def pickled_samples(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Samples of the pickle made like in PickleExample.ipynb.
+    Unpickling runs arbitrary code, use packed datasets for data of other teams
+    """
+    with open(path, "rb") as file_:
+        sample = pickle.load(file_)
+    sample.setdefault("meta", {})
+    yield sample
+
+
+def image_samples(directory: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Yield samples out of images and pickled samples stored in directory
+    """
+    for path in sorted(directory.iterdir()):
+        if path.suffix.lower() in IMAGE_EXTENSIONS:
+            yield {"image": read_image(path), "meta": {}}
+        elif path.suffix == ".pickle":
+            yield from pickled_samples(path)
+
+
+def load_sources(
+    test_data: Path, max_frames: Optional[int] = None
+) -> List[Tuple[str, List[Dict[str, Any]], Dict[str, int]]]:
+    """
+    (name, samples, init kwargs) of test data. test_data is either a directory
+    with images/ and videos/ or a packed .vhds file. Samples of packed files
+    are memory-mapped, decoding is not needed
+    """
+    from . import dataset
+
+    sources = []
+    if test_data.is_file():
+        reader = dataset.DatasetReader(test_data)
+        images = []
+        for number, source in enumerate(reader.sources):
+            if source["kind"] == "video":
+                init_kwargs = {
+                    key: source[key] for key in ("height", "width", "fps", "length")
+                }
+                samples = list(itertools.islice(reader.samples(number), max_frames))
+                sources.append((f"video:{source['name']}", samples, init_kwargs))
+            else:
+                images.extend(reader.samples(number))
+        if images:
+            sources.insert(0, ("images", images, {}))
+        return sources
+
+    images_dir = test_data / "images"
+    if images_dir.is_dir():
+        samples = list(image_samples(images_dir))
+        if samples:
+            sources.append(("images", samples, {}))
+    videos_dir = test_data / "videos"
+    if videos_dir.is_dir():
+        for path in video_paths(videos_dir):
+            reader = VideoReader(path)
+            frames = [{"image": frame, "meta": {}} for frame in reader.frames(max_frames)]
+            reader.close()
+            if frames:
+                sources.append((f"video:{path.name}", frames, reader.init_kwargs()))
+    return sources
+
+
+class VideoReader:
+    """
+    Sequential reader of the video frames
+    """
+
+    def __init__(self, path: Path):
+        import cv2
+
+        self.path = path
+        self._capture = cv2.VideoCapture(str(path))
+        if not self._capture.isOpened():
+            raise ValueError(f"Can not open video {path}")
+        self.fps = int(round(self._capture.get(cv2.CAP_PROP_FPS))) or 25
+        self.length = int(self._capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(self._capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def init_kwargs(self) -> Dict[str, int]:
+        """
+        Arguments for the model's `init`
+        """
+        return {
+            "height": self.height,
+            "width": self.width,
+            "fps": self.fps,
+            "length": self.length,
+        }
+
+    def frames(self, max_frames: Optional[int] = None) -> Iterator[Any]:
+        import cv2
+
+        count = 0
+        while max_frames is None or count < max_frames:
+            ok, frame = self._capture.read()
+            if not ok:
+                break
+            count += 1
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self):
+        self._capture.release()
+
+
+class PackedVideoReader:
+    """
+    Reader of the first video of a packed .vhds file with the VideoReader interface
+    """
+
+    def __init__(self, path: Path):
+        from . import dataset
+
+        self.path = path
+        self._dataset = dataset.DatasetReader(path)
+        videos = [
+            (number, source)
+            for number, source in enumerate(self._dataset.sources)
+            if source["kind"] == "video"
+        ]
+        if not videos:
+            raise ValueError(f"There are no videos in {path}")
+        self._source, info = videos[0]
+        self.fps = info["fps"]
+        self.length = info["length"]
+        self.width = info["width"]
+        self.height = info["height"]
+
+    def init_kwargs(self) -> Dict[str, int]:
+        return {
+            "height": self.height,
+            "width": self.width,
+            "fps": self.fps,
+            "length": self.length,
+        }
+
+    def frames(self, max_frames: Optional[int] = None) -> Iterator[Any]:
+        for count, sample in enumerate(self._dataset.samples(self._source)):
+            if max_frames is not None and count >= max_frames:
+                break
+            yield sample["image"]
+
+    def close(self):
+        pass
+
+
+def video_paths(directory: Path) -> List[Path]:
+    return [
+        path
+        for path in sorted(directory.iterdir())
+        if path.suffix.lower() in VIDEO_EXTENSIONS
+    ]
+
+
+def init_model(model: ModuleType, **kwargs):
+    """
+    Call optional `init` of the model
+    """
+    if hasattr(model, "init"):
+        model.init(**kwargs)
+
+
+_END = object()
+
+
+def prefetch(iterable: Iterable[Any], size: int) -> Iterator[Any]:
+    """
+    Produce items of iterable in a background thread.
+    At most `size` items are kept ahead, so the producer waits for the consumer.
+    When the consumer stops, the producer is joined, so the caller may release
+    what the iterable reads from, e.g. close the video capture
+    """
+    items: "queue.Queue[Any]" = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    errors = []
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as exc:  # re-raised in the consumer thread
+            errors.append(exc)
+        put(_END)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        # unblock the pending put, the producer returns after its current item
+        while True:
+            try:
+                items.get_nowait()
+            except queue.Empty:
+                break
+        thread.join()
+
+
+def timed(iterable: Iterable[Any], timings: Dict[str, float], key: str) -> Iterator[Any]:
+    """
+    Accumulate time spent producing items of iterable in timings[key]
+    """
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timings[key] = timings.get(key, 0.0) + time.perf_counter() - start
+            return
+        timings[key] = timings.get(key, 0.0) + time.perf_counter() - start
+        yield item
+
+
+def batched(iterable: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def peak_rss() -> int:
+    """
+    Peak resident memory of the process in bytes
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return usage if sys.platform == "darwin" else usage * 1024
@@ -0,0 +1,158 @@
+"""
+Local mock of the platform API used by login and deploy:
+/api/frontend/user/ and /api/frontend/model/[<slug>/]
+
+Usage: python -m visionhub_cli.src.mock_api [--port 8765] [--token TOKEN] [--fail-rate 0.3]
+    [--delay 5]
+then `visionhub-cli login -a http://localhost:8765` and `deploy -a http://localhost:8765`
+"""
+
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import click
+
+USER_PATH = "/api/frontend/user/"
+MODEL_PATH = "/api/frontend/model/"
+
+
+class MockState:
+    """
+    Models created by the requests and log of the received requests
+    """
+
+    def __init__(
+        self,
+        token: str,
+        fail_rate: float = 0.0,
+        seed: Optional[int] = None,
+        delay: float = 0.0,
+    ):
+        self.token = token
+        self.fail_rate = fail_rate
+        # seconds between handling a request and the reply, to cause client read timeouts
+        self.delay = delay
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.requests: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self._random.random() < self.fail_rate
+
+
+def parse_multipart(body: bytes, content_type: str) -> Dict[str, Optional[str]]:
+    """
+    Form fields of multipart body, values of the file fields are None
+    """
+    if "boundary=" not in content_type:
+        return {}
+    boundary = content_type.split("boundary=")[1].encode()
+    fields = {}
+    for part in body.split(b"--" + boundary):
+        head, _, value = part.partition(b"\r\n\r\n")
+        marker = b'name="'
+        if marker not in head:
+            continue
+        start = head.index(marker) + len(marker)
+        name = head[start : head.index(b'"', start)].decode()
+        is_file = b"filename=" in head
+        fields[name] = None if is_file else value[: -len(b"\r\n")].decode()
+    return fields
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, payload: Any = None):
+            if state.delay:
+                time.sleep(state.delay)
+            body = json.dumps(payload if payload is not None else {}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else b""
+            fields = parse_multipart(body, self.headers.get("Content-Type", ""))
+            with state.lock:
+                state.requests.append(
+                    {
+                        "method": self.command,
+                        "path": self.path,
+                        "bytes": len(body),
+                        "fields": sorted(fields),
+                    }
+                )
+            if state.should_fail():
+                self._reply(503, {"detail": "flaky mock"})
+                return
+            if self.headers.get("Authorization") != f"Token {state.token}":
+                self._reply(401, {"detail": "Invalid token."})
+                return
+
+            if self.path == USER_PATH and self.command == "GET":
+                self._reply(200, {"username": "mock"})
+            elif self.path == MODEL_PATH and self.command == "POST":
+                slug = fields.get("slug") or f"model-{len(state.models)}"
+                state.models[slug] = {"slug": slug}
+                self._reply(201, state.models[slug])
+            elif self.path.startswith(MODEL_PATH):
+                slug = self.path[len(MODEL_PATH) :].strip("/")
+                if slug not in state.models and self.command == "GET":
+                    self._reply(404, {"detail": "Not found."})
+                elif self.command in ("GET", "PATCH"):
+                    state.models.setdefault(slug, {"slug": slug})
+                    self._reply(200, state.models[slug])
+                else:
+                    self._reply(405)
+            else:
+                self._reply(404, {"detail": "Not found."})
+
+        do_GET = do_POST = do_PATCH = _handle
+
+        def log_message(self, format, *args):
+            click.echo(f"{self.command} {self.path} -> {args[1] if len(args) > 1 else ''}")
+
+    return Handler
+
+
+def serve(port: int, state: MockState) -> ThreadingHTTPServer:
+    """
+    Start mock in a background thread, port 0 picks a free one
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@click.command()
+@click.option("--port", default=8765)
+@click.option("--token", default="mock-token")
+@click.option("--fail-rate", default=0.0, help="Share of requests answered with 503")
+@click.option("--delay", default=0.0, help="Seconds to wait before every reply")
+def main(port: int, token: str, fail_rate: float, delay: float):
+    """
+    Run the mock of the platform API until interrupted
+    """
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), make_handler(MockState(token, fail_rate, delay=delay))
+    )
+    click.echo(f"Mock API at http://127.0.0.1:{port}, token {token}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Local in-memory stand-in of the docker registry API v2: blob uploads,
+manifests by tag and digest. Enough for `docker push` and the push check.
+
+Usage: python -m visionhub_cli.src.mock_registry [--port 5000]
+then use `localhost:5000/<name>:<tag>` as the model link
+"""
+
+import re
+import json
+import uuid
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import click
+
+DEFAULT_MANIFEST_TYPE = "application/vnd.docker.distribution.manifest.v2+json"
+PATH_PATTERN = re.compile(r"^/v2/(?P<name>.+)/(?P<kind>blobs|manifests)/(?P<reference>[^/]+)$")
+UPLOAD_PATTERN = re.compile(r"^/v2/(?P<name>.+)/blobs/uploads/(?P<upload>[^/]*)$")
+
+
+class RegistryState:
+    """
+    Blobs by digest, manifests by digest, tags and log of the received requests
+    """
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+        self.manifests: Dict[str, Tuple[str, bytes]] = {}
+        self.tags: Dict[Tuple[str, str], str] = {}
+        self.uploads: Dict[str, bytearray] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self.lock = threading.Lock()
+
+    def put_manifest(self, name: str, reference: str, media_type: str, body: bytes) -> str:
+        digest = "sha256:" + hashlib.sha256(body).hexdigest()
+        with self.lock:
+            self.manifests[digest] = (media_type, body)
+            if not reference.startswith("sha256:"):
+                self.tags[(name, reference)] = digest
+        return digest
+
+    def put_blob(self, data: bytes) -> str:
+        digest = "sha256:" + hashlib.sha256(data).hexdigest()
+        with self.lock:
+            self.blobs[digest] = data
+        return digest
+
+
+def make_handler(state: RegistryState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status: int, body: bytes = b"", headers: Dict[str, str] = None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            if "Content-Type" not in (headers or {}):
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _body(self) -> bytes:
+            if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+                # docker sends blob PATCHes without Content-Length
+                body = bytearray()
+                while True:
+                    size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                    if size == 0:
+                        # trailer lines up to the empty one
+                        while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                            pass
+                        return bytes(body)
+                    body += self.rfile.read(size)
+                    self.rfile.readline()
+            length = int(self.headers.get("Content-Length", 0))
+            return self.rfile.read(length) if length else b""
+
+        def _handle(self):
+            url = urlparse(self.path)
+            with state.lock:
+                state.requests.append((self.command, url.path))
+            if url.path == "/v2/":
+                self._reply(200, b"{}")
+                return
+            upload = UPLOAD_PATTERN.match(url.path)
+            if upload:
+                self._upload(upload.group("name"), upload.group("upload"), url.query)
+                return
+            match = PATH_PATTERN.match(url.path)
+            if match is None:
+                self._reply(404, b'{"errors": [{"code": "NOT_FOUND"}]}')
+                return
+            name, kind, reference = match.group("name", "kind", "reference")
+            if kind == "blobs":
+                data = state.blobs.get(reference)
+                if data is None:
+                    self._reply(404, b'{"errors": [{"code": "BLOB_UNKNOWN"}]}')
+                else:
+                    headers = {"Docker-Content-Digest": reference}
+                    headers["Content-Type"] = "application/octet-stream"
+                    self._reply(200, data, headers)
+            elif self.command == "PUT":
+                media_type = self.headers.get("Content-Type", DEFAULT_MANIFEST_TYPE)
+                digest = state.put_manifest(name, reference, media_type, self._body())
+                self._reply(201, headers={"Docker-Content-Digest": digest})
+            else:
+                digest = reference
+                if not reference.startswith("sha256:"):
+                    digest = state.tags.get((name, reference), "")
+                if digest not in state.manifests:
+                    self._reply(404, b'{"errors": [{"code": "MANIFEST_UNKNOWN"}]}')
+                    return
+                media_type, body = state.manifests[digest]
+                headers = {"Docker-Content-Digest": digest, "Content-Type": media_type}
+                self._reply(200, body, headers)
+
+        def _upload(self, name: str, upload: str, query: str):
+            if self.command == "POST":
+                upload = uuid.uuid4().hex
+                with state.lock:
+                    state.uploads[upload] = bytearray()
+                self._reply(202, headers=self._upload_headers(name, upload))
+                return
+            with state.lock:
+                buffer = state.uploads.get(upload)
+            if buffer is None:
+                self._reply(404, b'{"errors": [{"code": "BLOB_UPLOAD_UNKNOWN"}]}')
+                return
+            buffer += self._body()
+            if self.command == "PATCH":
+                self._reply(202, headers=self._upload_headers(name, upload))
+                return
+            expected = parse_qs(query).get("digest", [""])[0]
+            with state.lock:
+                state.uploads.pop(upload, None)
+            digest = state.put_blob(bytes(buffer))
+            if expected and expected != digest:
+                self._reply(400, b'{"errors": [{"code": "DIGEST_INVALID"}]}')
+                return
+            headers = {"Docker-Content-Digest": digest, "Location": f"/v2/{name}/blobs/{digest}"}
+            self._reply(201, headers=headers)
+
+        def _upload_headers(self, name: str, upload: str) -> Dict[str, str]:
+            size = len(state.uploads[upload])
+            return {
+                "Location": f"/v2/{name}/blobs/uploads/{upload}",
+                "Docker-Upload-UUID": upload,
+                "Range": f"0-{max(size - 1, 0)}",
+            }
+
+        do_GET = do_HEAD = do_PUT = do_POST = do_PATCH = _handle
+
+        def log_message(self, format, *args):
+            click.echo(f"{self.command} {self.path} -> {args[1] if len(args) > 1 else ''}")
+
+    return Handler
+
+
+def serve(port: int, state: RegistryState) -> ThreadingHTTPServer:
+    """
+    Start registry in a background thread, port 0 picks a free one
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed_image(
+    state: RegistryState, name: str, tag: str, config: Dict, layers: List[bytes]
+) -> str:
+    """
+    Put image with the given config and layer blobs, return its manifest digest
+    """
+    config_body = json.dumps(config).encode()
+    config_digest = state.put_blob(config_body)
+    manifest = {
+        "schemaVersion": 2,
+        "mediaType": DEFAULT_MANIFEST_TYPE,
+        "config": {
+            "mediaType": "application/vnd.docker.container.image.v1+json",
+            "size": len(config_body),
+            "digest": config_digest,
+        },
+        "layers": [
+            {
+                "mediaType": "application/vnd.docker.image.rootfs.diff.tar.gzip",
+                "size": len(layer),
+                "digest": state.put_blob(layer),
+            }
+            for layer in layers
+        ],
+    }
+    return state.put_manifest(name, tag, DEFAULT_MANIFEST_TYPE, json.dumps(manifest).encode())
+
+
+@click.command()
+@click.option("--port", default=5000)
+def main(port: int):
+    """
+    Run the registry stand-in until interrupted
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(RegistryState()))
+    click.echo(f"Mock registry at localhost:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Discovery of model configs in a repository with many models
+"""
+
+from pathlib import Path
+from typing import List, NamedTuple
+
+CONFIG_RELATIVE_PATH = Path(".visionhub/model.yaml")
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv"}
+
+
+class ModelDir(NamedTuple):
+    directory: Path
+    config_path: Path
+
+
+def discover_models(root: Path) -> List[ModelDir]:
+    """
+    Find every directory having .visionhub/model.yaml under root
+    """
+    result = []
+    for config_path in sorted(root.rglob(str(CONFIG_RELATIVE_PATH))):
+        if SKIP_DIRS.intersection(config_path.relative_to(root).parts):
+            continue
+        directory = config_path.parent.parent
+        result.append(ModelDir(directory, config_path))
+    return result
+
+
+def base_images(dockerfile: Path) -> List[str]:
+    """
+    External images of FROM instructions, build stage aliases are excluded
+    """
+    if not dockerfile.is_file():
+        return []
+    aliases = set()
+    images = []
+    with open(dockerfile, "r") as file_:
+        for line in file_:
+            parts = line.split()
+            if not parts or parts[0].upper() != "FROM":
+                continue
+            args = [part for part in parts[1:] if not part.startswith("--")]
+            if not args:
+                continue
+            image = args[0]
+            if len(args) >= 3 and args[1].upper() == "AS":
+                aliases.add(args[2].lower())
+            if image.lower() in aliases or image == "scratch" or image in images:
+                continue
+            images.append(image)
+    return images
+
+
+def split_image(image: str):
+    """
+    Split image reference to repository and tag
+    """
+    name, _, tag = image.rpartition(":")
+    if not name or "/" in tag:
+        return image, "latest"
+    return name, tag
@@ -0,0 +1,134 @@
+"""
+Local database of release benchmarks and the regression check against
+the last released version of the model
+"""
+
+import json
+import sqlite3
+import datetime
+import importlib.util
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+DATABASE_PATH = Path(".visionhub/perf.sqlite3")
+# fixed workload, results are comparable only between runs with the same one.
+# Every source is measured BENCH_REPEATS times and the fastest run is kept,
+# slower runs are mostly noise of other processes
+BENCH_BATCHES = 20
+BENCH_MAX_FRAMES = 64
+BENCH_REPEATS = 3
+# modules of the `perf` extra, the image is benchmarked through its queues
+PERF_MODULES = ("zmq", "numpy", "cv2")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    slug TEXT NOT NULL,
+    version TEXT NOT NULL,
+    created TEXT NOT NULL,
+    frames_per_second REAL NOT NULL,
+    latency_p95 REAL NOT NULL,
+    details TEXT NOT NULL,
+    released INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+class PerfRun(BaseModel):
+    """
+    Throughput and batch p95 latency (seconds) of one benchmark run
+    """
+
+    id: Optional[int] = None
+    slug: str
+    version: str
+    created: str = ""
+    frames_per_second: float
+    latency_p95: float
+    details: str = "[]"
+    released: bool = False
+
+
+def connect(path: Path = DATABASE_PATH) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(str(path))
+    connection.row_factory = sqlite3.Row
+    connection.execute(SCHEMA)
+    return connection
+
+
+def missing_modules() -> List[str]:
+    return [name for name in PERF_MODULES if importlib.util.find_spec(name) is None]
+
+
+def summarize(slug: str, version: str, results: List) -> PerfRun:
+    """
+    Overall fps and the worst batch p95 of benchmark.BenchResult list
+    """
+    frames = sum(result.batches * result.batch_size for result in results)
+    seconds = sum(
+        result.batches * result.batch_size / result.frames_per_second
+        for result in results
+        if result.frames_per_second
+    )
+    return PerfRun(
+        slug=slug,
+        version=version,
+        frames_per_second=frames / seconds if seconds else 0.0,
+        latency_p95=max((result.batch_p95 for result in results), default=0.0),
+        details=json.dumps([result.dict() for result in results]),
+    )
+
+
+def save(connection: sqlite3.Connection, run: PerfRun) -> PerfRun:
+    created = datetime.datetime.now().isoformat(timespec="seconds")
+    with connection:
+        cursor = connection.execute(
+            "INSERT INTO runs (slug, version, created, frames_per_second, latency_p95, details) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (run.slug, run.version, created, run.frames_per_second, run.latency_p95, run.details),
+        )
+    return run.copy(update={"id": cursor.lastrowid, "created": created})
+
+
+def last_released(connection: sqlite3.Connection, slug: str) -> Optional[PerfRun]:
+    row = connection.execute(
+        "SELECT * FROM runs WHERE slug = ? AND released = 1 ORDER BY id DESC LIMIT 1",
+        (slug,),
+    ).fetchone()
+    return PerfRun(**dict(row)) if row is not None else None
+
+
+def mark_released(connection: sqlite3.Connection, run_id: int):
+    with connection:
+        connection.execute("UPDATE runs SET released = 1 WHERE id = ?", (run_id,))
+
+
+def regressions(
+    current: PerfRun,
+    baseline: PerfRun,
+    max_throughput_drop: float,
+    max_latency_rise: float,
+) -> List[str]:
+    """
+    Human readable regressions, thresholds are in percent
+    """
+    found = []
+    if baseline.frames_per_second:
+        drop = (1 - current.frames_per_second / baseline.frames_per_second) * 100
+        if drop > max_throughput_drop:
+            found.append(
+                f"throughput {current.frames_per_second:.1f} fps is {drop:.0f}% lower than "
+                f"{baseline.frames_per_second:.1f} fps of {baseline.version} "
+                f"(allowed {max_throughput_drop:g}%)"
+            )
+    if baseline.latency_p95:
+        rise = (current.latency_p95 / baseline.latency_p95 - 1) * 100
+        if rise > max_latency_rise:
+            found.append(
+                f"p95 latency {current.latency_p95 * 1000:.1f} ms is {rise:.0f}% higher than "
+                f"{baseline.latency_p95 * 1000:.1f} ms of {baseline.version} "
+                f"(allowed {max_latency_rise:g}%)"
+            )
+    return found
@@ -0,0 +1,153 @@
+"""
+Progress tracking of the streamed `docker push` events
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .utils import format_size
+
+ALREADY_EXISTS = "Layer already exists"
+PUSHED = "Pushed"
+
+
+class PushError(Exception):
+    """
+    Registry returned error during push
+    """
+
+
+class LayerProgress(BaseModel):
+    """
+    Upload state of one layer
+    """
+
+    id: str
+    status: str = ""
+    current: int = 0
+    total: int = 0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    def rate(self, now: float) -> float:
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or now) - self.started
+        return self.current / elapsed if elapsed > 0 else 0.0
+
+
+class PushSummary(BaseModel):
+    """
+    Machine readable result of the push.
+    It is skipped if the registry tag already points to the local image
+    """
+
+    link: str
+    ok: bool
+    skipped: bool = False
+    digest: Optional[str] = None
+    total_bytes: int = 0
+    layers_pushed: int = 0
+    layers_skipped: int = 0
+    attempts: int = 0
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+class PushTracker:
+    """
+    Consumes decoded push events of one attempt
+    """
+
+    def __init__(self):
+        self.layers: Dict[str, LayerProgress] = {}
+        self.digest: Optional[str] = None
+        self.started = time.perf_counter()
+
+    def update(self, event: Dict[str, Any]):
+        if "error" in event:
+            raise PushError(event["error"])
+        status = event.get("status", "")
+        if "digest: " in status:
+            self.digest = status.split("digest: ")[1].split()[0]
+            return
+        layer_id = event.get("id")
+        if not layer_id or " " in layer_id:
+            # tag level messages like "The push refers to repository ..."
+            return
+        layer = self.layers.setdefault(layer_id, LayerProgress(id=layer_id))
+        layer.status = status
+        now = time.perf_counter()
+        detail = event.get("progressDetail") or {}
+        if status == "Pushing" and detail:
+            if layer.started is None:
+                layer.started = now
+            layer.current = detail.get("current", layer.current)
+            layer.total = detail.get("total", layer.total) or layer.total
+        elif status == PUSHED:
+            layer.finished = now
+            layer.current = max(layer.current, layer.total)
+
+    def pushed(self) -> List[LayerProgress]:
+        return [layer for layer in self.layers.values() if layer.status == PUSHED]
+
+    def skipped(self) -> List[LayerProgress]:
+        return [
+            layer for layer in self.layers.values() if layer.status == ALREADY_EXISTS
+        ]
+
+    def uploaded_bytes(self) -> int:
+        return sum(layer.current for layer in self.layers.values())
+
+    def eta(self) -> Optional[float]:
+        """
+        Seconds left for the known layer sizes at the current overall rate
+        """
+        total = sum(layer.total for layer in self.layers.values())
+        current = self.uploaded_bytes()
+        elapsed = time.perf_counter() - self.started
+        if not current or not elapsed or total <= current:
+            return None
+        return (total - current) / (current / elapsed)
+
+    def progress_lines(self) -> List[str]:
+        now = time.perf_counter()
+        lines = []
+        for layer in self.layers.values():
+            if layer.status != "Pushing":
+                continue
+            lines.append(
+                f"  {layer.id}: {format_size(layer.current)}/{format_size(layer.total)}"
+                f" {format_size(layer.rate(now))}/s"
+            )
+        eta = self.eta()
+        lines.append(
+            f"Uploaded {format_size(self.uploaded_bytes())}, "
+            f"{len(self.pushed())} layers pushed, {len(self.skipped())} already exist"
+            + (f", ETA {eta:.0f}s" if eta is not None else "")
+        )
+        return lines
+
+
+def summarize(link: str, trackers: List[PushTracker], error: Optional[str]) -> PushSummary:
+    """
+    Merge trackers of all attempts, a layer pushed in any attempt is counted as pushed
+    """
+    pushed = set()
+    skipped = set()
+    for tracker in trackers:
+        pushed.update(layer.id for layer in tracker.pushed())
+        skipped.update(layer.id for layer in tracker.skipped())
+    return PushSummary(
+        link=link,
+        ok=error is None,
+        digest=trackers[-1].digest if trackers else None,
+        total_bytes=sum(tracker.uploaded_bytes() for tracker in trackers),
+        layers_pushed=len(pushed),
+        layers_skipped=len(skipped - pushed),
+        attempts=len(trackers),
+        duration=time.perf_counter() - trackers[0].started if trackers else 0.0,
+        error=error,
+    )
@@ -0,0 +1,239 @@
+"""
+Read-only client of the docker registry HTTP API v2: manifest and config of
+the remote tag, so push can be skipped when the registry already has the image.
+Remote state is cached per link, an unchanged tag costs one HEAD request
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from docker import auth
+from pydantic import BaseModel
+
+CACHE_DIR = Path(".visionhub/registry")
+TIMEOUT = 30
+MANIFEST_V2 = "application/vnd.docker.distribution.manifest.v2+json"
+MANIFEST_LIST = "application/vnd.docker.distribution.manifest.list.v2+json"
+OCI_MANIFEST = "application/vnd.oci.image.manifest.v1+json"
+OCI_INDEX = "application/vnd.oci.image.index.v1+json"
+ACCEPT = ", ".join((MANIFEST_V2, OCI_MANIFEST, MANIFEST_LIST, OCI_INDEX))
+# docker talks plain http to registries on the local machine
+INSECURE_HOSTS = ("localhost", "127.0.0.1")
+DOCKER_HUB = "registry-1.docker.io"
+
+
+class RegistryError(Exception):
+    """
+    Registry returned unexpected response
+    """
+
+
+class RemoteImage(BaseModel):
+    """
+    Image of the remote tag. `image_id` is the digest of its config,
+    it is equal to the Id of the local image it was pushed from
+    """
+
+    link: str
+    manifest_digest: str
+    image_id: Optional[str] = None
+    diff_ids: List[str] = []
+
+
+def split_link(link: str) -> Tuple[str, str, str]:
+    """
+    Base url of the registry, repository name and tag of the image link
+    """
+    repository, _, tag = link.rpartition(":")
+    if not repository or "/" in tag:
+        repository, tag = link, "latest"
+    registry, name = auth.resolve_repository_name(repository)
+    if registry == auth.INDEX_NAME:
+        registry = DOCKER_HUB
+        if "/" not in name:
+            name = "library/" + name
+    scheme = "http" if registry.split(":")[0] in INSECURE_HOSTS else "https"
+    return f"{scheme}://{registry}", name, tag
+
+
+class Registry:
+    """
+    Session to one repository, anonymous or with the credentials of `docker login`
+    """
+
+    def __init__(self, link: str):
+        self.url, self.name, self.tag = split_link(link)
+        self._session = requests.Session()
+        self._session.headers["Accept"] = ACCEPT
+
+    def _credentials(self) -> Optional[Tuple[str, str]]:
+        config = auth.resolve_authconfig(auth.load_config(), self.url.split("://")[1])
+        if not config:
+            return None
+        username = config.get("username") or config.get("Username")
+        password = config.get("password") or config.get("Password")
+        return (username, password) if username and password else None
+
+    def _authorize(self, challenge: str):
+        scheme, _, params = challenge.partition(" ")
+        fields = dict(re.findall(r'(\w+)="([^"]*)"', params))
+        if scheme.lower() == "basic":
+            self._session.auth = self._credentials()
+            return
+        if scheme.lower() != "bearer" or "realm" not in fields:
+            raise RegistryError(f"Unsupported registry authentication {challenge!r}")
+        response = requests.get(
+            fields["realm"],
+            params={
+                "service": fields.get("service", ""),
+                "scope": fields.get("scope", f"repository:{self.name}:pull"),
+            },
+            auth=self._credentials(),
+            timeout=TIMEOUT,
+        )
+        if not response.ok:
+            raise RegistryError(f"Registry token request failed: {response.status_code}")
+        body = response.json()
+        token = body.get("token") or body.get("access_token")
+        self._session.headers["Authorization"] = f"Bearer {token}"
+
+    def request(self, method: str, path: str) -> requests.Response:
+        url = f"{self.url}/v2/{self.name}/{path}"
+        response = self._session.request(method, url, timeout=TIMEOUT)
+        challenge = response.headers.get("WWW-Authenticate")
+        if response.status_code == 401 and challenge:
+            self._authorize(challenge)
+            response = self._session.request(method, url, timeout=TIMEOUT)
+        if response.status_code == 401:
+            raise RegistryError(f"Access to {self.name} is denied, run `docker login`")
+        return response
+
+    def manifest_digest(self) -> Optional[str]:
+        """
+        Digest of the tag manifest, None if there is no such tag
+        """
+        response = self.request("HEAD", f"manifests/{self.tag}")
+        if response.status_code == 404:
+            return None
+        if not response.ok or "Docker-Content-Digest" not in response.headers:
+            raise RegistryError(f"Manifest request failed: {response.status_code}")
+        return response.headers["Docker-Content-Digest"]
+
+    def manifest(self, reference: str) -> Dict[str, Any]:
+        response = self.request("GET", f"manifests/{reference}")
+        if not response.ok:
+            raise RegistryError(f"Manifest request failed: {response.status_code}")
+        return response.json()
+
+    def blob(self, digest: str) -> Dict[str, Any]:
+        response = self.request("GET", f"blobs/{digest}")
+        if not response.ok:
+            raise RegistryError(f"Blob request failed: {response.status_code}")
+        return response.json()
+
+    def remote_image(self, link: str, digest: str, platform: Dict[str, str]) -> RemoteImage:
+        manifest = self.manifest(digest)
+        if manifest.get("mediaType") in (MANIFEST_LIST, OCI_INDEX) or "manifests" in manifest:
+            for entry in manifest.get("manifests", []):
+                entry_platform = entry.get("platform", {})
+                if all(entry_platform.get(key) == value for key, value in platform.items()):
+                    manifest = self.manifest(entry["digest"])
+                    break
+            else:
+                # other platforms only, the local image is not there
+                return RemoteImage(link=link, manifest_digest=digest)
+        if "config" not in manifest:
+            # schema 1 manifest, there is no image id to compare with
+            return RemoteImage(link=link, manifest_digest=digest)
+        image_id = manifest["config"]["digest"]
+        config = self.blob(image_id)
+        return RemoteImage(
+            link=link,
+            manifest_digest=digest,
+            image_id=image_id,
+            diff_ids=config.get("rootfs", {}).get("diff_ids", []),
+        )
+
+
+def cache_path(link: str) -> Path:
+    return CACHE_DIR / (re.sub(r"[/:@]", "_", link) + ".json")
+
+
+def load_cached(link: str) -> Optional[RemoteImage]:
+    try:
+        return RemoteImage.parse_file(cache_path(link))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_cached(remote: RemoteImage):
+    path = cache_path(remote.link)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as file_:
+        file_.write(remote.json(indent=2))
+    tmp_path.replace(path)
+
+
+def fetch_remote(link: str, platform: Dict[str, str]) -> Optional[RemoteImage]:
+    """
+    Remote image of the link, None if the tag is not pushed yet.
+    Manifest and config are downloaded only if the tag digest changed
+    """
+    registry = Registry(link)
+    digest = registry.manifest_digest()
+    if digest is None:
+        return None
+    cached = load_cached(link)
+    if cached is not None and cached.manifest_digest == digest:
+        return cached
+    remote = registry.remote_image(link, digest, platform)
+    save_cached(remote)
+    return remote
+
+
+def local_platform(image: Dict[str, Any]) -> Dict[str, str]:
+    platform = {
+        "os": image.get("Os", "linux"),
+        "architecture": image.get("Architecture", "amd64"),
+    }
+    if image.get("Variant"):
+        platform["variant"] = image["Variant"]
+    return platform
+
+
+def new_layers(
+    image: Dict[str, Any], history: List[Dict[str, Any]], remote: Optional[RemoteImage]
+) -> List[Tuple[str, str, int]]:
+    """
+    Diff id, instruction and size of the local layers missing in the remote image.
+    Instructions are known only if the local history has one sized entry per layer
+    """
+    from .image_layers import history_instruction
+
+    diff_ids = image.get("RootFS", {}).get("Layers", [])
+    sized = [entry for entry in reversed(history) if entry.get("Size")]
+    if len(sized) != len(diff_ids):
+        sized = [{}] * len(diff_ids)
+    remote_ids = set(remote.diff_ids) if remote is not None else set()
+    return [
+        (diff_id, history_instruction(entry.get("CreatedBy", "")), entry.get("Size", 0))
+        for diff_id, entry in zip(diff_ids, sized)
+        if diff_id not in remote_ids
+    ]
+
+
+def record_push(link: str, digest: str, image: Dict[str, Any]):
+    """
+    Cache the state of the tag after a successful push of the local image
+    """
+    save_cached(
+        RemoteImage(
+            link=link,
+            manifest_digest=digest,
+            image_id=image.get("Id"),
+            diff_ids=image.get("RootFS", {}).get("Layers", []),
+        )
+    )
@@ -0,0 +1,204 @@
+"""
+Cache of predict_batch results for the local runs. A sample is keyed by
+a hash of its frame bytes, meta, the draw flag, the code of the model and
+the arguments of the last `init`, so editing model.py invalidates old results.
+Recent results are kept in memory, optionally all of them on disk.
+
+Output of a stateful model depends on the earlier calls, e.g. sound chunks
+of the mixer. Once a result has a stateful field the cache is bypassed
+for the same code and `init` arguments
+"""
+
+import copy
+import json
+import pickle
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+DEFAULT_MAX_ENTRIES = 1024
+# result fields produced from the model state, not from the sample
+STATEFUL_FIELDS = ("sound",)
+
+
+class CacheStats(BaseModel):
+    """
+    Lookups of the cache, disk hits are counted in hits too
+    """
+
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def code_version(directory: Path) -> str:
+    """
+    Hash of the python files of the model directory
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(directory.rglob("*.py")):
+        relative = path.relative_to(directory)
+        if any(part.startswith(".") for part in relative.parts):
+            continue
+        digest.update(str(relative).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _update(digest: Any, value: Any):
+    if hasattr(value, "tobytes") and hasattr(value, "shape"):
+        digest.update(f"{value.dtype}{value.shape}".encode())
+        digest.update(value.tobytes())
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+class ResultCache:
+    """
+    LRU of up to `max_entries` results in memory and an optional directory
+    with all results, shared between runs of the same model code
+    """
+
+    def __init__(
+        self,
+        version: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        directory: Optional[Path] = None,
+    ):
+        self.version = version
+        self.max_entries = max_entries
+        self.directory = directory
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stateful = set()
+
+    def context(self, init_kwargs: Dict[str, Any]) -> str:
+        """
+        Hash of the model code and the arguments of its `init`
+        """
+        digest = hashlib.blake2b(self.version.encode(), digest_size=16)
+        _update(digest, init_kwargs)
+        return digest.hexdigest()
+
+    def key(self, context: str, sample: Dict[str, Any], draw: bool) -> str:
+        digest = hashlib.blake2b(context.encode(), digest_size=16)
+        digest.update(b"draw" if draw else b"no draw")
+        for name in sorted(sample):
+            digest.update(name.encode())
+            _update(digest, sample[name])
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pickle"
+
+    def _stateful_path(self, context: str) -> Path:
+        return self.directory / "stateful" / context
+
+    def is_stateful(self, context: str) -> bool:
+        if context in self._stateful:
+            return True
+        if self.directory is not None and self._stateful_path(context).exists():
+            self._stateful.add(context)
+            return True
+        return False
+
+    def mark_stateful(self, context: str):
+        self._stateful.add(context)
+        if self.directory is not None:
+            path = self._stateful_path(context)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return result
+        if self.directory is not None:
+            try:
+                with open(self._path(key), "rb") as file_:
+                    result = pickle.load(file_)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                result = None
+            if result is not None:
+                self._remember(key, result)
+                self.stats.hits += 1
+                self.stats.disk_hits += 1
+                return result
+        self.stats.misses += 1
+        return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        # a copy, the model may reuse its output buffers in the next batch
+        result = copy.deepcopy(result)
+        self._remember(key, result)
+        if self.directory is not None:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as file_:
+                pickle.dump(result, file_, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(path)
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class CachedModel:
+    """
+    Model whose predict_batch runs only on the samples missing in the cache,
+    other attributes are the model's ones. Results with stateful fields are
+    not cached, the model is called directly from then on
+    """
+
+    def __init__(self, model: ModuleType, cache: ResultCache):
+        self._model = model
+        self.cache = cache
+        self._context = cache.context({})
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._model, name)
+
+    def init(self, **kwargs):
+        if hasattr(self._model, "init"):
+            self._model.init(**kwargs)
+        self._context = self.cache.context(kwargs)
+
+    def predict_batch(self, samples: List[Dict[str, Any]], draw: bool = True) -> List[Any]:
+        if self.cache.is_stateful(self._context):
+            return self._model.predict_batch(samples, draw=draw)
+        keys = [self.cache.key(self._context, sample, draw) for sample in samples]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = self._model.predict_batch([samples[i] for i in missing], draw=draw)
+            stateful = any(
+                field in result for result in computed for field in STATEFUL_FIELDS
+            )
+            if stateful:
+                self.cache.mark_stateful(self._context)
+            for i, result in zip(missing, computed):
+                if not stateful:
+                    self.cache.put(keys[i], result)
+                results[i] = result
+        return results
+
+
+def format_stats(stats: CacheStats) -> str:
+    return (
+        f"Result cache: {stats.hits} hits ({stats.disk_hits} from disk), "
+        f"{stats.misses} misses, hit rate {stats.hit_rate:.0%}"
+    )
@@ -0,0 +1,106 @@
+"""
+Small dependency graph scheduler for release stages
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+
+import click
+
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class Stage(NamedTuple):
+    """
+    Stage of the release. It is failed if func raises or returns False/None.
+    If pass_results is set, func gets dict of results of the finished stages
+    """
+
+    name: str
+    func: Callable[..., Any]
+    requires: Sequence[str] = ()
+    pass_results: bool = False
+
+
+class StageReport(NamedTuple):
+    name: str
+    status: str
+    started: float
+    duration: float
+    result: Any = None
+
+
+def run_stages(stages: List[Stage], max_workers: int = 4) -> List[StageReport]:
+    """
+    Run every stage as soon as all its requirements are done.
+    Stages depending on a failed stage are skipped
+    """
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        unknown = set(stage.requires) - names
+        if unknown:
+            raise ValueError(f"Stage {stage.name} requires unknown {unknown}")
+
+    results: Dict[str, Any] = {}
+    reports: Dict[str, StageReport] = {}
+    pending = {stage.name: stage for stage in stages}
+    running: Dict[Future, Stage] = {}
+    started_at: Dict[str, float] = {}
+    origin = time.perf_counter()
+
+    def run(stage: Stage) -> Any:
+        if stage.pass_results:
+            return stage.func(dict(results))
+        return stage.func()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            pending_before = len(pending)
+            for name, stage in list(pending.items()):
+                statuses = [reports[req].status for req in stage.requires if req in reports]
+                if any(status != DONE for status in statuses):
+                    del pending[name]
+                    click.echo(f"Stage {name} skipped, its requirements are not done")
+                    reports[name] = StageReport(name, SKIPPED, 0.0, 0.0)
+                elif len(statuses) == len(stage.requires):
+                    del pending[name]
+                    started_at[name] = time.perf_counter()
+                    running[executor.submit(run, stage)] = stage
+            if not running:
+                if len(pending) == pending_before:
+                    raise ValueError(f"Cyclic requirements of stages {set(pending)}")
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                ended = time.perf_counter()
+                try:
+                    result = future.result()
+                except Exception as exc:  # stage failure must not stop other stages
+                    click.echo(f"Stage {stage.name} failed: {exc}")
+                    result = None
+                status = FAILED if result is None or result is False else DONE
+                results[stage.name] = result
+                reports[stage.name] = StageReport(
+                    stage.name,
+                    status,
+                    started_at[stage.name] - origin,
+                    ended - started_at[stage.name],
+                    result,
+                )
+    return [reports[stage.name] for stage in stages]
+
+
+def format_report(reports: List[StageReport]) -> str:
+    width = max([len(report.name) for report in reports] + [16])
+    lines = [f"{'stage':<{width}} {'status':<8} {'start, s':>9} {'time, s':>9}"]
+    for report in reports:
+        lines.append(
+            f"{report.name:<{width}} {report.status:<8} "
+            f"{report.started:>9.2f} {report.duration:>9.2f}"
+        )
+    return "\n".join(lines)
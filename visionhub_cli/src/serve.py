@@ -0,0 +1,242 @@
+"""
+Local serving of model.py: a dynamic batcher in front of a pool of worker
+processes, each with its own copy of the model.
+
+The server speaks the container runner protocol (see example/Dockerfile):
+it binds PULL on `dataset_addr` and PUSH on `result_addr`, samples and results
+are pickled dicts, the "id" key of a sample is copied to its result.
+So `visionhub-cli loadtest` can be pointed at it unchanged.
+Model's `init` is not called, stateful VID2* models are not supported.
+"""
+
+import os
+import time
+import signal
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, Future, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from . import local_model
+from .benchmark import percentile
+
+try:
+    import zmq
+except ImportError:
+    zmq = None
+
+# seconds every worker has to load the model
+WARMUP_TIMEOUT = 600.0
+
+# model of the worker process, loaded once by the pool initializer
+_MODEL = None
+# barrier of all workers, see DynamicBatcher.warmup
+_BARRIER = None
+
+
+def _init_worker(directory: str, barrier):
+    global _MODEL, _BARRIER
+    # Ctrl+C stops the batcher, it shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _BARRIER = barrier
+    _MODEL = local_model.load_model(Path(directory))
+
+
+def _ready(timeout: float) -> Tuple[int, bool]:
+    # holds the worker until every worker runs it, so each of them gets one call
+    _BARRIER.wait(timeout)
+    return os.getpid(), _MODEL is not None
+
+
+def _predict(samples: List[Dict[str, Any]], draw: bool) -> Tuple[List[Dict[str, Any]], float]:
+    start = time.perf_counter()
+    results = _MODEL.predict_batch(samples, draw=draw)
+    return results, time.perf_counter() - start
+
+
+class ServeStats(BaseModel):
+    """
+    Batching and worker load of the serving session, times in seconds
+    """
+
+    samples: int = 0
+    batches: int = 0
+    batch_sizes: Dict[int, int] = {}
+    wait_p50: float = 0.0
+    wait_p95: float = 0.0
+    predict_p50: float = 0.0
+    predict_p95: float = 0.0
+    busy: float = 0.0
+    duration: float = 0.0
+
+
+class DynamicBatcher:
+    """
+    Collects samples into batches of up to `batch_size`, a batch is dispatched
+    when it is full or its first sample waited `max_wait` seconds.
+    At most `2 * workers` batches are in flight, the rest wait in the socket queue
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        dataset_addr: str,
+        result_addr: str,
+        batch_size: int,
+        max_wait: float,
+        workers: int,
+        draw: bool = True,
+    ):
+        if zmq is None:
+            raise ValueError("serve requires pyzmq, install it with `pip install pyzmq`")
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.workers = workers
+        self.draw = draw
+        self._addresses = (dataset_addr, result_addr)
+        context = multiprocessing.get_context()
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(str(directory), context.Barrier(workers)),
+        )
+        # zmq is set up after the workers are started, forked children must not share it
+        self._context = None
+        self._dataset = None
+        self._result = None
+        self._in_flight: Dict[Future, List[Any]] = {}
+        self._sizes: Counter = Counter()
+        self._waits: List[float] = []
+        self._predicts: List[float] = []
+
+    def warmup(self, timeout: float = WARMUP_TIMEOUT) -> List[int]:
+        """
+        Wait until every worker has imported the model, then bind the queues.
+        Returns process ids of the workers
+        """
+        futures = [self._pool.submit(_ready, timeout) for _ in range(self.workers)]
+        try:
+            ready = [future.result() for future in futures]
+        except BrokenProcessPool:
+            self.close()
+            raise ValueError("Workers can not load the model, see the error above")
+        except threading.BrokenBarrierError:
+            self.close()
+            raise ValueError(f"Workers did not load the model in {timeout:.0f}s")
+        pids = sorted({pid for pid, loaded in ready if loaded})
+        if len(pids) != self.workers:
+            self.close()
+            raise ValueError(f"Only {len(pids)} of {self.workers} workers loaded the model")
+
+        self._context = zmq.Context()
+        self._dataset = self._context.socket(zmq.PULL)
+        self._dataset.bind(self._addresses[0])
+        self._result = self._context.socket(zmq.PUSH)
+        self._result.bind(self._addresses[1])
+        return pids
+
+    def serve(self, duration: Optional[float] = None) -> ServeStats:
+        """
+        Serve until interrupted or `duration` seconds passed
+        """
+        start = time.perf_counter()
+        pending: List[Dict[str, Any]] = []
+        first_arrival = 0.0
+        try:
+            while duration is None or time.perf_counter() - start < duration:
+                self._send_finished()
+                if len(self._in_flight) >= 2 * self.workers:
+                    wait(list(self._in_flight), timeout=0.1, return_when=FIRST_COMPLETED)
+                    continue
+                if pending:
+                    timeout = max(0.0, first_arrival + self.max_wait - time.perf_counter())
+                else:
+                    timeout = 0.1
+                if self._in_flight:
+                    # results of the workers are sent by this loop, do not sleep long
+                    timeout = min(timeout, 0.002)
+                if self._dataset.poll(int(timeout * 1000)):
+                    while len(pending) < self.batch_size:
+                        try:
+                            sample = self._dataset.recv_pyobj(zmq.NOBLOCK)
+                        except zmq.Again:
+                            break
+                        if not pending:
+                            first_arrival = time.perf_counter()
+                        pending.append(sample)
+                now = time.perf_counter()
+                if pending and (
+                    len(pending) >= self.batch_size or now - first_arrival >= self.max_wait
+                ):
+                    self._dispatch(pending, now - first_arrival)
+                    pending = []
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+        return self._stats(time.perf_counter() - start)
+
+    def _dispatch(self, samples: List[Dict[str, Any]], waited: float):
+        ids = [sample.get("id") for sample in samples]
+        batch = [
+            {key: value for key, value in sample.items() if key != "id"}
+            for sample in samples
+        ]
+        self._in_flight[self._pool.submit(_predict, batch, self.draw)] = ids
+        self._sizes[len(batch)] += 1
+        self._waits.append(waited)
+
+    def _send_finished(self):
+        for future in [future for future in self._in_flight if future.done()]:
+            ids = self._in_flight.pop(future)
+            try:
+                results, elapsed = future.result()
+            except Exception as exc:  # broken model must not stop the server
+                results, elapsed = [{"error": repr(exc)}] * len(ids), 0.0
+            self._predicts.append(elapsed)
+            for sample_id, result in zip(ids, results):
+                if sample_id is not None:
+                    result = dict(result, id=sample_id)
+                self._result.send_pyobj(result)
+
+    def _stats(self, duration: float) -> ServeStats:
+        return ServeStats(
+            samples=sum(size * count for size, count in self._sizes.items()),
+            batches=sum(self._sizes.values()),
+            batch_sizes=dict(sorted(self._sizes.items())),
+            wait_p50=percentile(self._waits, 50),
+            wait_p95=percentile(self._waits, 95),
+            predict_p50=percentile(self._predicts, 50),
+            predict_p95=percentile(self._predicts, 95),
+            busy=sum(self._predicts) / (duration * self.workers) if duration else 0.0,
+            duration=duration,
+        )
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._context is None:
+            return
+        self._send_finished()
+        self._dataset.close(linger=0)
+        self._result.close(linger=1000)
+        self._context.term()
+
+
+def format_stats(stats: ServeStats, batch_size: int, workers: int) -> str:
+    mean = stats.samples / stats.batches if stats.batches else 0.0
+    lines = [
+        f"Served {stats.samples} samples in {stats.batches} batches "
+        f"in {stats.duration:.1f}s ({stats.samples / stats.duration if stats.duration else 0:.1f}/s)",
+        f"mean batch {mean:.1f} of {batch_size}, workers {workers} busy {stats.busy:.0%}",
+        f"batch wait p50 {stats.wait_p50 * 1000:.1f} ms, p95 {stats.wait_p95 * 1000:.1f} ms; "
+        f"predict_batch p50 {stats.predict_p50 * 1000:.1f} ms, "
+        f"p95 {stats.predict_p95 * 1000:.1f} ms",
+        "batch sizes: " + ", ".join(f"{size}x{count}" for size, count in stats.batch_sizes.items()),
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,121 @@
+"""
+Sampling profiler of the local model run with collapsed stacks output
+(the input format of flamegraph.pl, speedscope and inferno) and
+a breakdown of the samples by stage
+"""
+
+import sys
+import time
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+DECODING = "input decoding"
+INIT = "init"
+COMPUTE = "model compute"
+RENDERING = "rendering"
+SOUND = "sound chunks"
+OTHER = "harness"
+STAGES = (DECODING, INIT, COMPUTE, RENDERING, SOUND, OTHER)
+
+# parts of function or module names of the model code marking the stage
+STAGE_PATTERNS = (
+    (RENDERING, ("draw", "render", "puttext", "overlay")),
+    (SOUND, ("sound", "audio", "melody")),
+)
+DECODING_FUNCTIONS = {"read_image", "image_samples", "frames"}
+
+
+def frame_stack(frame: Optional[FrameType]) -> List[Tuple[str, str]]:
+    """
+    (module, function) pairs from the outermost frame to the innermost one
+    """
+    stack = []
+    while frame is not None:
+        stack.append((frame.f_globals.get("__name__", "?"), frame.f_code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def classify(stack: List[Tuple[str, str]]) -> str:
+    functions = [function for _, function in stack]
+    if "predict_batch" in functions:
+        inner = stack[functions.index("predict_batch") + 1 :]
+        for stage, patterns in STAGE_PATTERNS:
+            for module, function in inner:
+                name = f"{module}.{function}".lower()
+                if any(pattern in name for pattern in patterns):
+                    return stage
+        return COMPUTE
+    if "init" in functions:
+        return INIT
+    if DECODING_FUNCTIONS.intersection(functions):
+        return DECODING
+    return OTHER
+
+
+class SamplingProfiler:
+    """
+    Samples stack of the thread that started it every `interval` seconds
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.stages: Counter = Counter()
+        self._thread_id = None
+        self._root_depth = 0
+        self._stop = threading.Event()
+        self._sampler = None
+        self.started = 0.0
+        self.duration = 0.0
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._thread_id = threading.get_ident()
+        # stacks start at the function that runs the profiler, cli frames are dropped
+        self._root_depth = len(frame_stack(sys._getframe(1))) - 1
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self.started = time.perf_counter()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._sampler.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = frame_stack(frame)[self._root_depth :]
+            if not stack:
+                continue
+            self.stacks[";".join(f"{m}:{f}" for m, f in stack)] += 1
+            self.stages[classify(stack)] += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def breakdown(self) -> Dict[str, float]:
+        """
+        Estimated seconds per stage, samples are scaled to the measured duration
+        """
+        total = sum(self.stages.values())
+        if not total:
+            return {}
+        return {
+            stage: self.stages[stage] / total * self.duration
+            for stage in STAGES
+            if self.stages[stage]
+        }
+
+
+def format_breakdown(breakdown: Dict[str, float]) -> str:
+    total = sum(breakdown.values()) or 1.0
+    lines = [f"{'stage':<16} {'time, s':>8} {'share':>7}"]
+    for stage, seconds in breakdown.items():
+        lines.append(f"{stage:<16} {seconds:>8.2f} {seconds / total:>7.1%}")
+    return "\n".join(lines)
@@ -2,6 +2,13 @@
 Utils
 """
 
+import sys
+import threading
+import importlib.util
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Optional
+
 import click
 
 
@@ -20,3 +27,140 @@ def exception_handler(func):
         return None
 
     return wrapper
+
+
+def parse_int_list(ctx, param, value: str):
+    """
+    Click callback, parse comma separated list of positive integers
+    """
+    return _parse_list(value, int, "integers")
+
+
+def parse_float_list(ctx, param, value: str):
+    """
+    Click callback, parse comma separated list of positive numbers
+    """
+    return _parse_list(value, float, "numbers")
+
+
+def _parse_list(value: str, type_, name: str):
+    try:
+        result = [type_(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise click.BadParameter(f"must be comma separated {name}")
+    if not result or any(item <= 0 for item in result):
+        raise click.BadParameter(f"must be comma separated positive {name}")
+    return result
+
+
+def format_size(size: float) -> str:
+    """
+    Human readable size in bytes
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+SIZE_UNITS = {"": 1, "B": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(value) -> int:
+    """
+    Size in bytes from a number or a string like "800MB", "1.5 GB", "2G"
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().upper().replace(" ", "")
+    number = text.rstrip("KMGTBI")
+    unit = text[len(number) :].replace("IB", "").replace("B", "") or "B"
+    try:
+        return int(float(number) * SIZE_UNITS[unit])
+    except (ValueError, KeyError):
+        raise ValueError(f"Can not parse size {value!r}, use e.g. 800MB or 1.5GB")
+
+
+def lazy_import(name: str, package: Optional[str] = None) -> ModuleType:
+    """
+    Import module on the first attribute access.
+    Keeps heavy dependencies (docker, requests, pydantic) out of CLI startup
+    """
+    absolute_name = importlib.util.resolve_name(name, package)
+    if absolute_name in sys.modules:
+        return sys.modules[absolute_name]
+    spec = importlib.util.find_spec(absolute_name)
+    if spec is None:
+        raise ImportError(f"No module named {absolute_name!r}", name=absolute_name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[absolute_name] = module
+    loader.exec_module(module)
+    return module
+
+
+def load_lazy_modules(*modules: ModuleType):
+    """
+    Finish lazy imports before the modules are used from several threads,
+    LazyLoader is not thread-safe before Python 3.12.3
+    """
+    for module in modules:
+        getattr(module, "__dict__")
+
+
+_OUTPUT = threading.local()
+
+
+class PrefixedOutput:
+    """
+    Text stream which prefixes every line written from a thread
+    with the prefix set by `output_prefix` in this thread.
+    Whole lines are written under a lock, parallel output does not interleave
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        prefix = getattr(_OUTPUT, "prefix", None)
+        if prefix is None:
+            with self._lock:
+                return self._stream.write(text)
+        *lines, _OUTPUT.pending = (_OUTPUT.pending + text).split("\n")
+        if lines:
+            with self._lock:
+                self._stream.write("".join(f"{prefix}{line}\n" for line in lines))
+        return len(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def prefixed_stdout():
+    """
+    Replace sys.stdout with PrefixedOutput, click.echo writes to it too
+    """
+    stdout = sys.stdout
+    sys.stdout = PrefixedOutput(stdout)
+    try:
+        yield
+    finally:
+        sys.stdout = stdout
+
+
+@contextmanager
+def output_prefix(prefix: str):
+    """
+    Prefix the lines written from this thread inside `prefixed_stdout`
+    """
+    _OUTPUT.prefix, _OUTPUT.pending = prefix, ""
+    try:
+        yield
+    finally:
+        if _OUTPUT.pending:
+            sys.stdout.write("\n")
+        _OUTPUT.prefix = None
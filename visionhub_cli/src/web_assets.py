@@ -0,0 +1,224 @@
+"""
+Web versions of the model page assets. Preview and examples are downscaled
+and recompressed in a pool of processes before deploy, results are cached
+by the hash of the source, so unchanged assets are not encoded again
+"""
+
+import os
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+from pydantic import BaseModel
+
+from .deploy_manifest import hash_file
+from .encoder import find_ffmpeg
+from .utils import format_size
+
+CACHE_DIR = Path(".visionhub/web_assets")
+# deploy fields shown on the model page and how to transcode them
+ASSET_FIELDS = {
+    "preview": "image",
+    "image_input_example": "image",
+    "image_output_example": "image",
+    "video_input_example": "video",
+    "video_output_example": "video",
+}
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff"}
+MAX_IMAGE_SIDE = 1280
+JPEG_QUALITY = 85
+MAX_VIDEO_WIDTH = 1280
+MAX_VIDEO_HEIGHT = 720
+VIDEO_CRF = 28
+VIDEO_MAXRATE = "2M"
+# part of the cache key, results of other settings are encoded again
+SETTINGS = (
+    f"image:{MAX_IMAGE_SIDE}:{JPEG_QUALITY} "
+    f"video:{MAX_VIDEO_WIDTH}x{MAX_VIDEO_HEIGHT}:{VIDEO_CRF}:{VIDEO_MAXRATE}"
+)
+
+
+class WebAsset(BaseModel):
+    """
+    Transcoded asset, `path` is the source if the web version is not smaller
+    """
+
+    field: str
+    source: Path
+    path: Path
+    source_size: int
+    size: int
+    cached: bool = False
+
+
+def cache_dir(source: Path) -> Path:
+    key = hashlib.sha256(f"{SETTINGS}\n{hash_file(source)}".encode()).hexdigest()
+    return CACHE_DIR / key
+
+
+def cached_result(source: Path, directory: Path) -> Optional[Path]:
+    if not directory.is_dir():
+        return None
+    # files of the same content keep their own names, the name is shown on the page
+    return next(
+        (
+            path
+            for path in directory.iterdir()
+            if path.stem == source.stem and path.suffix != ".tmp"
+        ),
+        None,
+    )
+
+
+def temporary_path(path: Path) -> Path:
+    """
+    Unique temporary file next to path, parallel deploys of the same source
+    do not write to the same file
+    """
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False
+    ) as file_:
+        return Path(file_.name)
+
+
+def transcode_image(source: Path, directory: Path) -> Path:
+    """
+    Longest side up to MAX_IMAGE_SIDE, JPEG or PNG if the image is transparent
+    """
+    import cv2
+    import numpy as np
+
+    image = cv2.imread(str(source), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"Can not read image {source}")
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    height, width = image.shape[:2]
+    scale = MAX_IMAGE_SIDE / max(height, width)
+    if scale < 1:
+        image = cv2.resize(
+            image,
+            (round(width * scale), round(height * scale)),
+            interpolation=cv2.INTER_AREA,
+        )
+    transparent = image.ndim == 3 and image.shape[2] == 4 and image[:, :, 3].min() < 255
+    if transparent:
+        suffix, params = ".png", [cv2.IMWRITE_PNG_COMPRESSION, 9]
+    else:
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = image[:, :, :3]
+        suffix = ".jpg"
+        params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+    ok, data = cv2.imencode(suffix, image, params)
+    if not ok:
+        raise ValueError(f"Can not encode image {source}")
+    path = directory / (source.stem + suffix)
+    tmp_path = temporary_path(path)
+    tmp_path.write_bytes(data.tobytes())
+    tmp_path.replace(path)
+    return path
+
+
+def transcode_video(source: Path, directory: Path) -> Path:
+    """
+    H.264/AAC mp4 up to MAX_VIDEO_WIDTH x MAX_VIDEO_HEIGHT with capped bitrate,
+    moov atom first, so the browser starts playing before the download ends
+    """
+    path = directory / (source.stem + ".mp4")
+    tmp_path = temporary_path(path)
+    scale = (
+        f"scale=w='min({MAX_VIDEO_WIDTH},iw)':h='min({MAX_VIDEO_HEIGHT},ih)'"
+        ":force_original_aspect_ratio=decrease:force_divisible_by=2"
+    )
+    command = [
+        find_ffmpeg(),
+        *"-hide_banner -loglevel error -y -i".split(),
+        str(source),
+        "-vf",
+        scale,
+        *(
+            f"-c:v libx264 -crf {VIDEO_CRF} -maxrate {VIDEO_MAXRATE} "
+            f"-bufsize {VIDEO_MAXRATE} -preset slow -pix_fmt yuv420p "
+            "-c:a aac -b:a 96k -movflags +faststart -f mp4"
+        ).split(),
+        str(tmp_path),
+    ]
+    process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        tmp_path.unlink(missing_ok=True)
+        raise ValueError(f"ffmpeg failed to transcode {source}: {process.stderr.decode().strip()}")
+    tmp_path.replace(path)
+    return path
+
+
+def transcode(kind: str, source: Path, directory: Path) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    if kind == "image":
+        return transcode_image(source, directory)
+    return transcode_video(source, directory)
+
+
+def optimize(file_paths: Mapping[str, Path], workers: Optional[int] = None) -> List[WebAsset]:
+    """
+    Web versions of the asset fields of `file_paths`, other fields are skipped
+    """
+    jobs = {}
+    for field, source in file_paths.items():
+        kind = ASSET_FIELDS.get(field)
+        if kind == "image" and source.suffix.lower() not in IMAGE_SUFFIXES:
+            # vector previews and other formats are sent as they are
+            continue
+        if kind is not None:
+            jobs[field] = (kind, Path(source))
+
+    results: Dict[str, Path] = {}
+    cached = set()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {}
+        for field, (kind, source) in jobs.items():
+            # hash of the source is read once, big videos take a while
+            directory = cache_dir(source)
+            path = cached_result(source, directory)
+            if path is not None:
+                results[field] = path
+                cached.add(field)
+            else:
+                futures[field] = pool.submit(transcode, kind, source, directory)
+        for field, future in futures.items():
+            results[field] = future.result()
+
+    assets = []
+    for field, (_, source) in jobs.items():
+        source_size = source.stat().st_size
+        size = results[field].stat().st_size
+        path = results[field] if size < source_size else source
+        assets.append(
+            WebAsset(
+                field=field,
+                source=source,
+                path=path,
+                source_size=source_size,
+                size=min(size, source_size),
+                cached=field in cached,
+            )
+        )
+    return assets
+
+
+def format_report(assets: List[WebAsset]) -> str:
+    cached = sum(asset.cached for asset in assets)
+    lines = [f"Web assets: {len(assets) - cached} transcoded, {cached} cached"]
+    for asset in assets:
+        note = "" if asset.path != asset.source else ", source is smaller, sent as is"
+        lines.append(
+            f"  {asset.field:<22} {asset.source.name}: {format_size(asset.source_size)} -> "
+            f"{format_size(asset.size)}{note}"
+        )
+    total = sum(asset.source_size for asset in assets)
+    saved = total - sum(asset.size for asset in assets)
+    share = f" ({saved / total:.0%})" if total else ""
+    lines.append(f"Saved {format_size(saved)} of {format_size(total)}{share}")
+    return "\n".join(lines)